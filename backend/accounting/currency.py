@@ -0,0 +1,132 @@
+"""
+Exchange rates and conversion to the base currency.
+
+ExchangeRate rows are loaded once per process into a RateTable, which keeps
+each currency's rates as date-sorted lists and answers "rate in effect on a
+date" with a binary search. The table is reloaded after
+EXCHANGE_RATE_CACHE_TTL seconds and dropped immediately when this process
+writes an exchange rate, so reports convert whole result sets in memory
+instead of querying a rate per row.
+"""
+import bisect
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+ONE = Decimal("1")
+CENT = Decimal("0.01")
+
+
+def round_cents(amount):
+    """
+    Round to cents half away from zero, as SQL ROUND() does in base_amount(),
+    so amounts converted in Python match the ones converted in the database.
+    """
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def base_currency():
+    return settings.ACCOUNTING_BASE_CURRENCY
+
+
+class RateTable:
+    """
+    In-memory exchange rates: units of base currency per unit of each currency.
+
+    Rates apply from their date until the next rate for the same currency.
+    """
+
+    def __init__(self, rows, base=None):
+        """rows is an iterable of (currency, rate_date, rate) ordered by currency, rate_date."""
+        self.base = base or base_currency()
+        self._dates = {}
+        self._rates = {}
+        for currency, rate_date, rate in rows:
+            self._dates.setdefault(currency, []).append(rate_date)
+            self._rates.setdefault(currency, []).append(rate)
+
+    @classmethod
+    def load(cls):
+        from .models import ExchangeRate
+
+        return cls(
+            ExchangeRate.objects.order_by("currency", "rate_date").values_list(
+                "currency", "rate_date", "rate"
+            )
+        )
+
+    def rate(self, currency, on_date):
+        """Rate in effect for currency on on_date; raises ValidationError if there is none."""
+        if currency == self.base:
+            return ONE
+        dates = self._dates.get(currency, [])
+        index = bisect.bisect_right(dates, on_date) - 1
+        if index < 0:
+            raise ValidationError(
+                f"No exchange rate for {currency} on or before {on_date}"
+            )
+        return self._rates[currency][index]
+
+    def convert(self, amount, currency, on_date):
+        """Convert one amount to the base currency, rounded to cents."""
+        return round_cents(amount * self.rate(currency, on_date))
+
+    def convert_many(self, rows):
+        """
+        Convert a batch of (amount, currency, date) rows to base-currency amounts.
+
+        Rows are grouped by currency and sorted by date, then each group is
+        matched against that currency's rates in a single forward pass.
+        Returns the converted amounts in input order.
+        """
+        rows = list(rows)
+        converted = [None] * len(rows)
+        positions = {}
+        for position, (_, currency, _) in enumerate(rows):
+            positions.setdefault(currency, []).append(position)
+
+        for currency, indexes in positions.items():
+            if currency == self.base:
+                for position in indexes:
+                    converted[position] = rows[position][0]
+                continue
+            dates = self._dates.get(currency, [])
+            rates = self._rates.get(currency, [])
+            indexes.sort(key=lambda position: rows[position][2])
+            cursor = -1
+            for position in indexes:
+                amount, _, on_date = rows[position]
+                while cursor + 1 < len(dates) and dates[cursor + 1] <= on_date:
+                    cursor += 1
+                if cursor < 0:
+                    raise ValidationError(
+                        f"No exchange rate for {currency} on or before {on_date}"
+                    )
+                converted[position] = round_cents(amount * rates[cursor])
+        return converted
+
+
+_rate_table = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_rate_table():
+    """The process-wide RateTable, (re)loaded when missing or older than the TTL."""
+    global _rate_table, _loaded_at
+    table = _rate_table
+    if table is None or time.monotonic() - _loaded_at > settings.EXCHANGE_RATE_CACHE_TTL:
+        with _lock:
+            if _rate_table is table:
+                _rate_table = RateTable.load()
+                _loaded_at = time.monotonic()
+            table = _rate_table
+    return table
+
+
+def clear_rate_cache():
+    global _rate_table
+    with _lock:
+        _rate_table = None
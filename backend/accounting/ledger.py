@@ -0,0 +1,385 @@
+"""
+Balance engine for the general ledger.
+
+Account.current_balance is maintained incrementally: posting a transaction
+applies the net debit/credit of its lines to every account it touches and
+voiding it applies the same deltas in reverse, both inside the same database
+transaction as the status change. Balances are stored in the account's normal
+sign (debit-normal for assets and expenses, credit-normal otherwise), so
+reading a balance is a single column lookup however large the ledger grows.
+Posting and voiding also delete the PeriodBalance snapshots ending on or
+after the transaction's date, which no longer hold.
+
+Lines are entered in the transaction's currency. Posting fixes the
+transaction's exchange rate, and balances move by each line converted to
+the base currency and rounded to cents, so voiding reverses exactly what
+posting applied.
+
+post_journal_entries() is the bulk path used for imports: entries are
+validated in memory and written with bulk_create, and their balance deltas
+are applied in one update.
+"""
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Round
+
+from backend.response_cache import invalidate
+
+from .currency import get_rate_table, round_cents
+from .models import (
+    DEBIT_NORMAL_ACCOUNT_TYPES,
+    Account,
+    FiscalPeriod,
+    PeriodBalance,
+    Transaction,
+    TransactionLine,
+)
+
+BALANCE_FIELD = DecimalField(max_digits=20, decimal_places=2)
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+
+def natural_delta(account_type, debits, credits):
+    """Net movement of an account expressed in its normal balance sign."""
+    if account_type in DEBIT_NORMAL_ACCOUNT_TYPES:
+        return debits - credits
+    return credits - debits
+
+
+def natural_balance_expression(debits, credits, account_type_field="account_type"):
+    """ORM counterpart of natural_delta() for set-based queries."""
+    return Case(
+        When(
+            **{f"{account_type_field}__in": DEBIT_NORMAL_ACCOUNT_TYPES},
+            then=debits - credits,
+        ),
+        default=credits - debits,
+        output_field=BALANCE_FIELD,
+    )
+
+
+def base_amount(field, transaction_prefix="transaction__"):
+    """A line amount converted at its transaction's exchange rate, rounded to cents."""
+    return Round(
+        F(field) * F(f"{transaction_prefix}exchange_rate"),
+        2,
+        output_field=BALANCE_FIELD,
+    )
+
+
+def get_balance_deltas(transaction_ids):
+    """
+    Return {account_id: delta} for the lines of the given transactions,
+    aggregated in a single grouped query.
+    """
+    rows = (
+        TransactionLine.objects.filter(transaction_id__in=transaction_ids)
+        .values("Account_id", "Account__account_type")
+        .annotate(
+            debits=Sum(base_amount("debit_amount")),
+            credits=Sum(base_amount("credit_amount")),
+        )
+        .order_by()
+    )
+    deltas = {}
+    for row in rows:
+        delta = natural_delta(row["Account__account_type"], row["debits"], row["credits"])
+        if delta:
+            deltas[row["Account_id"]] = delta
+    return deltas
+
+
+def apply_balance_deltas(deltas, sign=1):
+    """
+    Add (or with sign=-1 subtract) the given deltas to Account.current_balance.
+
+    Rows are locked in primary-key order before the update so that concurrent
+    postings touching the same accounts cannot deadlock, then every balance is
+    moved with one UPDATE statement.
+    """
+    if not deltas:
+        return
+    account_ids = sorted(deltas)
+    list(
+        Account.objects.select_for_update()
+        .filter(pk__in=account_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    Account.objects.filter(pk__in=account_ids).update(
+        current_balance=F("current_balance")
+        + Case(
+            *[
+                When(pk=account_id, then=Value(sign * deltas[account_id]))
+                for account_id in account_ids
+            ],
+            default=Value(ZERO),
+            output_field=BALANCE_FIELD,
+        )
+    )
+    # A queryset update sends no post_save, so cached account responses are dropped here
+    invalidate(Account)
+
+
+def validate_balanced(transaction):
+    """Raise ValidationError unless the transaction has lines and debits equal credits."""
+    totals = transaction.lines.aggregate(
+        debits=Sum("debit_amount"), credits=Sum("credit_amount")
+    )
+    if totals["debits"] is None:
+        raise ValidationError("Cannot post a transaction without lines")
+    if totals["debits"] != totals["credits"]:
+        raise ValidationError(
+            f"Transaction is not balanced: debits {totals['debits']} "
+            f"!= credits {totals['credits']}"
+        )
+
+
+def post_transaction(transaction):
+    """Move a draft transaction to posted and apply its lines to account balances."""
+    with db_transaction.atomic():
+        locked = Transaction.objects.select_for_update().get(pk=transaction.pk)
+        if locked.status != "draft":
+            raise ValidationError(
+                f"Only draft transactions can be posted (current status: {locked.status})"
+            )
+        validate_balanced(locked)
+        PeriodBalance.invalidate_from(locked.date)
+        locked.exchange_rate = get_rate_table().rate(locked.currency, locked.date)
+        Transaction.objects.filter(pk=locked.pk).update(
+            exchange_rate=locked.exchange_rate
+        )
+        apply_balance_deltas(get_balance_deltas([locked.pk]))
+        locked.status = "posted"
+        locked.save(update_fields=["status", "exchange_rate", "updated_at"])
+    transaction.status = locked.status
+    transaction.exchange_rate = locked.exchange_rate
+    return transaction
+
+
+def void_transaction(transaction):
+    """Void a transaction, reversing its balance effect if it was posted."""
+    with db_transaction.atomic():
+        locked = Transaction.objects.select_for_update().get(pk=transaction.pk)
+        if locked.status == "void":
+            raise ValidationError("Transaction is already void")
+        if locked.status == "posted":
+            PeriodBalance.invalidate_from(locked.date)
+            apply_balance_deltas(get_balance_deltas([locked.pk]), sign=-1)
+        locked.status = "void"
+        locked.save(update_fields=["status", "updated_at"])
+    transaction.status = locked.status
+    return transaction
+
+
+def rebuild_account_balances():
+    """
+    Recompute every Account.current_balance from posted lines with one
+    set-based UPDATE. Returns the number of accounts updated.
+    """
+    posted_lines = (
+        TransactionLine.objects.filter(
+            Account=OuterRef("pk"), transaction__status="posted"
+        )
+        .order_by()
+        .values("Account")
+    )
+    debits = Subquery(
+        posted_lines.annotate(total=Sum(base_amount("debit_amount"))).values("total"),
+        output_field=BALANCE_FIELD,
+    )
+    credits = Subquery(
+        posted_lines.annotate(total=Sum(base_amount("credit_amount"))).values("total"),
+        output_field=BALANCE_FIELD,
+    )
+    with db_transaction.atomic():
+        updated = Account.objects.update(
+            current_balance=natural_balance_expression(
+                Coalesce(debits, Value(ZERO)), Coalesce(credits, Value(ZERO))
+            )
+        )
+        invalidate(Account)
+        return updated
+
+
+def _parse_amount(value):
+    """Parse a line amount into a non-negative two-place Decimal, or raise ValueError."""
+    amount = Decimal(str(value if value not in (None, "") else 0))
+    if not amount.is_finite() or amount < 0 or amount != amount.quantize(CENT):
+        raise ValueError
+    return amount
+
+
+def _parse_account_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _validate_entry_lines(lines, account_types):
+    """
+    Validate the lines of one journal entry in memory.
+
+    Returns (parsed_lines, total, errors) where parsed_lines is a list of
+    (account_id, debit, credit) tuples.
+    """
+    parsed, errors = [], []
+    total_debit = total_credit = ZERO
+    for position, line in enumerate(lines):
+        raw_account = line.get("Account", line.get("account"))
+        try:
+            debit = _parse_amount(line.get("debit_amount"))
+            credit = _parse_amount(line.get("credit_amount"))
+        except (ArithmeticError, ValueError, TypeError):
+            errors.append(
+                f"Line {position}: amounts must be non-negative "
+                "with at most 2 decimal places"
+            )
+            continue
+        account_id = _parse_account_id(raw_account)
+        if account_id not in account_types:
+            errors.append(f"Line {position}: unknown or inactive account {raw_account!r}")
+        if debit and credit:
+            errors.append(
+                f"Line {position}: a line cannot have both debit and credit amounts"
+            )
+        elif not debit and not credit:
+            errors.append(
+                f"Line {position}: either debit or credit amount must be greater than zero"
+            )
+        parsed.append((account_id, debit, credit))
+        total_debit += debit
+        total_credit += credit
+    if not errors and total_debit != total_credit:
+        errors.append(
+            f"Entry is not balanced: debits {total_debit} != credits {total_credit}"
+        )
+    return parsed, total_debit, errors
+
+
+def post_journal_entries(entries, user, batch_size=5000):
+    """
+    Validate and write many journal entries at once.
+
+    `entries` is a list of (index, data) pairs where data holds the header
+    fields of a Transaction plus its raw `lines`. Lines are validated in
+    memory against one query for accounts and one for reference numbers,
+    then every valid entry is written with bulk_create inside a single
+    atomic block. Balance deltas of posted entries are applied together.
+
+    Entries dated in a closed fiscal period, or posted in a currency with no
+    exchange rate on their date, are rejected.
+
+    Returns (created_ids, errors) where errors maps index -> messages.
+    """
+    account_ids = set()
+    references = []
+    for _, data in entries:
+        references.append(data["reference_number"])
+        for line in data["lines"]:
+            account_ids.add(_parse_account_id(line.get("Account", line.get("account"))))
+
+    account_types = dict(
+        Account.objects.filter(pk__in=account_ids, is_active=True).values_list(
+            "pk", "account_type"
+        )
+    )
+    taken = set(
+        Transaction.objects.filter(reference_number__in=references).values_list(
+            "reference_number", flat=True
+        )
+    )
+    dates = [data["date"] for _, data in entries]
+    closed_periods = list(
+        FiscalPeriod.objects.filter(
+            status="closed", start_date__lte=max(dates), end_date__gte=min(dates)
+        ).values_list("name", "start_date", "end_date")
+    )
+
+    rates = get_rate_table()
+    errors = {}
+    valid = []
+    for index, data in entries:
+        entry_errors = []
+        reference = data["reference_number"]
+        if reference in taken:
+            entry_errors.append(f"Reference number {reference!r} already exists")
+        taken.add(reference)
+        for name, start_date, end_date in closed_periods:
+            if start_date <= data["date"] <= end_date:
+                entry_errors.append(f"Fiscal period {name} is closed")
+        lines, total, line_errors = _validate_entry_lines(data["lines"], account_types)
+        entry_errors.extend(line_errors)
+        exchange_rate = Decimal("1")
+        if data.get("status", "posted") == "posted":
+            try:
+                exchange_rate = rates.rate(data["currency"], data["date"])
+            except ValidationError as e:
+                entry_errors.extend(e.messages)
+        if entry_errors:
+            errors[index] = entry_errors
+        else:
+            valid.append((data, lines, total, exchange_rate))
+
+    if not valid:
+        return [], errors
+
+    posted_dates = [
+        data["date"] for data, *_ in valid if data.get("status", "posted") == "posted"
+    ]
+    with db_transaction.atomic():
+        if posted_dates:
+            PeriodBalance.invalidate_from(min(posted_dates))
+        transactions = Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    date=data["date"],
+                    description=data.get("description"),
+                    reference_number=data["reference_number"],
+                    status=data.get("status", "posted"),
+                    transaction_type=data.get("transaction_type", "journal"),
+                    total_amount=total,
+                    currency=data["currency"],
+                    exchange_rate=exchange_rate,
+                    created_by=user,
+                )
+                for data, _, total, exchange_rate in valid
+            ],
+            batch_size=batch_size,
+        )
+
+        deltas = {}
+        transaction_lines = []
+        for transaction, (_, lines, _, exchange_rate) in zip(transactions, valid):
+            for account_id, debit, credit in lines:
+                transaction_lines.append(
+                    TransactionLine(
+                        transaction=transaction,
+                        Account_id=account_id,
+                        debit_amount=debit,
+                        credit_amount=credit,
+                    )
+                )
+                if transaction.status == "posted":
+                    deltas[account_id] = deltas.get(account_id, ZERO) + natural_delta(
+                        account_types[account_id],
+                        round_cents(debit * exchange_rate),
+                        round_cents(credit * exchange_rate),
+                    )
+        TransactionLine.objects.bulk_create(transaction_lines, batch_size=batch_size)
+        apply_balance_deltas({pk: delta for pk, delta in deltas.items() if delta})
+
+    return [transaction.pk for transaction in transactions], errors
@@ -0,0 +1,75 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from accounting.models import FiscalPeriod, PeriodBalance, Transaction
+from accounting.reports import build_period_snapshot
+
+
+def month_bounds(day):
+    last = calendar.monthrange(day.year, day.month)[1]
+    return day.replace(day=1), day.replace(day=last)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build monthly PeriodBalance snapshots for every closed month that "
+        "does not have one yet, up to and including --through. Closed fiscal "
+        "periods already have their own snapshots, so months start after the "
+        "last of them; snapshots deleted by backdated postings or voids are "
+        "rebuilt from the latest one left."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--through",
+            help="Last month to snapshot, as YYYY-MM (default: the previous month)",
+        )
+
+    def handle(self, *args, **options):
+        current_month_start = date.today().replace(day=1)
+        if options["through"]:
+            try:
+                through = datetime.strptime(options["through"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--through must be in YYYY-MM format")
+        else:
+            through = current_month_start - timedelta(days=1)
+        _, through_end = month_bounds(through)
+        if through_end >= current_month_start:
+            raise CommandError("Only closed months can be snapshotted")
+
+        latest = max(
+            filter(
+                None,
+                [
+                    PeriodBalance.objects.aggregate(latest=Max("period_end"))["latest"],
+                    FiscalPeriod.objects.filter(status="closed").aggregate(
+                        latest=Max("end_date")
+                    )["latest"],
+                ],
+            ),
+            default=None,
+        )
+        if latest:
+            start = latest + timedelta(days=1)
+        else:
+            start = Transaction.objects.filter(status="posted").aggregate(
+                first=Min("date")
+            )["first"]
+            if start is None:
+                self.stdout.write("No posted transactions to snapshot")
+                return
+
+        # The first period runs from start, which may be mid-month after a fiscal period
+        period_start, period_end = start, month_bounds(start)[1]
+        built = 0
+        while period_end <= through_end:
+            rows = build_period_snapshot(period_start, period_end)
+            self.stdout.write(f"{period_start} - {period_end}: {rows} account snapshots")
+            built += 1
+            period_start, period_end = month_bounds(period_end + timedelta(days=1))
+
+        self.stdout.write(self.style.SUCCESS(f"Built {built} period snapshots"))
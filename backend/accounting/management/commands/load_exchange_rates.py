@@ -0,0 +1,66 @@
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from accounting.currency import clear_rate_cache
+from accounting.models import ExchangeRate, currency_code_validator
+
+
+class Command(BaseCommand):
+    help = (
+        "Load dated exchange rates from a CSV or JSON file with currency, "
+        "rate_date (YYYY-MM-DD) and rate (base currency units per unit). "
+        "Existing rates for the same currency and date are replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row, or a JSON list")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def read_rows(self, path):
+        with open(path, newline="", encoding="utf-8") as handle:
+            if path.endswith(".json"):
+                rows = json.load(handle)
+                if not isinstance(rows, list):
+                    raise CommandError(f"{path} must contain a JSON list of rates")
+                yield from rows
+            else:
+                yield from csv.DictReader(handle)
+
+    def handle(self, *args, **options):
+        rates = {}
+        number = 0
+        try:
+            for number, row in enumerate(self.read_rows(options["path"]), start=1):
+                currency = str(row["currency"]).strip().upper()
+                currency_code_validator(currency)
+                rate_date = date.fromisoformat(str(row["rate_date"]).strip())
+                rate = Decimal(str(row["rate"]).strip())
+                if not rate.is_finite() or rate <= 0:
+                    raise ValueError("rate must be positive")
+                rates[currency, rate_date] = rate
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        except (json.JSONDecodeError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f"Cannot parse {options['path']}: {e}")
+        except (KeyError, TypeError, ValueError, InvalidOperation, ValidationError) as e:
+            raise CommandError(f"Invalid exchange rate on row {number}: {e}")
+
+        with db_transaction.atomic():
+            ExchangeRate.objects.bulk_create(
+                [
+                    ExchangeRate(currency=currency, rate_date=rate_date, rate=rate)
+                    for (currency, rate_date), rate in rates.items()
+                ],
+                batch_size=options["batch_size"],
+                update_conflicts=True,
+                unique_fields=["currency", "rate_date"],
+                update_fields=["rate", "updated_at"],
+            )
+        clear_rate_cache()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(rates)} exchange rates"))
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Mark every sent invoice past its due date as overdue with a single UPDATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--as-of", help="Reference date as YYYY-MM-DD (default: today)"
+        )
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options["as_of"]:
+            try:
+                as_of = datetime.strptime(options["as_of"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--as-of must be a valid date in YYYY-MM-DD format")
+        updated = Invoice.objects.mark_overdue(as_of)
+        self.stdout.write(self.style.SUCCESS(f"Marked {updated} invoices as overdue"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounting.ledger import rebuild_account_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute Account.current_balance for every account from posted transaction lines"
+
+    def handle(self, *args, **options):
+        updated = rebuild_account_balances()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt balances for {updated} accounts"))
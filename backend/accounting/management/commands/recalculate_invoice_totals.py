@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from accounting.models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Recompute invoice subtotal, tax and total from invoice lines in one UPDATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Include paid and void invoices (default: unpaid invoices only)",
+        )
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.filter(lines__isnull=False).distinct()
+        if not options["all"]:
+            invoices = invoices.exclude(status__in=["paid", "void"])
+        updated = Invoice.objects.filter(pk__in=invoices.values("pk")).recalculate_totals()
+        self.stdout.write(self.style.SUCCESS(f"Recalculated totals for {updated} invoices"))
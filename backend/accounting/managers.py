@@ -0,0 +1,255 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connections, models
+from django.db.models import (
+    Case,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+# (bucket name, lower bound in days past due, upper bound in days past due)
+AGING_BUCKETS = (
+    ("days_1_30", 1, 30),
+    ("days_31_60", 31, 60),
+    ("days_61_90", 61, 90),
+    ("days_over_90", 91, None),
+)
+
+
+class AccountQuerySet(models.QuerySet):
+    """
+    Custom queryset for Account with chart-of-accounts tree queries.
+
+    Every account stores its materialized path (the account codes from the
+    root down to itself, each followed by "/"), so a subtree is a single
+    indexed prefix match on path.
+    """
+
+    def subtree(self, account):
+        """The account and all of its descendants."""
+        return self.filter(path__startswith=account.path)
+
+    def with_subtree_balance(self):
+        """
+        Annotate subtree_balance: the account's balance rolled up with every
+        descendant's, computed in the same query as the accounts themselves.
+
+        Balances are stored in each account's normal sign, so descendants are
+        summed on a debit-positive basis and converted back to the sign of
+        the node they roll up into.
+        """
+        from .ledger import natural_balance_expression
+        from .models import DEBIT_NORMAL_ACCOUNT_TYPES
+
+        debit_balance = Case(
+            When(account_type__in=DEBIT_NORMAL_ACCOUNT_TYPES, then=F("current_balance")),
+            default=-F("current_balance"),
+            output_field=AMOUNT_FIELD,
+        )
+        descendants = (
+            self.model.objects.filter(path__startswith=OuterRef("path"))
+            .order_by()
+            .annotate(tree=Value(1))
+            .values("tree")
+            .annotate(total=Sum(debit_balance))
+            .values("total")
+        )
+        return self.annotate(
+            subtree_balance=natural_balance_expression(
+                Coalesce(Subquery(descendants, output_field=AMOUNT_FIELD), Value(Decimal("0.00"))),
+                Value(Decimal("0.00")),
+            )
+        )
+
+
+class InvoiceQuerySet(models.QuerySet):
+    """
+    Custom queryset for Invoice with set-based receivables operations.
+    """
+
+    def open(self):
+        """Invoices that have been sent and are still awaiting payment."""
+        return self.filter(status__in=["sent", "overdue"])
+
+    def mark_overdue(self, as_of=None):
+        """
+        Flip every sent invoice whose due date has passed to overdue with a
+        single UPDATE. Returns the number of invoices updated.
+        """
+        return self.filter(status="sent", due_date__lt=as_of or date.today()).update(
+            status="overdue", updated_at=timezone.now()
+        )
+
+    def apply_payment(self, invoice_id, amount):
+        """
+        Add amount (negative to remove a payment) to an invoice's amount_paid
+        and balance_due and move it in or out of the paid status.
+
+        The invoice row is locked with select_for_update and updated with F()
+        expressions, so it must run inside the payment's atomic block.
+        Returns the new amount_paid, balance_due and status.
+        """
+        invoice = self.filter(pk=invoice_id)
+        total_amount, amount_paid, status, due_date = (
+            invoice.select_for_update()
+            .values_list("total_amount", "amount_paid", "status", "due_date")
+            .get()
+        )
+        amount_paid += amount
+        # Lowering the total can leave an invoice overpaid; refunds are
+        # still allowed then, further payments are not
+        balance_due = total_amount - amount_paid
+        if balance_due < 0 and amount > 0:
+            raise ValidationError("Total payments cannot exceed invoice amount")
+        balance_due = max(balance_due, Decimal("0.00"))
+
+        if balance_due == 0 and status in ["sent", "overdue"]:
+            status = "paid"
+        elif balance_due > 0 and status == "paid":
+            status = "overdue" if due_date < date.today() else "sent"
+
+        invoice.update(
+            amount_paid=F("amount_paid") + amount,
+            balance_due=balance_due,
+            status=status,
+            updated_at=timezone.now(),
+        )
+        return {
+            "amount_paid": amount_paid,
+            "balance_due": balance_due,
+            "status": status,
+        }
+
+    def settle_balances(self):
+        """
+        Re-derive balance_due and the paid status from total_amount and
+        amount_paid with a single UPDATE, after totals changed.
+
+        balance_due never drops below zero. Sent and overdue invoices whose
+        payments cover the total become paid, and paid invoices whose total
+        grew past their payments are open again. Returns the number of
+        invoices updated.
+        """
+        return self.update(
+            balance_due=Greatest(
+                F("total_amount") - F("amount_paid"), Value(Decimal("0.00"))
+            ),
+            status=Case(
+                When(
+                    status__in=["sent", "overdue"],
+                    amount_paid__gt=0,
+                    total_amount__lte=F("amount_paid"),
+                    then=Value("paid"),
+                ),
+                When(
+                    status="paid",
+                    total_amount__gt=F("amount_paid"),
+                    due_date__lt=date.today(),
+                    then=Value("overdue"),
+                ),
+                When(
+                    status="paid", total_amount__gt=F("amount_paid"), then=Value("sent")
+                ),
+                default=F("status"),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def recalculate_totals(self):
+        """
+        Recompute subtotal, tax, total_amount and balance_due of every invoice
+        in the queryset from its lines with a single UPDATE ... FROM (SELECT ...).
+
+        Each line is taxed at its own rate and rounded to cents before summing;
+        invoices left without lines drop to zero. balance_due and the paid
+        status are re-derived in the same UPDATE, as in settle_balances().
+        Returns the number of invoices updated.
+        """
+        from .models import InvoiceLine, TaxRate
+
+        connection = connections[self.db]
+        invoice_ids, params = self.order_by().values("pk").query.sql_with_params()
+        qn = connection.ops.quote_name
+        invoice_table = qn(self.model._meta.db_table)
+        line_table = qn(InvoiceLine._meta.db_table)
+        rate_table = qn(TaxRate._meta.db_table)
+        sql = f"""
+            UPDATE {invoice_table} AS invoice
+            SET subtotal = totals.subtotal,
+                tax = totals.tax,
+                total_amount = totals.subtotal + totals.tax,
+                balance_due = GREATEST(
+                    totals.subtotal + totals.tax - invoice.amount_paid, 0
+                ),
+                status = CASE
+                    WHEN invoice.status IN ('sent', 'overdue')
+                         AND invoice.amount_paid > 0
+                         AND totals.subtotal + totals.tax <= invoice.amount_paid
+                        THEN 'paid'
+                    WHEN invoice.status = 'paid'
+                         AND totals.subtotal + totals.tax > invoice.amount_paid
+                        THEN CASE WHEN invoice.due_date < %s
+                                  THEN 'overdue' ELSE 'sent' END
+                    ELSE invoice.status
+                END,
+                updated_at = %s
+            FROM (
+                SELECT target.id AS invoice_id,
+                       COALESCE(SUM(ROUND(line.quantity * line.unit_price, 2)), 0)
+                           AS subtotal,
+                       COALESCE(SUM(ROUND(
+                           ROUND(line.quantity * line.unit_price, 2)
+                           * COALESCE(rate.rate, 0), 2)), 0) AS tax
+                FROM {invoice_table} AS target
+                LEFT JOIN {line_table} AS line ON line.invoice_id = target.id
+                LEFT JOIN {rate_table} AS rate ON rate.id = line.tax_rate_id
+                WHERE target.id IN ({invoice_ids})
+                GROUP BY target.id
+            ) AS totals
+            WHERE invoice.id = totals.invoice_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [date.today(), timezone.now(), *params])
+            return cursor.rowcount
+
+    def aging(self, as_of=None):
+        """
+        Accounts-receivable aging per customer as of the given date.
+
+        Returns one row per customer and currency with the outstanding balance
+        of its open invoices split into current, 1-30, 31-60, 61-90 and 90+
+        days past due, computed by a single grouped query.
+        """
+        as_of = as_of or date.today()
+
+        def outstanding(condition=None):
+            return Coalesce(
+                Sum("balance_due", filter=condition, output_field=AMOUNT_FIELD),
+                Value(Decimal("0.00")),
+            )
+
+        buckets = {"current": outstanding(Q(due_date__gte=as_of))}
+        for name, low, high in AGING_BUCKETS:
+            condition = Q(due_date__lte=as_of - timedelta(days=low))
+            if high is not None:
+                condition &= Q(due_date__gte=as_of - timedelta(days=high))
+            buckets[name] = outstanding(condition)
+
+        return (
+            self.open()
+            .filter(balance_due__gt=0)
+            .values("customer", "customer__name", "currency")
+            .annotate(total=outstanding(), **buckets)
+            .order_by("customer__name", "customer", "currency")
+        )
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('opening_balance', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['period_end', 'account'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'date'], name='accounting__status_216dc9_idx'),
+        ),
+        migrations.AddField(
+            model_name='periodbalance',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='accounting.account'),
+        ),
+        migrations.AddIndex(
+            model_name='periodbalance',
+            index=models.Index(fields=['period_end'], name='accounting__period__e27911_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='periodbalance',
+            unique_together={('account', 'period_end')},
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:48
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_payment_totals(apps, schema_editor):
+    Invoice = apps.get_model('accounting', 'Invoice')
+    Payment = apps.get_model('accounting', 'Payment')
+    paid = (
+        Payment.objects.filter(invoice=OuterRef('pk'))
+        .order_by()
+        .values('invoice')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    Invoice.objects.update(
+        amount_paid=Coalesce(
+            Subquery(paid, output_field=DecimalField(max_digits=20, decimal_places=2)),
+            Value(Decimal('0.00')),
+        )
+    )
+    Invoice.objects.update(balance_due=F('total_amount') - F('amount_paid'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_invoice_status_due_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='balance_due',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.RunPython(backfill_payment_totals, migrations.RunPython.noop),
+    ]
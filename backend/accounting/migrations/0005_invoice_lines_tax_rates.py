@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:49
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def create_standard_tax_rate(apps, schema_editor):
+    # Replaces the 15% rate that used to be hard-coded in Invoice.calculate_totals
+    TaxRate = apps.get_model('accounting', 'TaxRate')
+    TaxRate.objects.get_or_create(name='Standard', defaults={'rate': Decimal('0.1500')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_invoice_payment_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('rate', models.DecimalField(decimal_places=4, max_digits=6)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('quantity', models.DecimalField(decimal_places=2, default=1, max_digits=12)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='accounting.invoice')),
+                ('tax_rate', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lines', to='accounting.taxrate')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(create_standard_tax_rate, migrations.RunPython.noop),
+    ]
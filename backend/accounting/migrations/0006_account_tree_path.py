@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-18 04:12
+
+from django.db import migrations, models
+
+
+def backfill_account_paths(apps, schema_editor):
+    Account = apps.get_model('accounting', 'Account')
+    accounts = {account.pk: account for account in Account.objects.all()}
+
+    def resolve(account):
+        if not account.path:
+            parent_path, parent_depth = '', -1
+            if account.parent_id:
+                parent = resolve(accounts[account.parent_id])
+                parent_path, parent_depth = parent.path, parent.depth
+            account.path = f'{parent_path}{account.account_code}/'
+            account.depth = parent_depth + 1
+        return account
+
+    for account in accounts.values():
+        resolve(account)
+    Account.objects.bulk_update(accounts.values(), ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_invoice_lines_tax_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_account_paths, migrations.RunPython.noop),
+    ]
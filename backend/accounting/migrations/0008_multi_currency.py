@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:59
+
+import accounting.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0007_fiscal_periods'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='currency',
+            field=models.CharField(default=accounting.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Enter a three-letter uppercase ISO 4217 currency code.')]),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='currency',
+            field=models.CharField(default=accounting.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Enter a three-letter uppercase ISO 4217 currency code.')]),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='currency',
+            field=models.CharField(default=accounting.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Enter a three-letter uppercase ISO 4217 currency code.')]),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='exchange_rate',
+            field=models.DecimalField(decimal_places=8, default=1, max_digits=18),
+        ),
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Enter a three-letter uppercase ISO 4217 currency code.')])),
+                ('rate_date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['currency', '-rate_date'],
+                'unique_together': {('currency', 'rate_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 03:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0009_keyset_pagination_indexes'),
+        ('crm', '0006_customer_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['customer', 'issue_date', 'id'], name='accounting__custome_1d7a9e_idx'),
+        ),
+    ]
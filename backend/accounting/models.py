@@ -1,7 +1,14 @@
 from datetime import date
-from decimal import Decimal
-from django.db import models
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.core.validators import RegexValidator
+from django.db import connection, models
+from django.db import transaction as db_transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.contrib.postgres.indexes import BrinIndex
 from django.core.exceptions import ValidationError
+from .managers import AccountQuerySet, InvoiceQuerySet
 
 ASSET_CODE_RANGE = "1"
 LIABILITY_CODE_RANGE = "2"
@@ -18,6 +25,22 @@ ACCOUNT_TYPES = (
     ("expense", "Expense"),
 )
 
+# Account types whose balance increases with debits; the rest are credit-normal
+DEBIT_NORMAL_ACCOUNT_TYPES = ("asset", "expense")
+
+# ISO 4217 alphabetic code
+currency_code_validator = RegexValidator(
+    r"^[A-Z]{3}$", "Enter a three-letter uppercase ISO 4217 currency code."
+)
+
+
+def default_currency():
+    return settings.ACCOUNTING_BASE_CURRENCY
+
+
+# Terminates each account code in Account.path
+ACCOUNT_PATH_SEPARATOR = "/"
+
 
 class Account(models.Model):
     name = models.CharField(max_length=100)
@@ -27,9 +50,13 @@ class Account(models.Model):
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.PROTECT)
     is_active = models.BooleanField(default=True)
     current_balance = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    path = models.CharField(max_length=255, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AccountQuerySet.as_manager()
+
     class Meta:
         ordering = ["account_code"]
         unique_together = ["parent", "name"]
@@ -37,6 +64,62 @@ class Account(models.Model):
     def __str__(self):
         return f"{self.account_code} - {self.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "path" in instance.__dict__:
+            instance._loaded_path = instance.path
+        return instance
+
+    def _original_path(self):
+        """Materialized path as stored in the database, or None for new accounts"""
+        if self._state.adding:
+            return None
+        if hasattr(self, "_loaded_path"):
+            return self._loaded_path
+        return Account.objects.filter(pk=self.pk).values_list("path", flat=True).first()
+
+    def build_path(self):
+        """Materialized path implied by the current parent and account code"""
+        if ACCOUNT_PATH_SEPARATOR in self.account_code:
+            raise ValidationError(
+                f"Account code cannot contain {ACCOUNT_PATH_SEPARATOR!r}"
+            )
+        parent_path = ""
+        if self.parent_id:
+            parent_path = (
+                Account.objects.filter(pk=self.parent_id)
+                .values_list("path", flat=True)
+                .get()
+            )
+        return f"{parent_path}{self.account_code}{ACCOUNT_PATH_SEPARATOR}"
+
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            old_path = self._original_path()
+            new_path = self.build_path()
+            if old_path and new_path != old_path and new_path.startswith(old_path):
+                raise ValidationError(
+                    "An account cannot be moved under itself or one of its descendants"
+                )
+            self.path = new_path
+            self.depth = new_path.count(ACCOUNT_PATH_SEPARATOR) - 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and old_path != new_path:
+                kwargs["update_fields"] = {*update_fields, "path", "depth"}
+            super().save(*args, **kwargs)
+
+            if old_path and old_path != new_path:
+                # Re-point the whole subtree with one UPDATE on the path prefix
+                Account.objects.filter(path__startswith=old_path).exclude(
+                    pk=self.pk
+                ).update(
+                    path=Concat(Value(new_path), Substr("path", len(old_path) + 1)),
+                    depth=F("depth")
+                    + (self.depth - old_path.count(ACCOUNT_PATH_SEPARATOR) + 1),
+                )
+        self._loaded_path = self.path
+
 
 TRANSACTION_STATUS = (
     ("draft", "Draft"),
@@ -61,16 +144,88 @@ class Transaction(models.Model):
     )
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     total_amount = models.DecimalField(max_digits=20, decimal_places=2)
+    currency = models.CharField(
+        max_length=3, default=default_currency, validators=[currency_code_validator]
+    )
+    # Base currency units per unit of currency, fixed from ExchangeRate when posted
+    exchange_rate = models.DecimalField(max_digits=18, decimal_places=8, default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey("users.CustomUser", on_delete=models.PROTECT)
 
     class Meta:
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["status", "date"]),
+            BrinIndex(fields=["date"], name="accounting_txn_date_brin"),
+            # Keyset pagination seeks on the list ordering plus the id tie-breaker
+            models.Index(fields=["date", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.reference_number} - {self.description} ({self.total_amount})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "date" in instance.__dict__:
+            instance._loaded_date = instance.date
+        return instance
+
+    def _original_date(self):
+        """Transaction date as stored in the database, or None for new transactions"""
+        if self._state.adding:
+            return None
+        if hasattr(self, "_loaded_date"):
+            return self._loaded_date
+        return Transaction.objects.filter(pk=self.pk).values_list("date", flat=True).first()
+
+    def save(self, *args, **kwargs):
+        original_date = self._original_date()
+        FiscalPeriod.ensure_open(self.date, original_date)
+        with db_transaction.atomic():
+            if (
+                self.status == "posted"
+                and original_date is not None
+                and original_date != self.date
+            ):
+                # Moving posted lines between dates changes every balance in between
+                PeriodBalance.invalidate_from(min(original_date, self.date))
+            super().save(*args, **kwargs)
+        self._loaded_date = self.date
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete a draft transaction. Posted lines have moved account balances,
+        so posted and void transactions are kept and voided instead.
+        """
+        with db_transaction.atomic():
+            status = (
+                Transaction.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list("status", flat=True)
+                .first()
+            )
+            if status not in (None, "draft"):
+                raise ValidationError(
+                    f"Only draft transactions can be deleted (current status: {status}); "
+                    "void the transaction instead"
+                )
+            FiscalPeriod.ensure_open(self._original_date())
+            return super().delete(*args, **kwargs)
+
+    def post(self):
+        """Post the transaction and apply its lines to account balances"""
+        from .ledger import post_transaction
+
+        return post_transaction(self)
+
+    def void(self):
+        """Void the transaction, reversing its balance effect if posted"""
+        from .ledger import void_transaction
+
+        return void_transaction(self)
+
 
 class TransactionLine(models.Model):
     transaction = models.ForeignKey(
@@ -105,6 +260,165 @@ class TransactionLine(models.Model):
         """Returns the non-zero amount (whether it's debit or credit)"""
         return self.debit_amount or self.credit_amount
 
+    def ensure_editable(self):
+        """Lines of posted transactions are in account balances and cannot change"""
+        if self.transaction.status != "draft":
+            raise ValidationError(
+                f"Lines of {self.transaction.status} transactions cannot be changed"
+            )
+        FiscalPeriod.ensure_open(self.transaction.date)
+
+    def save(self, *args, **kwargs):
+        self.ensure_editable()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self.ensure_editable()
+        return super().delete(*args, **kwargs)
+
+
+# Advisory lock key serialising snapshot builds against ledger writes
+SNAPSHOT_LOCK_ID = 7_411_002
+
+
+class PeriodBalance(models.Model):
+    """Snapshot of an account's balance over a closed accounting period"""
+
+    account = models.ForeignKey(
+        Account, on_delete=models.CASCADE, related_name="period_balances"
+    )
+    period_start = models.DateField()
+    period_end = models.DateField()
+
+    # Balances are in the account's normal sign, like Account.current_balance
+    opening_balance = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    credits = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    closing_balance = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["period_end", "account"]
+        unique_together = ["account", "period_end"]
+        indexes = [models.Index(fields=["period_end"])]
+
+    def __str__(self):
+        return f"{self.account} {self.period_start} - {self.period_end}: {self.closing_balance}"
+
+    @staticmethod
+    def lock(shared=True):
+        """
+        Take the transaction-scoped snapshot lock. Ledger writes hold it
+        shared, so they run concurrently; snapshot builds hold it
+        exclusively, so a build never reads lines a write is still changing.
+        """
+        function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {function}(%s)", [SNAPSHOT_LOCK_ID])
+
+    @classmethod
+    def invalidate_from(cls, day):
+        """
+        Delete the snapshots a posted-line change dated day makes stale, that
+        is every snapshot ending on or after it. Call it inside the write's
+        transaction; balances fall back to earlier snapshots until the
+        periods are snapshotted again.
+        """
+        cls.lock(shared=True)
+        cls.objects.filter(period_end__gte=day).delete()
+
+
+class ExchangeRate(models.Model):
+    """Rate of a currency against the base currency, effective from rate_date"""
+
+    currency = models.CharField(max_length=3, validators=[currency_code_validator])
+    rate_date = models.DateField()
+    # Base currency units per unit of currency
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["currency", "-rate_date"]
+        unique_together = ["currency", "rate_date"]
+
+    def __str__(self):
+        return f"{self.currency} {self.rate} ({self.rate_date})"
+
+    def clean(self):
+        if self.rate <= 0:
+            raise ValidationError("Exchange rate must be positive")
+
+
+PERIOD_STATUS = (
+    ("open", "Open"),
+    ("closed", "Closed"),
+)
+
+
+class FiscalPeriod(models.Model):
+    """Accounting period whose transactions are locked once it is closed"""
+
+    name = models.CharField(max_length=50, unique=True)
+    start_date = models.DateField()
+    end_date = models.DateField(unique=True)
+    status = models.CharField(max_length=20, choices=PERIOD_STATUS, default="open")
+    closed_at = models.DateTimeField(null=True, blank=True)
+    closed_by = models.ForeignKey(
+        "users.CustomUser",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="closed_fiscal_periods",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-start_date"]
+        indexes = [models.Index(fields=["status", "start_date", "end_date"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date} - {self.end_date})"
+
+    def clean(self):
+        if self.end_date < self.start_date:
+            raise ValidationError("End date must not be before start date")
+        overlapping = FiscalPeriod.objects.filter(
+            start_date__lte=self.end_date, end_date__gte=self.start_date
+        ).exclude(pk=self.pk)
+        if overlapping.exists():
+            raise ValidationError("Fiscal periods cannot overlap")
+
+    @classmethod
+    def ensure_open(cls, *dates):
+        """Raise ValidationError if any of the given dates falls in a closed period"""
+        condition = models.Q()
+        for value in dates:
+            if value is not None:
+                condition |= models.Q(start_date__lte=value, end_date__gte=value)
+        if not condition:
+            return
+        closed = cls.objects.filter(condition, status="closed").first()
+        if closed:
+            raise ValidationError(
+                f"Fiscal period {closed.name} is closed; its transactions cannot be changed"
+            )
+
+    def close(self, user):
+        """Close the period, writing closing balances and locking its transactions"""
+        from .reports import close_fiscal_period
+
+        return close_fiscal_period(self, user)
+
+    def reopen(self):
+        """Reopen the latest closed period and discard its closing balances"""
+        from .reports import reopen_fiscal_period
+
+        return reopen_fiscal_period(self)
+
 
 INVOICE_STATUS = (
     ("draft", "Draft"),  # Invoice created but not sent
@@ -115,6 +429,9 @@ INVOICE_STATUS = (
 )
 
 
+PAYMENT_TOTAL_FIELDS = ["amount_paid", "balance_due"]
+
+
 class Invoice(models.Model):
     # Relationships
     customer = models.ForeignKey("crm.Customer", on_delete=models.PROTECT)
@@ -129,6 +446,13 @@ class Invoice(models.Model):
     subtotal = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     tax = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    currency = models.CharField(
+        max_length=3, default=default_currency, validators=[currency_code_validator]
+    )
+
+    # Maintained by Payment writes through InvoiceQuerySet.apply_payment
+    amount_paid = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    balance_due = models.DecimalField(max_digits=20, decimal_places=2, default=0)
 
     # Additional Information
     terms_and_conditions = models.TextField(blank=True)
@@ -139,8 +463,15 @@ class Invoice(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey("users.CustomUser", on_delete=models.PROTECT)
 
+    objects = InvoiceQuerySet.as_manager()
+
     class Meta:
         ordering = ["-issue_date", "-invoice_number"]
+        indexes = [
+            models.Index(fields=["status", "due_date"]),
+            models.Index(fields=["issue_date", "id"]),
+            models.Index(fields=["customer", "issue_date", "id"]),
+        ]
 
     def __str__(self):
         return f"Invoice {self.invoice_number} - {self.customer.name}"
@@ -150,12 +481,40 @@ class Invoice(models.Model):
         if self.due_date < self.issue_date:
             raise ValidationError("Due date cannot be before issue date")
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.balance_due = self.total_amount - self.amount_paid
+            return super().save(*args, **kwargs)
+
+        # Never write back payment totals held in memory; concurrent payments
+        # update them in the database with F() expressions
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in PAYMENT_TOTAL_FIELDS
+            ]
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
+        if "total_amount" in update_fields:
+            Invoice.objects.filter(pk=self.pk).settle_balances()
+            self.refresh_from_db(fields=[*PAYMENT_TOTAL_FIELDS, "status"])
+
     def calculate_totals(self):
-        """Calculate invoice totals from line items"""
-        self.subtotal = sum(line.total for line in self.lines.all())
-        # Assuming standard tax rate, could be made more complex
-        self.tax = self.subtotal * Decimal("0.15")  # 15% tax
-        self.total_amount = self.subtotal + self.tax
+        """Recalculate invoice totals from line items and their tax rates"""
+        Invoice.objects.filter(pk=self.pk).recalculate_totals()
+        self.refresh_from_db(
+            fields=[
+                "subtotal",
+                "tax",
+                "total_amount",
+                "balance_due",
+                "status",
+                "updated_at",
+            ]
+        )
 
     def mark_as_sent(self):
         """Mark invoice as sent"""
@@ -176,6 +535,89 @@ class Invoice(models.Model):
             self.save()
 
 
+class TaxRate(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    # Stored as a fraction, e.g. 0.1500 for 15%
+    rate = models.DecimalField(max_digits=6, decimal_places=4)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} ({self.rate * 100:.2f}%)"
+
+    def clean(self):
+        if not Decimal("0") <= self.rate <= Decimal("1"):
+            raise ValidationError("Tax rate must be between 0 and 1")
+
+    def save(self, *args, **kwargs):
+        previous_rate = None
+        if not self._state.adding:
+            previous_rate = (
+                TaxRate.objects.filter(pk=self.pk).values_list("rate", flat=True).first()
+            )
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_rate is not None and previous_rate != self.rate:
+                # Re-price every unpaid invoice that uses this rate in one UPDATE
+                Invoice.objects.exclude(status__in=["paid", "void"]).filter(
+                    pk__in=InvoiceLine.objects.filter(tax_rate=self).values("invoice")
+                ).recalculate_totals()
+
+
+class InvoiceLine(models.Model):
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="lines")
+    description = models.CharField(max_length=255)
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=1)
+    unit_price = models.DecimalField(max_digits=20, decimal_places=2)
+    tax_rate = models.ForeignKey(
+        TaxRate, on_delete=models.PROTECT, null=True, blank=True, related_name="lines"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.description}: {self.quantity} x {self.unit_price}"
+
+    @property
+    def total(self):
+        """Line amount before tax"""
+        # Half away from zero, like ROUND() in InvoiceQuerySet.recalculate_totals
+        return (self.quantity * self.unit_price).quantize(
+            Decimal("0.01"), rounding=ROUND_HALF_UP
+        )
+
+    def ensure_editable(self):
+        """Paid and void invoices are settled; their lines cannot change"""
+        status = (
+            Invoice.objects.select_for_update()
+            .filter(pk=self.invoice_id)
+            .values_list("status", flat=True)
+            .get()
+        )
+        if status in ["paid", "void"]:
+            raise ValidationError(f"Lines of {status} invoices cannot be changed")
+
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            self.ensure_editable()
+            super().save(*args, **kwargs)
+            Invoice.objects.filter(pk=self.invoice_id).recalculate_totals()
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            self.ensure_editable()
+            result = super().delete(*args, **kwargs)
+            Invoice.objects.filter(pk=self.invoice_id).recalculate_totals()
+        return result
+
+
 PAYMENT_METHODS = (
     ("cash", "Cash"),
     ("bank_transfer", "Bank Transfer"),
@@ -196,6 +638,9 @@ class Payment(models.Model):
     payment_date = models.DateField()
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     amount = models.DecimalField(max_digits=20, decimal_places=2)
+    currency = models.CharField(
+        max_length=3, default=default_currency, validators=[currency_code_validator]
+    )
     reference_number = models.CharField(max_length=50, unique=True)
 
     # Additional Information
@@ -208,28 +653,73 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ["-payment_date", "-created_at"]
+        indexes = [models.Index(fields=["payment_date", "id"])]
 
     def __str__(self):
         return f"Payment {self.reference_number} - {self.amount} for Invoice {self.invoice.invoice_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: instance.__dict__[name]
+            for name in ("invoice_id", "amount")
+            if name in instance.__dict__
+        }
+        return instance
+
+    def _original_values(self):
+        """(invoice_id, amount) as stored in the database, or None for new payments"""
+        if self._state.adding:
+            return None
+        loaded = getattr(self, "_loaded_values", {})
+        if len(loaded) == 2:
+            return loaded["invoice_id"], loaded["amount"]
+        return (
+            Payment.objects.filter(pk=self.pk)
+            .values_list("invoice_id", "amount")
+            .first()
+        )
+
     def clean(self):
+        if self.currency != self.invoice.currency:
+            raise ValidationError("Payment currency must match the invoice currency")
+
         # Validate payment amount doesn't exceed invoice remaining balance
-        total_payments = (
-            self.invoice.payments.aggregate(total=models.Sum("amount"))["total"] or 0
-        )
-        if self.id:  # If payment exists, exclude it from total
-            total_payments -= Payment.objects.get(id=self.id).amount
+        remaining = self.invoice.balance_due
+        original = self._original_values()
+        if original and original[0] == self.invoice_id:
+            remaining += original[1]
 
-        if (total_payments + self.amount) > self.invoice.total_amount:
+        if self.amount > remaining:
             raise ValidationError("Total payments cannot exceed invoice amount")
 
     def save(self, *args, **kwargs):
-        # Check if invoice should be marked as paid
-        super().save(*args, **kwargs)
-        total_payments = (
-            self.invoice.payments.aggregate(total=models.Sum("amount"))["total"] or 0
-        )
-
-        if total_payments >= self.invoice.total_amount:
-            self.invoice.mark_as_paid()
-
+        original = self._original_values()
+        adjustments = {self.invoice_id: self.amount}
+        if original:
+            invoice_id, amount = original
+            adjustments[invoice_id] = adjustments.get(invoice_id, 0) - amount
+
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            self._apply_to_invoices(adjustments)
+        self._loaded_values = {"invoice_id": self.invoice_id, "amount": self.amount}
+
+    def delete(self, *args, **kwargs):
+        original = self._original_values()
+        with db_transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if original:
+                self._apply_to_invoices({original[0]: -original[1]})
+        return result
+
+    def _apply_to_invoices(self, adjustments):
+        # Lock invoices in pk order so concurrent payments cannot deadlock
+        for invoice_id in sorted(adjustments):
+            if not adjustments[invoice_id]:
+                continue
+            totals = Invoice.objects.apply_payment(invoice_id, adjustments[invoice_id])
+            if invoice_id == self.invoice_id and Payment.invoice.is_cached(self):
+                for name, value in totals.items():
+                    setattr(self.invoice, name, value)
@@ -36,21 +36,20 @@ class AccModulePermission(BaseModulePermission):
         "create_payment": BaseModulePermission.ROLE_HIERARCHY["staff"],
         "modify_payment": BaseModulePermission.ROLE_HIERARCHY["admin"],
         "delete_payment": BaseModulePermission.ROLE_HIERARCHY["admin"],
+        # Fiscal period permissions
+        "view_fiscal_period": BaseModulePermission.ROLE_HIERARCHY["staff"],
+        "create_fiscal_period": BaseModulePermission.ROLE_HIERARCHY["admin"],
+        "modify_fiscal_period": BaseModulePermission.ROLE_HIERARCHY["admin"],
+        "delete_fiscal_period": BaseModulePermission.ROLE_HIERARCHY["admin"],
+        # Report permissions
+        "view_reports": BaseModulePermission.ROLE_HIERARCHY["staff"],
     }
 
-    def get_required_level(self, action: str) -> int:
-        """Get the minimum role level required for specific actions."""
-        return self.ACTION_LEVELS.get(
-            action, BaseModulePermission.ROLE_HIERARCHY["admin"]
-        )
-
     def has_action_permission(self, request: Request, action: str) -> bool:
         """Check if user has permission for a specific action."""
         if not self.has_module_access(request.user):
             return False
-        user_level = self.get_role_level(request.user)
-        required_level = self.get_required_level(action)
-        return user_level >= required_level
+        return self.matrix.is_allowed(self.module, request.user.role, action)
 
 
 class CanManageAccounts(AccModulePermission):
@@ -119,3 +118,29 @@ class CanManagePayments(AccModulePermission):
         if not action:
             return False
         return self.has_action_permission(request, action)
+
+
+class CanManageFiscalPeriods(AccModulePermission):
+    """Permission class for managing, closing and reopening fiscal periods."""
+
+    def has_permission(self, request: Request, view: APIView) -> bool:
+        action_mapping = {
+            "GET": "view_fiscal_period",
+            "POST": "create_fiscal_period",
+            "PUT": "modify_fiscal_period",
+            "PATCH": "modify_fiscal_period",
+            "DELETE": "delete_fiscal_period",
+        }
+        action = action_mapping.get(request.method)
+        if not action:
+            return False
+        return self.has_action_permission(request, action)
+
+
+class CanViewReports(AccModulePermission):
+    """Permission class for read-only accounting reports."""
+
+    def has_permission(self, request: Request, view: APIView) -> bool:
+        if request.method != "GET":
+            return False
+        return self.has_action_permission(request, "view_reports")
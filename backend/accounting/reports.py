@@ -0,0 +1,313 @@
+"""
+Ledger reports backed by per-period balance snapshots.
+
+Closed periods are summarised once into PeriodBalance rows. A balance as of
+any date is then the closing balance of the latest snapshot on or before that
+date plus the posted lines dated after it, so a report reads at most one
+snapshot and the open-period delta instead of the whole ledger.
+"""
+from datetime import timedelta
+from django.db import transaction as db_transaction
+from django.core.exceptions import ValidationError
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from .ledger import ZERO, base_amount, natural_delta
+from .models import (
+    DEBIT_NORMAL_ACCOUNT_TYPES,
+    Account,
+    FiscalPeriod,
+    PeriodBalance,
+    Transaction,
+    TransactionLine,
+)
+
+
+def posted_lines(date_from=None, date_to=None):
+    """Lines of posted transactions, optionally bounded by transaction date (inclusive)."""
+    lines = TransactionLine.objects.filter(transaction__status="posted")
+    if date_from:
+        lines = lines.filter(transaction__date__gte=date_from)
+    if date_to:
+        lines = lines.filter(transaction__date__lte=date_to)
+    return lines
+
+
+def line_totals(date_from=None, date_to=None, account_ids=None):
+    """
+    Return {account_id: (account_type, debits, credits)} for posted lines in
+    the date range, in the base currency, aggregated in one grouped query.
+    """
+    lines = posted_lines(date_from, date_to)
+    if account_ids is not None:
+        lines = lines.filter(Account_id__in=account_ids)
+    rows = (
+        lines.values("Account_id", "Account__account_type")
+        .annotate(
+            debits=Sum(base_amount("debit_amount")),
+            credits=Sum(base_amount("credit_amount")),
+        )
+        .order_by()
+    )
+    return {
+        row["Account_id"]: (row["Account__account_type"], row["debits"], row["credits"])
+        for row in rows
+    }
+
+
+def latest_snapshot_date(as_of):
+    """End date of the most recent snapshotted period ending on or before as_of."""
+    return PeriodBalance.objects.filter(period_end__lte=as_of).aggregate(
+        latest=Max("period_end")
+    )["latest"]
+
+
+def balances_as_of(as_of, account_ids=None):
+    """Return {account_id: balance} at the end of as_of, in each account's normal sign."""
+    snapshot_date = latest_snapshot_date(as_of)
+    balances = {}
+    if snapshot_date:
+        snapshots = PeriodBalance.objects.filter(period_end=snapshot_date)
+        if account_ids is not None:
+            snapshots = snapshots.filter(account_id__in=account_ids)
+        balances = dict(snapshots.values_list("account_id", "closing_balance"))
+
+    date_from = snapshot_date + timedelta(days=1) if snapshot_date else None
+    for account_id, (account_type, debits, credits) in line_totals(
+        date_from, as_of, account_ids
+    ).items():
+        balances[account_id] = balances.get(account_id, ZERO) + natural_delta(
+            account_type, debits, credits
+        )
+    return balances
+
+
+def trial_balance(as_of):
+    """Balance of every account with activity, split into debit and credit columns."""
+    balances = balances_as_of(as_of)
+    rows = []
+    total_debit = total_credit = ZERO
+    for account in Account.objects.filter(pk__in=balances):
+        balance = balances[account.pk]
+        if not balance:
+            continue
+        if account.account_type in DEBIT_NORMAL_ACCOUNT_TYPES:
+            debit = balance
+        else:
+            debit = -balance
+        row = {
+            "account": account.pk,
+            "account_code": account.account_code,
+            "name": account.name,
+            "account_type": account.account_type,
+            "balance": balance,
+            "debit": debit if debit > 0 else ZERO,
+            "credit": -debit if debit < 0 else ZERO,
+        }
+        total_debit += row["debit"]
+        total_credit += row["credit"]
+        rows.append(row)
+    return {
+        "as_of": as_of,
+        "accounts": rows,
+        "total_debit": total_debit,
+        "total_credit": total_credit,
+    }
+
+
+def account_summaries(date_from, date_to, accounts=None):
+    """
+    Opening balance, period debits/credits and closing balance per account
+    for the date range. Accounts with no balance and no activity are skipped.
+    """
+    accounts = Account.objects.all() if accounts is None else accounts
+    account_ids = list(accounts.values_list("pk", flat=True))
+    opening = balances_as_of(date_from - timedelta(days=1), account_ids)
+    totals = line_totals(date_from, date_to, account_ids)
+
+    rows = []
+    for account in accounts.filter(pk__in=set(opening) | set(totals)):
+        opening_balance = opening.get(account.pk, ZERO)
+        _, debits, credits = totals.get(account.pk, (None, ZERO, ZERO))
+        rows.append(
+            {
+                "account": account.pk,
+                "account_code": account.account_code,
+                "name": account.name,
+                "account_type": account.account_type,
+                "opening_balance": opening_balance,
+                "debits": debits,
+                "credits": credits,
+                "closing_balance": opening_balance
+                + natural_delta(account.account_type, debits, credits),
+            }
+        )
+    return rows
+
+
+def running_balance_before(account, date_from, date_to, first_line):
+    """
+    Balance of an account just before first_line, where lines in the range
+    are ordered by (transaction date, id). Used to seed running balances for
+    a page of account activity.
+    """
+    opening = balances_as_of(date_from - timedelta(days=1), [account.pk]).get(
+        account.pk, ZERO
+    )
+    earlier = (
+        posted_lines(date_from, date_to)
+        .filter(Account=account)
+        .filter(
+            Q(transaction__date__lt=first_line.transaction.date)
+            | Q(transaction__date=first_line.transaction.date, id__lt=first_line.id)
+        )
+        .aggregate(
+            debits=Sum(base_amount("debit_amount")),
+            credits=Sum(base_amount("credit_amount")),
+        )
+    )
+    return opening + natural_delta(
+        account.account_type, earlier["debits"] or ZERO, earlier["credits"] or ZERO
+    )
+
+
+def account_tree(accounts):
+    """
+    Nest accounts annotated with subtree_balance under their parents.
+
+    Accounts are read in path order, which puts every parent before its
+    children, so the tree is assembled in a single pass. Accounts whose
+    parent is not in the queryset are returned as roots.
+    """
+    nodes = {}
+    roots = []
+    for account in accounts.with_subtree_balance().order_by("path"):
+        node = {
+            "id": account.pk,
+            "account_code": account.account_code,
+            "name": account.name,
+            "account_type": account.account_type,
+            "is_active": account.is_active,
+            "depth": account.depth,
+            "balance": account.current_balance,
+            "subtree_balance": account.subtree_balance,
+            "children": [],
+        }
+        nodes[account.pk] = node
+        parent = nodes.get(account.parent_id)
+        (parent["children"] if parent else roots).append(node)
+    return roots
+
+
+def build_period_snapshot(period_start, period_end):
+    """
+    Write (or refresh) a PeriodBalance row for every account for the period.
+    Returns the number of snapshot rows written.
+
+    The snapshot lock is held exclusively while the lines are read, so no
+    posting or void can change them until the snapshot is committed; any
+    later one deletes the snapshot again if it is dated inside it.
+    """
+    with db_transaction.atomic():
+        PeriodBalance.lock(shared=False)
+        opening = balances_as_of(period_start - timedelta(days=1))
+        totals = line_totals(period_start, period_end)
+
+        snapshots = []
+        for account_id, account_type in Account.objects.values_list(
+            "pk", "account_type"
+        ):
+            opening_balance = opening.get(account_id, ZERO)
+            _, debits, credits = totals.get(account_id, (None, ZERO, ZERO))
+            snapshots.append(
+                PeriodBalance(
+                    account_id=account_id,
+                    period_start=period_start,
+                    period_end=period_end,
+                    opening_balance=opening_balance,
+                    debits=debits,
+                    credits=credits,
+                    closing_balance=opening_balance
+                    + natural_delta(account_type, debits, credits),
+                )
+            )
+
+        PeriodBalance.objects.bulk_create(
+            snapshots,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["account", "period_end"],
+            update_fields=[
+                "period_start",
+                "opening_balance",
+                "debits",
+                "credits",
+                "closing_balance",
+                "updated_at",
+            ],
+        )
+    return len(snapshots)
+
+
+def close_fiscal_period(period, user):
+    """
+    Close a fiscal period: write a PeriodBalance snapshot of every account at
+    its end date and lock its transactions against edits.
+
+    Periods must be closed in date order and may not contain draft
+    transactions. Once closed, balances and reports for later dates start
+    from the snapshot, so they only read lines from the open periods.
+    """
+    with db_transaction.atomic():
+        locked = FiscalPeriod.objects.select_for_update().get(pk=period.pk)
+        if locked.status == "closed":
+            raise ValidationError(f"Fiscal period {locked.name} is already closed")
+        if FiscalPeriod.objects.filter(
+            status="open", end_date__lt=locked.start_date
+        ).exists():
+            raise ValidationError("Earlier fiscal periods must be closed first")
+        drafts = Transaction.objects.filter(
+            status="draft", date__range=(locked.start_date, locked.end_date)
+        ).count()
+        if drafts:
+            raise ValidationError(
+                f"Fiscal period {locked.name} still has {drafts} draft transactions"
+            )
+
+        build_period_snapshot(locked.start_date, locked.end_date)
+        locked.status = "closed"
+        locked.closed_at = timezone.now()
+        locked.closed_by = user
+        locked.save(update_fields=["status", "closed_at", "closed_by", "updated_at"])
+    period.status, period.closed_at, period.closed_by = (
+        locked.status,
+        locked.closed_at,
+        locked.closed_by,
+    )
+    return period
+
+
+def reopen_fiscal_period(period):
+    """
+    Reopen the most recently closed fiscal period.
+
+    Snapshots ending inside or after the period are deleted, since edits made
+    while it is open would make them stale; balances fall back to the
+    previous snapshot and the posted lines after it.
+    """
+    with db_transaction.atomic():
+        locked = FiscalPeriod.objects.select_for_update().get(pk=period.pk)
+        if locked.status != "closed":
+            raise ValidationError(f"Fiscal period {locked.name} is not closed")
+        if FiscalPeriod.objects.filter(
+            status="closed", start_date__gt=locked.end_date
+        ).exists():
+            raise ValidationError("Later fiscal periods must be reopened first")
+
+        PeriodBalance.invalidate_from(locked.start_date)
+        locked.status = "open"
+        locked.closed_at = None
+        locked.closed_by = None
+        locked.save(update_fields=["status", "closed_at", "closed_by", "updated_at"])
+    period.status, period.closed_at, period.closed_by = "open", None, None
+    return period
@@ -1,6 +1,20 @@
-from django.db import models
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction as db_transaction
 from rest_framework import serializers
-from .models import Account, Transaction, TransactionLine, Invoice, Payment
+from .models import (
+    ACCOUNT_PATH_SEPARATOR,
+    TRANSACTION_TYPES,
+    currency_code_validator,
+    default_currency,
+    Account,
+    FiscalPeriod,
+    Transaction,
+    TransactionLine,
+    Invoice,
+    InvoiceLine,
+    Payment,
+    TaxRate,
+)
 
 
 class AccountSerializer(serializers.ModelSerializer):
@@ -15,10 +29,29 @@ class AccountSerializer(serializers.ModelSerializer):
             "parent",
             "is_active",
             "current_balance",
+            "path",
+            "depth",
             "created_at",
             "updated_at",
         ]
 
+    def validate_account_code(self, value):
+        if ACCOUNT_PATH_SEPARATOR in value:
+            raise serializers.ValidationError(
+                f"Account code cannot contain {ACCOUNT_PATH_SEPARATOR!r}"
+            )
+        return value
+
+    def validate_parent(self, value):
+        """
+        Check that an account is not moved under itself or its own subtree
+        """
+        if value and self.instance and value.path.startswith(self.instance.path):
+            raise serializers.ValidationError(
+                "An account cannot be moved under itself or one of its descendants"
+            )
+        return value
+
 
 class TransactionLineSerializer(serializers.ModelSerializer):
     class Meta:
@@ -49,22 +82,168 @@ class TransactionSerializer(serializers.ModelSerializer):
             "status",
             "transaction_type",
             "total_amount",
+            "currency",
+            "exchange_rate",
             "created_at",
             "updated_at",
             "created_by",
             "lines",
         ]
-        read_only_fields = ["created_at", "updated_at", "created_by"]
+        read_only_fields = ["exchange_rate", "created_at", "updated_at", "created_by"]
+
+    def validate_currency(self, value):
+        instance = self.instance
+        if instance and instance.status != "draft" and value != instance.currency:
+            raise serializers.ValidationError(
+                "Only draft transactions can change currency"
+            )
+        return value
+
+    def validate(self, data):
+        """
+        Check that neither the current nor the new date is in a closed fiscal period
+        """
+        try:
+            FiscalPeriod.ensure_open(
+                data.get("date"), getattr(self.instance, "date", None)
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"date": e.messages})
+        return data
 
     def create(self, validated_data):
         lines_data = self.context.get("lines", [])
-        transaction = Transaction.objects.create(**validated_data)
+        status = validated_data.pop("status", "draft")
 
-        for line_data in lines_data:
-            TransactionLine.objects.create(transaction=transaction, **line_data)
+        with db_transaction.atomic():
+            transaction = Transaction.objects.create(**validated_data)
+
+            TransactionLine.objects.bulk_create(
+                [
+                    TransactionLine(transaction=transaction, **line_data)
+                    for line_data in lines_data
+                ]
+            )
+
+            self._apply_status(transaction, status)
 
         return transaction
 
+    def update(self, instance, validated_data):
+        status = validated_data.pop("status", instance.status)
+
+        with db_transaction.atomic():
+            instance = super().update(instance, validated_data)
+            self._apply_status(instance, status)
+
+        return instance
+
+    def _apply_status(self, transaction, status):
+        """
+        Route status changes through the ledger so account balances are
+        updated atomically with the transition.
+        """
+        if status == transaction.status:
+            return
+        try:
+            if status == "posted":
+                transaction.post()
+            elif status == "void":
+                transaction.void()
+            else:
+                raise DjangoValidationError(
+                    f"Cannot move a {transaction.status} transaction back to {status}"
+                )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"status": e.messages})
+
+
+class JournalEntrySerializer(serializers.Serializer):
+    """
+    Header of one entry in a bulk journal posting. Lines are kept as raw
+    dicts and validated in memory by ledger.post_journal_entries.
+    """
+
+    date = serializers.DateField()
+    description = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True
+    )
+    reference_number = serializers.CharField(max_length=50)
+    transaction_type = serializers.ChoiceField(
+        choices=TRANSACTION_TYPES, default="journal"
+    )
+    status = serializers.ChoiceField(
+        choices=[("draft", "Draft"), ("posted", "Posted")], default="posted"
+    )
+    currency = serializers.CharField(
+        default=default_currency, validators=[currency_code_validator]
+    )
+    lines = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+
+class FiscalPeriodSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FiscalPeriod
+        fields = [
+            "id",
+            "name",
+            "start_date",
+            "end_date",
+            "status",
+            "closed_at",
+            "closed_by",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "status",
+            "closed_at",
+            "closed_by",
+            "created_at",
+            "updated_at",
+        ]
+
+    def validate(self, data):
+        """
+        Check the date range and that it does not overlap another period
+        """
+        if self.instance and self.instance.status == "closed":
+            raise serializers.ValidationError("A closed fiscal period cannot be edited")
+        period = FiscalPeriod(
+            pk=getattr(self.instance, "pk", None),
+            start_date=data.get("start_date", getattr(self.instance, "start_date", None)),
+            end_date=data.get("end_date", getattr(self.instance, "end_date", None)),
+        )
+        try:
+            period.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return data
+
+
+class AccountActivityLineSerializer(serializers.ModelSerializer):
+    date = serializers.DateField(source="transaction.date", read_only=True)
+    reference_number = serializers.CharField(
+        source="transaction.reference_number", read_only=True
+    )
+    description = serializers.CharField(
+        source="transaction.description", read_only=True
+    )
+    currency = serializers.CharField(source="transaction.currency", read_only=True)
+
+    class Meta:
+        model = TransactionLine
+        fields = [
+            "id",
+            "transaction",
+            "date",
+            "reference_number",
+            "description",
+            "currency",
+            "debit_amount",
+            "credit_amount",
+        ]
+
 
 class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -79,13 +258,30 @@ class InvoiceSerializer(serializers.ModelSerializer):
             "subtotal",
             "tax",
             "total_amount",
+            "currency",
+            "amount_paid",
+            "balance_due",
             "terms_and_conditions",
             "notes",
             "created_at",
             "updated_at",
             "created_by",
         ]
-        read_only_fields = ["created_at", "updated_at", "created_by"]
+        read_only_fields = [
+            "amount_paid",
+            "balance_due",
+            "created_at",
+            "updated_at",
+            "created_by",
+        ]
+
+    def validate_currency(self, value):
+        instance = self.instance
+        if instance and instance.amount_paid and value != instance.currency:
+            raise serializers.ValidationError(
+                "Cannot change the currency of an invoice with payments"
+            )
+        return value
 
     def validate(self, data):
         """
@@ -98,6 +294,42 @@ class InvoiceSerializer(serializers.ModelSerializer):
         return data
 
 
+class TaxRateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaxRate
+        fields = ["id", "name", "rate", "is_active", "created_at", "updated_at"]
+        read_only_fields = ["created_at", "updated_at"]
+
+    def validate_rate(self, value):
+        if not 0 <= value <= 1:
+            raise serializers.ValidationError(
+                "Tax rate must be a fraction between 0 and 1"
+            )
+        return value
+
+
+class InvoiceLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InvoiceLine
+        fields = [
+            "id",
+            "invoice",
+            "description",
+            "quantity",
+            "unit_price",
+            "tax_rate",
+            "total",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["invoice", "created_at", "updated_at"]
+
+    def validate_tax_rate(self, value):
+        if value and not value.is_active:
+            raise serializers.ValidationError("Tax rate is not active")
+        return value
+
+
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
@@ -107,6 +339,7 @@ class PaymentSerializer(serializers.ModelSerializer):
             "payment_date",
             "payment_method",
             "amount",
+            "currency",
             "reference_number",
             "notes",
             "created_at",
@@ -117,18 +350,32 @@ class PaymentSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         """
-        Check that payment amount doesn't exceed remaining balance
+        Check that payment amount doesn't exceed remaining balance and that
+        it is in the invoice's currency (which it defaults to)
         """
-        invoice = data["invoice"]
-        total_payments = (
-            invoice.payments.aggregate(total=models.Sum("amount"))["total"] or 0
-        )
+        invoice = data.get("invoice", getattr(self.instance, "invoice", None))
+        amount = data.get("amount", getattr(self.instance, "amount", None))
+        currency = data.setdefault("currency", invoice.currency)
+        if currency != invoice.currency:
+            raise serializers.ValidationError(
+                {"currency": "Payment currency must match the invoice currency"}
+            )
+        remaining = invoice.balance_due
 
-        if self.instance:  # If updating existing payment
-            total_payments -= self.instance.amount
+        # If updating an existing payment on the same invoice
+        if self.instance and self.instance.invoice_id == invoice.pk:
+            remaining += self.instance.amount
 
-        if (total_payments + data["amount"]) > invoice.total_amount:
+        if amount > remaining:
             raise serializers.ValidationError(
                 {"amount": "Total payments cannot exceed invoice amount"}
             )
         return data
+
+    def save(self, **kwargs):
+        # A concurrent payment can still exhaust the balance between validation
+        # and the locked update in Invoice.objects.apply_payment
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"amount": e.messages})
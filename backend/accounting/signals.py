@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .currency import clear_rate_cache
+from .models import ExchangeRate
+
+
+@receiver([post_save, post_delete], sender=ExchangeRate)
+def invalidate_rate_cache(sender, **kwargs):
+    """Drop this process's cached rate table when an exchange rate changes."""
+    clear_rate_cache()
@@ -1,3 +1,930 @@
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .currency import RateTable
+from .ledger import post_journal_entries, rebuild_account_balances
+from crm.models import Customer
+from .models import (
+    Account,
+    ExchangeRate,
+    FiscalPeriod,
+    Invoice,
+    InvoiceLine,
+    Payment,
+    PeriodBalance,
+    TaxRate,
+    Transaction,
+    TransactionLine,
+)
+from .reports import balances_as_of, build_period_snapshot
+from .serializers import PaymentSerializer
+
+User = get_user_model()
+
+
+class LedgerTestMixin:
+    def setUp(self):
+        """
+        Set up a user and a small chart of accounts
+        """
+        self.user = User.objects.create_user(
+            email="ledger@mail.com",
+            password="blindspot",
+            first_name="Ledger",
+            last_name="Admin",
+            role="accounting_admin",
+        )
+        self.cash = Account.objects.create(name="Cash", account_type="asset", account_code="1000")
+        self.sales = Account.objects.create(name="Sales", account_type="income", account_code="4000")
+
+    def make_transaction(self, reference, amount, status="draft", txn_date=None):
+        transaction = Transaction.objects.create(
+            date=txn_date or date(2024, 1, 15),
+            reference_number=reference,
+            transaction_type="journal",
+            total_amount=amount,
+            created_by=self.user,
+        )
+        TransactionLine.objects.create(transaction=transaction, Account=self.cash, debit_amount=amount)
+        TransactionLine.objects.create(transaction=transaction, Account=self.sales, credit_amount=amount)
+        if status == "posted":
+            transaction.post()
+        return transaction
+
+    def balances(self):
+        self.cash.refresh_from_db()
+        self.sales.refresh_from_db()
+        return self.cash.current_balance, self.sales.current_balance
+
+
+class BalanceEngineTest(LedgerTestMixin, APITestCase):
+    def test_post_and_void_update_balances(self):
+        """
+        Posting applies line deltas in each account's normal sign; voiding reverses them
+        """
+        transaction = self.make_transaction("JE-1", Decimal("100.00"))
+        self.assertEqual(self.balances(), (0, 0))
+
+        transaction.post()
+        self.assertEqual(self.balances(), (Decimal("100.00"), Decimal("100.00")))
+
+        transaction.void()
+        self.assertEqual(self.balances(), (0, 0))
+
+    def test_cannot_post_unbalanced_or_twice(self):
+        """
+        Unbalanced or already posted transactions are rejected without touching balances
+        """
+        transaction = self.make_transaction("JE-1", Decimal("50.00"), status="posted")
+        with self.assertRaises(ValidationError):
+            transaction.post()
+
+        unbalanced = self.make_transaction("JE-2", Decimal("10.00"))
+        unbalanced.lines.filter(Account=self.sales).update(credit_amount=Decimal("9.00"))
+        with self.assertRaises(ValidationError):
+            unbalanced.post()
+        self.assertEqual(self.balances(), (Decimal("50.00"), Decimal("50.00")))
+
+    def test_posted_transactions_cannot_be_deleted(self):
+        """
+        Deleting a posted transaction or editing its lines is refused, so balances cannot drift
+        """
+        transaction = self.make_transaction("JE-1", Decimal("100.00"), status="posted")
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(f"/api/accounting/transactions/{transaction.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(transaction.lines.count(), 2)
+        with self.assertRaises(ValidationError):
+            transaction.lines.first().delete()
+        self.assertEqual(self.balances(), (Decimal("100.00"), Decimal("100.00")))
+
+        transaction.void()
+        with self.assertRaises(ValidationError):
+            Transaction.objects.get(pk=transaction.pk).delete()
+
+        draft = self.make_transaction("JE-2", Decimal("10.00"))
+        response = self.client.delete(f"/api/accounting/transactions/{draft.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.balances(), (0, 0))
+
+    def test_rebuild_matches_incremental_balances(self):
+        """
+        The set-based rebuild reproduces the incrementally maintained balances
+        """
+        self.make_transaction("JE-1", Decimal("70.00"), status="posted")
+        self.make_transaction("JE-2", Decimal("30.00"), status="posted")
+        self.make_transaction("JE-3", Decimal("999.00"))
+        expected = self.balances()
+
+        Account.objects.update(current_balance=0)
+        rebuild_account_balances()
+        self.assertEqual(self.balances(), expected)
+
+
+class PeriodReportTest(LedgerTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_transaction("JE-1", Decimal("100.00"), status="posted", txn_date=date(2024, 1, 10))
+        self.make_transaction("JE-2", Decimal("40.00"), status="posted", txn_date=date(2024, 2, 5))
+        self.make_transaction("JE-3", Decimal("5.00"), txn_date=date(2024, 2, 6))
+
+    def test_balances_combine_snapshot_and_open_period(self):
+        """
+        Balances read the latest snapshot plus posted lines after it
+        """
+        build_period_snapshot(date(2024, 1, 1), date(2024, 1, 31))
+        snapshot = PeriodBalance.objects.get(account=self.cash, period_end=date(2024, 1, 31))
+        self.assertEqual(snapshot.closing_balance, Decimal("100.00"))
+
+        # The snapshot is trusted for January, so only February lines are summed
+        TransactionLine.objects.filter(transaction__reference_number="JE-1").delete()
+        balances = balances_as_of(date(2024, 2, 29))
+        self.assertEqual(balances[self.cash.pk], Decimal("140.00"))
+        self.assertEqual(balances_as_of(date(2024, 1, 31))[self.sales.pk], Decimal("100.00"))
+
+    def test_backdated_posts_and_voids_drop_stale_snapshots(self):
+        """
+        Posting or voiding inside a snapshotted range deletes the snapshots it makes stale
+        """
+        build_period_snapshot(date(2024, 1, 1), date(2024, 1, 31))
+        build_period_snapshot(date(2024, 2, 1), date(2024, 2, 29))
+        backdated = self.make_transaction(
+            "JE-4", Decimal("50.00"), status="posted", txn_date=date(2024, 2, 15)
+        )
+        self.assertEqual(
+            list(PeriodBalance.objects.order_by().values_list("period_end", flat=True).distinct()),
+            [date(2024, 1, 31)],
+        )
+        self.assertEqual(balances_as_of(date(2024, 12, 31))[self.cash.pk], self.balances()[0])
+
+        build_period_snapshot(date(2024, 2, 1), date(2024, 2, 29))
+        backdated.void()
+        self.assertFalse(PeriodBalance.objects.filter(period_end=date(2024, 2, 29)).exists())
+        self.assertEqual(balances_as_of(date(2024, 12, 31))[self.cash.pk], Decimal("140.00"))
+
+        # Moving a posted transaction to another date invalidates from the earlier one
+        build_period_snapshot(date(2024, 2, 1), date(2024, 2, 29))
+        moved = Transaction.objects.get(reference_number="JE-2")
+        moved.date = date(2024, 1, 20)
+        moved.save()
+        self.assertFalse(PeriodBalance.objects.exists())
+        self.assertEqual(balances_as_of(date(2024, 1, 31))[self.cash.pk], Decimal("140.00"))
+
+    def test_snapshot_command_starts_after_closed_fiscal_periods(self):
+        """
+        Monthly snapshots do not overlap the snapshot of a closed fiscal period
+        """
+        period = FiscalPeriod.objects.create(
+            name="2024-01", start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)
+        )
+        period.close(self.user)
+        call_command("build_period_snapshots", through="2024-02", stdout=StringIO())
+        self.assertEqual(
+            sorted(set(PeriodBalance.objects.values_list("period_start", "period_end"))),
+            [(date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 2, 1), date(2024, 2, 29))],
+        )
+        self.assertEqual(balances_as_of(date(2024, 2, 29))[self.cash.pk], Decimal("140.00"))
+
+    def test_trial_balance_endpoint(self):
+        """
+        Trial balance splits balances into debit and credit columns that agree
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/accounting/reports/trial-balance/", {"as_of": "2024-12-31"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_debit"], Decimal("140.00"))
+        self.assertEqual(response.data["total_debit"], response.data["total_credit"])
+
+    def test_account_activity_running_balance(self):
+        """
+        Account activity pages carry a running balance seeded from the opening balance
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(
+            f"/api/accounting/accounts/{self.cash.pk}/activity/",
+            {"date_from": "2024-02-01", "date_to": "2024-02-29"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["closing_balance"], Decimal("140.00"))
+        lines = response.data["lines"]["results"]
+        self.assertEqual([line["balance"] for line in lines], [Decimal("140.00")])
+
+
+class CurrencyTest(LedgerTestMixin, TestCase):
+    def test_rate_table_converts_batches_with_effective_dates(self):
+        """
+        Batch conversion uses the latest rate on or before each row's date
+        """
+        table = RateTable(
+            [("EUR", date(2024, 1, 1), Decimal("1.1")), ("EUR", date(2024, 2, 1), Decimal("1.2"))],
+            base="USD",
+        )
+        rows = [
+            (Decimal("10.00"), "EUR", date(2024, 2, 15)),
+            (Decimal("10.00"), "USD", date(2023, 1, 1)),
+            (Decimal("10.00"), "EUR", date(2024, 1, 31)),
+        ]
+        self.assertEqual(table.convert_many(rows), [Decimal("12.00"), Decimal("10.00"), Decimal("11.00")])
+        with self.assertRaises(ValidationError):
+            table.rate("EUR", date(2023, 12, 31))
+
+    def test_load_exchange_rates_reports_malformed_files(self):
+        """
+        Unparseable files and bad rows fail with a CommandError naming the
+        problem, loading nothing; a valid file replaces rates of the same date
+        """
+        ExchangeRate.objects.create(currency="EUR", rate_date=date(2024, 1, 1), rate=Decimal("1.0"))
+        files = {
+            "broken.json": '[{"currency": "EUR",',
+            "object.json": '{"currency": "EUR"}',
+            "bad-row.json": '[{"currency": "EUR", "rate_date": "2024-01-01", "rate": "1.1"},'
+            ' {"currency": "GBP", "rate_date": "2024-01-01", "rate": "-1"}]',
+            "rates.csv": "currency,rate_date,rate\neur,2024-01-01,1.1\nGBP,2024-01-01,1.25\n",
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            for name, content in files.items():
+                with open(os.path.join(directory, name), "w", encoding="utf-8") as handle:
+                    handle.write(content)
+
+            for name, message in (
+                ("broken.json", "Cannot parse"),
+                ("object.json", "must contain a JSON list"),
+                ("bad-row.json", "Invalid exchange rate on row 2"),
+            ):
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command("load_exchange_rates", os.path.join(directory, name), stdout=StringIO())
+            self.assertEqual(ExchangeRate.objects.get(currency="EUR").rate, Decimal("1.0"))
+
+            call_command("load_exchange_rates", os.path.join(directory, "rates.csv"), stdout=StringIO())
+        self.assertEqual(
+            dict(ExchangeRate.objects.values_list("currency", "rate")),
+            {"EUR": Decimal("1.1"), "GBP": Decimal("1.25")},
+        )
+
+    def test_posting_fixes_rate_and_moves_base_balances(self):
+        """
+        Foreign-currency transactions post at the rate in effect on their date
+        """
+        transaction = self.make_transaction("JE-1", Decimal("100.00"))
+        transaction.currency = "EUR"
+        transaction.save()
+        with self.assertRaises(ValidationError):
+            transaction.post()
+
+        ExchangeRate.objects.create(currency="EUR", rate_date=date(2024, 1, 1), rate=Decimal("1.08"))
+        transaction.post()
+        self.assertEqual(transaction.exchange_rate, Decimal("1.08"))
+        self.assertEqual(self.balances(), (Decimal("108.00"), Decimal("108.00")))
+
+        Account.objects.update(current_balance=0)
+        rebuild_account_balances()
+        self.assertEqual(self.balances(), (Decimal("108.00"), Decimal("108.00")))
+
+
+    def test_half_cent_conversions_round_like_the_database(self):
+        """
+        A bulk-posted half cent rounds away from zero like SQL ROUND(), so voiding
+        it returns the balance to zero and matches a rebuild from the lines
+        """
+        ExchangeRate.objects.create(currency="EUR", rate_date=date(2024, 1, 1), rate=Decimal("0.5"))
+        self.assertEqual(
+            RateTable([("EUR", date(2024, 1, 1), Decimal("0.5"))], base="USD").convert(
+                Decimal("0.05"), "EUR", date(2024, 3, 1)
+            ),
+            Decimal("0.03"),
+        )
+        [pk], errors = post_journal_entries(
+            [
+                (
+                    0,
+                    {
+                        "date": date(2024, 3, 1),
+                        "reference_number": "BULK-1",
+                        "currency": "EUR",
+                        "lines": [
+                            {"Account": self.cash.pk, "debit_amount": "0.05"},
+                            {"Account": self.sales.pk, "credit_amount": "0.05"},
+                        ],
+                    },
+                )
+            ],
+            self.user,
+        )
+        self.assertEqual(errors, {})
+        self.assertEqual(self.balances(), (Decimal("0.03"), Decimal("0.03")))
+
+        Transaction.objects.get(pk=pk).void()
+        self.assertEqual(self.balances(), (0, 0))
+        rebuild_account_balances()
+        self.assertEqual(self.balances(), (0, 0))
+
+class AccountTreeTest(LedgerTestMixin, APITestCase):
+    def test_reparenting_moves_subtree_and_rolls_up_balances(self):
+        """
+        Re-parenting rewrites the whole subtree's paths and the tree endpoint rolls balances up
+        """
+        assets = Account.objects.create(name="Assets", account_type="asset", account_code="1")
+        current = Account.objects.create(name="Current", account_type="asset", account_code="11")
+        self.cash.parent = current
+        self.cash.save()
+        self.assertEqual(self.cash.path, "11/1000/")
+
+        current.parent = assets
+        current.save()
+        self.cash.refresh_from_db()
+        self.assertEqual((self.cash.path, self.cash.depth), ("1/11/1000/", 2))
+        subtree = Account.objects.subtree(assets).order_by("path")
+        self.assertEqual([account.pk for account in subtree], [assets.pk, current.pk, self.cash.pk])
+
+        assets.parent = self.cash
+        with self.assertRaises(ValidationError):
+            assets.save()
+
+        self.make_transaction("JE-1", Decimal("80.00"), status="posted")
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/accounting/accounts/tree/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        root = next(node for node in response.data if node["id"] == assets.pk)
+        self.assertEqual((root["balance"], root["subtree_balance"]), (0, Decimal("80.00")))
+        self.assertEqual(root["children"][0]["children"][0]["id"], self.cash.pk)
+
+
+    def test_moving_a_subtree_through_the_api(self):
+        """
+        Moving a node up or renumbering it rewrites every descendant's path and
+        depth, leaves accounts sharing a code prefix alone, and a move under
+        its own descendant is rejected
+        """
+        assets = Account.objects.create(name="Assets", account_type="asset", account_code="1")
+        current = Account.objects.create(
+            name="Current", account_type="asset", account_code="11", parent=assets
+        )
+        bank = Account.objects.create(
+            name="Bank", account_type="asset", account_code="111", parent=current
+        )
+        self.cash.parent = bank
+        self.cash.save()
+        lookalike = Account.objects.create(name="Other", account_type="asset", account_code="110")
+        self.make_transaction("JE-1", Decimal("80.00"), status="posted")
+        self.client.force_authenticate(self.user)
+
+        response = self.client.patch(
+            f"/api/accounting/accounts/{current.pk}/", {"parent": None}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(
+            f"/api/accounting/accounts/{current.pk}/", {"account_code": "12"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(Account.objects.filter(path__startswith="1").values_list("name", "path")),
+            {
+                "Assets": "1/",
+                "Current": "12/",
+                "Bank": "12/111/",
+                "Cash": "12/111/1000/",
+                "Other": "110/",
+            },
+        )
+        current.refresh_from_db()
+        self.assertEqual(
+            dict(Account.objects.subtree(current).values_list("name", "depth")),
+            {"Current": 0, "Bank": 1, "Cash": 2},
+        )
+
+        response = self.client.patch(
+            f"/api/accounting/accounts/{current.pk}/", {"parent": self.cash.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Account.objects.get(pk=current.pk).path, "12/")
+
+        response = self.client.get("/api/accounting/accounts/tree/")
+        subtree_balances = {node["id"]: node["subtree_balance"] for node in response.data}
+        self.assertEqual(subtree_balances[current.pk], Decimal("80.00"))
+        self.assertEqual(subtree_balances[assets.pk], Decimal("0.00"))
+        self.assertEqual(subtree_balances[lookalike.pk], Decimal("0.00"))
+
+
+class ResponseCacheTest(LedgerTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        caches["responses"].clear()
+        self.client.force_authenticate(self.user)
+
+    def test_account_list_is_served_from_cache_until_accounts_change(self):
+        """
+        Repeated reads skip the database; saves and balance postings invalidate them
+        """
+        response = self.client.get("/api/accounting/accounts/?ordering=name&is_active=true")
+        self.assertEqual(response["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/accounting/accounts/?is_active=true&ordering=name")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        Account.objects.create(name="Bank", account_type="asset", account_code="1010")
+        response = self.client.get("/api/accounting/accounts/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 3)
+
+        self.make_transaction("JE-1", Decimal("25.00"), status="posted")
+        response = self.client.get(f"/api/accounting/accounts/{self.cash.pk}/")
+        self.assertEqual(response.data["current_balance"], "25.00")
+        self.make_transaction("JE-2", Decimal("5.00"), status="posted")
+        response = self.client.get(f"/api/accounting/accounts/{self.cash.pk}/")
+        self.assertEqual((response["X-Cache"], response.data["current_balance"]), ("MISS", "30.00"))
+
+    def test_entries_are_scoped_by_role(self):
+        """
+        Users of another role never receive a response cached for this one
+        """
+        self.client.get("/api/accounting/accounts/tree/")
+        other = User.objects.create_user(
+            email="accountant@mail.com",
+            password="blindspot",
+            first_name="Staff",
+            last_name="Accountant",
+            role="accountant",
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get("/api/accounting/accounts/tree/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/accounting/accounts/tree/")["X-Cache"], "HIT")
+        self.client.force_authenticate(None)
+        response = self.client.get("/api/accounting/accounts/tree/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FiscalPeriodTest(LedgerTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.january = FiscalPeriod.objects.create(
+            name="2024-01", start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)
+        )
+        self.transaction = self.make_transaction("JE-1", Decimal("100.00"), status="posted")
+
+    def test_close_snapshots_balances_and_locks_transactions(self):
+        """
+        Closing writes closing balances and rejects edits dated inside the period
+        """
+        draft = self.make_transaction("JE-2", Decimal("1.00"))
+        with self.assertRaises(ValidationError):
+            self.january.close(self.user)
+        draft.delete()
+
+        self.january.close(self.user)
+        snapshot = PeriodBalance.objects.get(account=self.cash, period_end=date(2024, 1, 31))
+        self.assertEqual(snapshot.closing_balance, Decimal("100.00"))
+        with self.assertRaises(ValidationError):
+            self.transaction.void()
+
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(
+            f"/api/accounting/transactions/{self.transaction.pk}/", {"description": "Edited"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            f"/api/accounting/fiscal-periods/{self.january.pk}/actions/", {"action": "reopen"}
+        )
+        self.assertEqual(response.data, {"status": "open"})
+        self.assertFalse(PeriodBalance.objects.exists())
+        self.transaction.void()
+
+    def test_periods_close_and_reopen_in_order_and_lock_their_dates(self):
+        """
+        Overlapping periods are rejected, periods close oldest first and reopen
+        newest first, and no write can move a transaction into or out of a
+        closed period
+        """
+        february = FiscalPeriod.objects.create(
+            name="2024-02", start_date=date(2024, 2, 1), end_date=date(2024, 2, 29)
+        )
+        march_txn = self.make_transaction("JE-2", Decimal("30.00"), "posted", date(2024, 3, 5))
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/api/accounting/fiscal-periods/",
+            {"name": "2024-Q1", "start_date": "2024-01-15", "end_date": "2024-03-31"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        def act(period, action):
+            return self.client.post(
+                f"/api/accounting/fiscal-periods/{period.pk}/actions/", {"action": action}
+            )
+
+        self.assertEqual(act(february, "close").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(act(self.january, "close").data, {"status": "closed"})
+        self.assertEqual(act(february, "close").data, {"status": "closed"})
+        self.assertEqual(act(self.january, "reopen").status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertRaises(ValidationError):
+            self.make_transaction("JE-3", Decimal("5.00"), txn_date=date(2024, 1, 20))
+        march_txn.date = date(2024, 2, 10)
+        with self.assertRaises(ValidationError):
+            march_txn.save()
+        self.transaction.date = date(2024, 3, 10)
+        with self.assertRaises(ValidationError):
+            self.transaction.save()
+        self.assertEqual(
+            balances_as_of(date(2024, 3, 31))[self.cash.pk], Decimal("130.00")
+        )
+
+        self.assertEqual(act(february, "reopen").data, {"status": "open"})
+        self.assertEqual(
+            set(PeriodBalance.objects.order_by().values_list("period_end", flat=True).distinct()),
+            {date(2024, 1, 31)},
+        )
+        self.assertEqual(act(self.january, "reopen").data, {"status": "open"})
+        self.assertFalse(PeriodBalance.objects.exists())
+        self.transaction.save()
+        self.assertEqual(
+            balances_as_of(date(2024, 1, 31)).get(self.cash.pk, Decimal("0.00")), 0
+        )
+
+    def test_transactions_filter_by_fiscal_period(self):
+        """
+        ?fiscal_period limits the list to the period's dates; a non-integer id is a 400
+        """
+        self.make_transaction("JE-2", Decimal("5.00"), txn_date=date(2024, 2, 5))
+        self.client.force_authenticate(self.user)
+        url = "/api/accounting/transactions/"
+        response = self.client.get(url, {"fiscal_period": self.january.pk})
+        self.assertEqual(
+            [row["reference_number"] for row in response.data["results"]], ["JE-1"]
+        )
+        response = self.client.get(url, {"fiscal_period": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fiscal_period", response.data)
+        response = self.client.get(url, {"fiscal_period": self.january.pk + 100})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkJournalPostingTest(LedgerTestMixin, APITestCase):
+    def entry(self, reference, debit, credit):
+        return {
+            "date": "2024-03-01",
+            "reference_number": reference,
+            "lines": [
+                {"Account": self.cash.pk, "debit_amount": debit},
+                {"Account": self.sales.pk, "credit_amount": credit},
+            ],
+        }
+
+    def test_bulk_post_creates_valid_entries_and_reports_errors(self):
+        """
+        Valid entries are written and posted together; invalid ones are reported by index
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/api/accounting/transactions/bulk/",
+            [
+                self.entry("BULK-1", "25.00", "25.00"),
+                self.entry("BULK-2", "10.00", "9.99"),
+                self.entry("BULK-1", "1.00", "1.00"),
+                self.entry("BULK-3", "5.50", "5.50"),
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual(sorted(response.data["errors"]), [1, 2])
+        self.assertEqual(TransactionLine.objects.count(), 4)
+        self.assertEqual(self.balances(), (Decimal("30.50"), Decimal("30.50")))
+
+    def test_bulk_post_rejects_closed_periods_and_invalid_batches(self):
+        """
+        Entries in closed periods or with bad lines are refused without writing anything
+        """
+        FiscalPeriod.objects.create(
+            name="2024-03", start_date=date(2024, 3, 1), end_date=date(2024, 3, 31)
+        ).close(self.user)
+        self.client.force_authenticate(self.user)
+        bad_line = self.entry("BULK-3", "1.00", "1.00")
+        bad_line["lines"][0]["Account"] = 999999
+        response = self.client.post(
+            "/api/accounting/transactions/bulk/",
+            [self.entry("BULK-1", "25.00", "25.00"), self.entry("BULK-2", "-5.00", "-5.00"), bad_line],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], [])
+        self.assertIn("Fiscal period 2024-03 is closed", response.data["errors"][0])
+        self.assertEqual(sorted(response.data["errors"]), [0, 1, 2])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(self.balances(), (0, 0))
+
+        response = self.client.post("/api/accounting/transactions/bulk/", [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backdated_bulk_post_drops_stale_snapshots(self):
+        """
+        A bulk post dated inside a snapshotted period deletes the snapshots from that date on
+        """
+        self.make_transaction("JE-1", Decimal("100.00"), status="posted", txn_date=date(2024, 2, 10))
+        build_period_snapshot(date(2024, 2, 1), date(2024, 2, 29))
+        build_period_snapshot(date(2024, 3, 1), date(2024, 3, 31))
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/api/accounting/transactions/bulk/", [self.entry("BULK-1", "5.00", "5.00")], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(PeriodBalance.objects.order_by().values_list("period_end", flat=True).distinct()),
+            [date(2024, 2, 29)],
+        )
+        self.assertEqual(balances_as_of(date(2024, 3, 31))[self.cash.pk], Decimal("105.00"))
+
+
+class ExportTest(LedgerTestMixin, APITestCase):
+    def test_transaction_export_streams_filtered_lines(self):
+        """
+        The export streams one CSV row per line of the transactions matching the list filters
+        """
+        self.make_transaction("JE-1", Decimal("12.50"), status="posted")
+        self.make_transaction("JE-2", Decimal("99.00"))
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/accounting/transactions/export/", {"status": "posted"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0].split(",")[:2], ["date", "reference_number"])
+        self.assertEqual([row.split(",")[1] for row in rows[1:]], ["JE-1", "JE-1"])
+        self.assertEqual([row.split(",")[-2:] for row in rows[1:]], [["12.50", "0.00"], ["0.00", "12.50"]])
+
+
+    def test_exports_of_empty_and_filtered_querysets(self):
+        """
+        An export matching nothing is just the header, a filtered export holds
+        every matching row rather than one page, and invalid filters are rejected
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/accounting/transactions/export/", {"status": "void"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0].startswith("date,reference_number,"))
+
+        acme, globex = Customer.objects.create(name="Acme"), Customer.objects.create(name="Globex")
+        for number in range(15):
+            Invoice.objects.create(
+                customer=acme if number % 3 else globex,
+                invoice_number=f"INV-{number:02}",
+                issue_date=date(2024, 1, 1 + number),
+                due_date=date(2024, 2, 1),
+                status="sent",
+                total_amount=Decimal("10.00"),
+                created_by=self.user,
+            )
+        response = self.client.get(
+            "/api/accounting/invoices/export/",
+            {"customer": acme.pk, "ordering": "issue_date"},
+        )
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [row.split(",")[0] for row in rows[1:]],
+            [f"INV-{number:02}" for number in range(15) if number % 3],
+        )
+        self.assertEqual(rows[1].split(",")[-2:], ["0.00", "10.00"])
+
+        response = self.client.get("/api/accounting/invoices/export/", {"search": "Nobody"})
+        self.assertEqual(b"".join(response.streaming_content).decode().count("\n"), 1)
+        response = self.client.get("/api/accounting/invoices/export/", {"status": "bogus"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReceivablesTest(LedgerTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(name="Acme")
+
+    def make_invoice(self, number, due_date, total, status="sent"):
+        return Invoice.objects.create(
+            customer=self.customer,
+            invoice_number=number,
+            issue_date=date(2024, 1, 1),
+            due_date=due_date,
+            status=status,
+            total_amount=total,
+            created_by=self.user,
+        )
+
+    def test_aging_buckets_outstanding_balances(self):
+        """
+        Outstanding balances net of payments land in the right aging bucket
+        """
+        as_of = date(2024, 6, 30)
+        self.make_invoice("INV-1", date(2024, 7, 15), Decimal("100.00"))
+        partly_paid = self.make_invoice("INV-2", date(2024, 6, 10), Decimal("200.00"))
+        self.make_invoice("INV-3", date(2024, 3, 1), Decimal("300.00"), status="overdue")
+        self.make_invoice("INV-4", date(2024, 3, 1), Decimal("999.00"), status="draft")
+        self.pay(partly_paid, Decimal("50.00"), "PAY-1")
+
+        [row] = Invoice.objects.aging(as_of)
+        self.assertEqual(row["current"], Decimal("100.00"))
+        self.assertEqual(row["days_1_30"], Decimal("150.00"))
+        self.assertEqual(row["days_over_90"], Decimal("300.00"))
+        self.assertEqual(row["total"], Decimal("550.00"))
+
+    def pay(self, invoice, amount, reference):
+        return Payment.objects.create(
+            invoice=invoice,
+            payment_date=date(2024, 6, 1),
+            payment_method="cash",
+            amount=amount,
+            reference_number=reference,
+            created_by=self.user,
+        )
+
+    def test_payments_maintain_invoice_totals_and_status(self):
+        """
+        Creating, editing and deleting payments keeps amount_paid, balance_due and status current
+        """
+        invoice = self.make_invoice("INV-1", date(2099, 1, 1), Decimal("100.00"))
+        first = self.pay(invoice, Decimal("60.00"), "PAY-1")
+        second = self.pay(invoice, Decimal("40.00"), "PAY-2")
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.balance_due, invoice.status), (100, 0, "paid"))
+
+        second.amount = Decimal("30.00")
+        second.save()
+        first.delete()
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.balance_due, invoice.status), (30, 70, "sent"))
+
+        with self.assertRaises(ValidationError):
+            self.pay(invoice, Decimal("70.01"), "PAY-3")
+        self.assertFalse(Payment.objects.filter(reference_number="PAY-3").exists())
+
+    def test_overpayments_are_refused(self):
+        """
+        Raising a payment or moving it to another invoice cannot pay more than
+        the balance, and a payment that slips past the serializer's unlocked
+        check is refused with a 400 rather than a server error
+        """
+        first = self.make_invoice("INV-1", date(2099, 1, 1), Decimal("100.00"))
+        second = self.make_invoice("INV-2", date(2099, 1, 1), Decimal("50.00"))
+        payment = self.pay(first, Decimal("80.00"), "PAY-1")
+        self.pay(second, Decimal("20.00"), "PAY-2")
+
+        payment.amount = Decimal("100.01")
+        with self.assertRaises(ValidationError):
+            payment.save()
+        payment.refresh_from_db()
+        payment.invoice = second
+        with self.assertRaises(ValidationError):
+            payment.save()
+
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(
+            f"/api/accounting/payments/{payment.pk}/", {"amount": "100.01"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch.object(PaymentSerializer, "validate", lambda serializer, data: data):
+            response = self.client.post(
+                "/api/accounting/payments/",
+                {
+                    "invoice": second.pk,
+                    "payment_date": "2024-06-01",
+                    "payment_method": "cash",
+                    "amount": "30.01",
+                    "currency": second.currency,
+                    "reference_number": "PAY-3",
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("amount", response.data)
+
+        for invoice, paid in ((first, 80), (second, 20)):
+            invoice.refresh_from_db()
+            self.assertEqual((invoice.amount_paid, invoice.balance_due), (paid, invoice.total_amount - paid))
+        self.assertFalse(Payment.objects.filter(reference_number="PAY-3").exists())
+
+    def test_line_writes_and_rate_changes_recalculate_totals(self):
+        """
+        Invoice totals follow line edits and tax-rate changes, leaving paid invoices alone
+        """
+        vat = TaxRate.objects.create(name="VAT", rate=Decimal("0.1600"))
+        open_invoice = self.make_invoice("INV-1", date(2099, 1, 1), Decimal("0.00"))
+        paid_invoice = self.make_invoice("INV-2", date(2099, 1, 1), Decimal("0.00"))
+        for invoice in (open_invoice, paid_invoice):
+            InvoiceLine.objects.create(
+                invoice=invoice, description="Widget", quantity=3, unit_price=Decimal("10.00"), tax_rate=vat
+            )
+            InvoiceLine.objects.create(invoice=invoice, description="Service", unit_price=Decimal("5.00"))
+        self.pay(paid_invoice, Decimal("39.80"), "PAY-1")
+
+        open_invoice.refresh_from_db()
+        self.assertEqual(
+            (open_invoice.subtotal, open_invoice.tax, open_invoice.total_amount),
+            (35, Decimal("4.80"), Decimal("39.80")),
+        )
+
+        vat.rate = Decimal("0.2000")
+        vat.save()
+        open_invoice.refresh_from_db()
+        paid_invoice.refresh_from_db()
+        self.assertEqual((open_invoice.tax, open_invoice.balance_due), (Decimal("6.00"), Decimal("41.00")))
+        self.assertEqual((paid_invoice.tax, paid_invoice.status), (Decimal("4.80"), "paid"))
+
+    def test_lines_of_paid_and_void_invoices_cannot_change(self):
+        """
+        Adding, editing or deleting lines of a paid or void invoice is refused
+        and its totals stay as they were
+        """
+        paid = self.make_invoice("INV-1", date(2099, 1, 1), Decimal("0.00"))
+        line = InvoiceLine.objects.create(
+            invoice=paid, description="Widget", unit_price=Decimal("10.00")
+        )
+        self.pay(paid, Decimal("10.00"), "PAY-1")
+        void = self.make_invoice("INV-2", date(2099, 1, 1), Decimal("0.00"), status="void")
+
+        line.unit_price = Decimal("12.00")
+        with self.assertRaises(ValidationError):
+            line.save()
+        with self.assertRaises(ValidationError):
+            line.delete()
+        with self.assertRaises(ValidationError):
+            InvoiceLine.objects.create(invoice=void, description="Widget", unit_price=Decimal("1.00"))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            f"/api/accounting/invoices/{paid.pk}/lines/",
+            {"description": "Extra", "unit_price": "5.00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.delete(f"/api/accounting/invoices/{paid.pk}/lines/{line.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        paid.refresh_from_db()
+        self.assertEqual(
+            (paid.total_amount, paid.amount_paid, paid.balance_due, paid.status),
+            (10, 10, 0, "paid"),
+        )
+        self.assertEqual(InvoiceLine.objects.filter(invoice__in=[paid, void]).count(), 1)
+
+    def test_total_changes_rederive_balance_and_status(self):
+        """
+        Lowering the total to what has been paid marks the invoice paid with
+        a zero balance, raising it again reopens it, and refunds on an
+        overpaid invoice never leave a negative balance
+        """
+        invoice = self.make_invoice("INV-1", date(2099, 1, 1), Decimal("0.00"))
+        InvoiceLine.objects.create(invoice=invoice, description="Widget", unit_price=Decimal("60.00"))
+        extra = InvoiceLine.objects.create(
+            invoice=invoice, description="Service", unit_price=Decimal("40.00")
+        )
+        first = self.pay(invoice, Decimal("30.00"), "PAY-1")
+        self.pay(invoice, Decimal("40.00"), "PAY-2")
+
+        extra.delete()
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.total_amount, invoice.balance_due, invoice.status), (60, 0, "paid"))
+
+        invoice.total_amount = Decimal("90.00")
+        invoice.save()
+        self.assertEqual((invoice.balance_due, invoice.status), (20, "sent"))
+
+        invoice.total_amount = Decimal("50.00")
+        invoice.save()
+        self.assertEqual((invoice.balance_due, invoice.status), (0, "paid"))
+        first.delete()
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.balance_due, invoice.status), (40, 10, "sent"))
+
+    def test_mark_overdue_updates_only_past_due_sent_invoices(self):
+        """
+        The batch job flips past-due sent invoices and leaves everything else alone
+        """
+        self.make_invoice("INV-1", date(2024, 1, 10), Decimal("10.00"))
+        self.make_invoice("INV-2", date(2024, 2, 10), Decimal("10.00"))
+        self.make_invoice("INV-3", date(2024, 1, 10), Decimal("10.00"), status="draft")
+
+        self.assertEqual(Invoice.objects.mark_overdue(date(2024, 2, 1)), 1)
+        self.assertEqual(
+            dict(Invoice.objects.values_list("invoice_number", "status")),
+            {"INV-1": "overdue", "INV-2": "sent", "INV-3": "draft"},
+        )
 
-# Create your tests here.
+    def test_mark_overdue_command_rejects_invalid_dates(self):
+        """
+        A malformed or impossible --as-of is an error rather than today
+        """
+        self.make_invoice("INV-1", date(2024, 1, 10), Decimal("10.00"))
+        for as_of in ("yesterday", "2026-13-45"):
+            with self.subTest(as_of=as_of), self.assertRaises(CommandError):
+                call_command("mark_overdue_invoices", as_of=as_of, stdout=StringIO())
+        self.assertEqual(Invoice.objects.get().status, "sent")
+        call_command("mark_overdue_invoices", as_of="2024-02-01", stdout=StringIO())
+        self.assertEqual(Invoice.objects.get().status, "overdue")
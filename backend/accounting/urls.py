@@ -2,13 +2,30 @@ from django.urls import path
 from .views import (
     AccountListCreateView,
     AccountDetailView,
+    AccountTreeView,
     TransactionListCreateView,
     TransactionDetailView,
+    TransactionActionView,
+    TransactionBulkCreateView,
+    TransactionExportView,
+    FiscalPeriodListCreateView,
+    FiscalPeriodDetailView,
+    FiscalPeriodActionView,
     InvoiceListCreateView,
     InvoiceDetailView,
+    InvoiceExportView,
     InvoiceActionView,
+    InvoiceLineListCreateView,
+    InvoiceLineDetailView,
+    TaxRateListCreateView,
+    TaxRateDetailView,
     PaymentListCreateView,
     PaymentDetailView,
+    PaymentExportView,
+    TrialBalanceView,
+    ARAgingView,
+    GeneralLedgerView,
+    AccountActivityView,
 )
 
 
@@ -17,22 +34,84 @@ app_name = "accounting"
 urlpatterns = [
     # Account URLs
     path("accounts/", AccountListCreateView.as_view(), name="account-list"),
+    path("accounts/tree/", AccountTreeView.as_view(), name="account-tree"),
     path("accounts/<int:pk>/", AccountDetailView.as_view(), name="account-detail"),
+    path(
+        "accounts/<int:pk>/activity/",
+        AccountActivityView.as_view(),
+        name="account-activity",
+    ),
     # Transaction URLs
     path("transactions/", TransactionListCreateView.as_view(), name="transaction-list"),
+    path(
+        "transactions/export/",
+        TransactionExportView.as_view(),
+        name="transaction-export",
+    ),
+    path(
+        "transactions/bulk/",
+        TransactionBulkCreateView.as_view(),
+        name="transaction-bulk-create",
+    ),
     path(
         "transactions/<int:pk>/",
         TransactionDetailView.as_view(),
         name="transaction-detail",
     ),
+    path(
+        "transactions/<int:pk>/actions/",
+        TransactionActionView.as_view(),
+        name="transaction-action",
+    ),
+    # Fiscal Period URLs
+    path(
+        "fiscal-periods/",
+        FiscalPeriodListCreateView.as_view(),
+        name="fiscal-period-list",
+    ),
+    path(
+        "fiscal-periods/<int:pk>/",
+        FiscalPeriodDetailView.as_view(),
+        name="fiscal-period-detail",
+    ),
+    path(
+        "fiscal-periods/<int:pk>/actions/",
+        FiscalPeriodActionView.as_view(),
+        name="fiscal-period-action",
+    ),
     # Invoice URLs
     path("invoices/", InvoiceListCreateView.as_view(), name="invoice-list"),
+    path("invoices/export/", InvoiceExportView.as_view(), name="invoice-export"),
     path("invoices/<int:pk>/", InvoiceDetailView.as_view(), name="invoice-detail"),
     path(
         "invoices/<int:pk>/actions/", InvoiceActionView.as_view(), name="invoice-action"
     ),
+    path(
+        "invoices/<int:invoice_pk>/lines/",
+        InvoiceLineListCreateView.as_view(),
+        name="invoice-line-list",
+    ),
+    path(
+        "invoices/<int:invoice_pk>/lines/<int:pk>/",
+        InvoiceLineDetailView.as_view(),
+        name="invoice-line-detail",
+    ),
+    # Tax Rate URLs
+    path("tax-rates/", TaxRateListCreateView.as_view(), name="tax-rate-list"),
+    path("tax-rates/<int:pk>/", TaxRateDetailView.as_view(), name="tax-rate-detail"),
     # Payment URLs
     path("payments/", PaymentListCreateView.as_view(), name="payment-list"),
+    path("payments/export/", PaymentExportView.as_view(), name="payment-export"),
     path("payments/<int:pk>/", PaymentDetailView.as_view(), name="payment-detail"),
+    # Report URLs
+    path("reports/ar-aging/", ARAgingView.as_view(), name="ar-aging"),
+    path(
+        "reports/trial-balance/", TrialBalanceView.as_view(), name="trial-balance"
+    ),
+    path(
+        "reports/general-ledger/",
+        GeneralLedgerView.as_view(),
+        name="general-ledger",
+    ),
 ]
 
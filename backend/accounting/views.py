@@ -1,27 +1,80 @@
+from datetime import date
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
 from rest_framework import generics, filters, status
+from rest_framework.exceptions import ValidationError as APIValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Account, Transaction, Invoice, Payment
+from backend.response_cache import CachedResponseMixin, cache_response
+
+from .models import (
+    Account,
+    FiscalPeriod,
+    Transaction,
+    TransactionLine,
+    Invoice,
+    InvoiceLine,
+    Payment,
+    TaxRate,
+)
+from .managers import AGING_BUCKETS
+from .exports import CSVExportMixin
+from .currency import base_currency, get_rate_table, round_cents
+from .ledger import ZERO, natural_delta, post_journal_entries
+from .reports import (
+    account_summaries,
+    account_tree,
+    balances_as_of,
+    posted_lines,
+    running_balance_before,
+    trial_balance,
+)
 from .serializers import (
+    AccountActivityLineSerializer,
     AccountSerializer,
+    FiscalPeriodSerializer,
     TransactionSerializer,
+    InvoiceLineSerializer,
     InvoiceSerializer,
+    JournalEntrySerializer,
     PaymentSerializer,
+    TaxRateSerializer,
 )
 from .permissions import (
     CanManageAccounts,
+    CanManageFiscalPeriods,
     CanManageTransactions,
     CanManageInvoices,
     CanManagePayments,
+    CanViewReports,
 )
 
 
+def get_date_param(request, name, default=None):
+    """Parse a YYYY-MM-DD query parameter, raising a 400 if it is missing or invalid."""
+    value = request.query_params.get(name)
+    if not value:
+        if default is None:
+            raise APIValidationError({name: "This query parameter is required."})
+        return default
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise APIValidationError({name: "Enter a valid date in YYYY-MM-DD format."})
+    return parsed
+
+
 # Account Views
-class AccountListCreateView(generics.ListCreateAPIView):
+class AccountListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
     permission_classes = [CanManageAccounts]
+    cache_models = [Account]
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -33,10 +86,11 @@ class AccountListCreateView(generics.ListCreateAPIView):
     ordering = ["account_code"]
 
 
-class AccountDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AccountDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
     permission_classes = [CanManageAccounts]
+    cache_models = [Account]
 
     def destroy(self, request, *args, **kwargs):
         account = self.get_object()
@@ -49,6 +103,22 @@ class AccountDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class AccountTreeView(generics.GenericAPIView):
+    """
+    The chart of accounts as a nested tree with each node's own balance and
+    the balance rolled up over its subtree.
+    """
+
+    queryset = Account.objects.all()
+    permission_classes = [CanManageAccounts]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["account_type", "is_active"]
+
+    @cache_response(Account)
+    def get(self, request, *args, **kwargs):
+        return Response(account_tree(self.filter_queryset(self.get_queryset())))
+
+
 # Transaction Views
 class TransactionListCreateView(generics.ListCreateAPIView):
     queryset = Transaction.objects.all()
@@ -64,6 +134,24 @@ class TransactionListCreateView(generics.ListCreateAPIView):
     ordering_fields = ["date", "total_amount"]
     ordering = ["-date"]
 
+    def get_queryset(self):
+        """
+        Optionally restrict to one fiscal period (?fiscal_period=<id>) so the
+        date index only has to scan that period's rows
+        """
+        queryset = super().get_queryset()
+        period_id = self.request.query_params.get("fiscal_period")
+        if period_id:
+            try:
+                period_id = int(period_id)
+            except ValueError:
+                raise APIValidationError({"fiscal_period": "A valid integer is required."})
+            period = get_object_or_404(FiscalPeriod, pk=period_id)
+            queryset = queryset.filter(
+                date__range=(period.start_date, period.end_date)
+            )
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -76,6 +164,162 @@ class TransactionDetailView(generics.RetrieveUpdateDestroyAPIView):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
+    def perform_destroy(self, instance):
+        try:
+            instance.delete()
+        except ValidationError as e:
+            raise APIValidationError({"error": e.messages})
+
+
+class TransactionExportView(CSVExportMixin, TransactionListCreateView):
+    """
+    CSV export of the filtered transactions, one row per transaction line.
+    """
+
+    export_filename = "transactions"
+    export_fields = [
+        ("date", "transaction__date"),
+        ("reference_number", "transaction__reference_number"),
+        ("description", "transaction__description"),
+        ("status", "transaction__status"),
+        ("transaction_type", "transaction__transaction_type"),
+        ("currency", "transaction__currency"),
+        ("exchange_rate", "transaction__exchange_rate"),
+        ("account_code", "Account__account_code"),
+        ("account_name", "Account__name"),
+        ("debit_amount", "debit_amount"),
+        ("credit_amount", "credit_amount"),
+    ]
+
+    def get_export_queryset(self, queryset):
+        return TransactionLine.objects.filter(
+            transaction__in=queryset.order_by().values("pk")
+        ).order_by("transaction__date", "transaction_id", "id")
+
+
+class TransactionBulkCreateView(generics.GenericAPIView):
+    """
+    Create many transactions with their lines in one request.
+
+    Accepts a list of entries (or {"transactions": [...]}) and returns the ids
+    of the created transactions plus per-item errors keyed by list index.
+    """
+
+    queryset = Transaction.objects.all()
+    serializer_class = JournalEntrySerializer
+    permission_classes = [CanManageTransactions]
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get("transactions")
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Expected a non-empty list of transactions"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        entries, errors = [], {}
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                entries.append((index, serializer.validated_data))
+            else:
+                errors[index] = serializer.errors
+
+        created = []
+        if entries:
+            try:
+                created, entry_errors = post_journal_entries(entries, request.user)
+            except IntegrityError:
+                return Response(
+                    {"error": "Conflicting reference numbers, nothing was created"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            errors.update(entry_errors)
+
+        return Response(
+            {"created": created, "errors": dict(sorted(errors.items()))},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class TransactionActionView(generics.GenericAPIView):
+    queryset = Transaction.objects.all()
+    permission_classes = [CanManageTransactions]
+
+    def post(self, request, *args, **kwargs):
+        transaction = self.get_object()
+        action = request.data.get("action")
+
+        try:
+            if action == "post":
+                transaction.post()
+            elif action == "void":
+                transaction.void()
+            else:
+                return Response(
+                    {"error": "Invalid action"}, status=status.HTTP_400_BAD_REQUEST
+                )
+        except ValidationError as e:
+            return Response(
+                {"error": e.messages}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({"status": transaction.status})
+
+
+# Fiscal Period Views
+class FiscalPeriodListCreateView(generics.ListCreateAPIView):
+    queryset = FiscalPeriod.objects.all()
+    serializer_class = FiscalPeriodSerializer
+    permission_classes = [CanManageFiscalPeriods]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ["status"]
+    ordering_fields = ["start_date", "end_date"]
+    ordering = ["-start_date"]
+
+
+class FiscalPeriodDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = FiscalPeriod.objects.all()
+    serializer_class = FiscalPeriodSerializer
+    permission_classes = [CanManageFiscalPeriods]
+
+    def destroy(self, request, *args, **kwargs):
+        period = self.get_object()
+        if period.status == "closed":
+            return Response(
+                {"error": "Cannot delete a closed fiscal period"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        period.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FiscalPeriodActionView(generics.GenericAPIView):
+    queryset = FiscalPeriod.objects.all()
+    permission_classes = [CanManageFiscalPeriods]
+
+    def post(self, request, *args, **kwargs):
+        period = self.get_object()
+        action = request.data.get("action")
+
+        try:
+            if action == "close":
+                period.close(request.user)
+            elif action == "reopen":
+                period.reopen()
+            else:
+                return Response(
+                    {"error": "Invalid action"}, status=status.HTTP_400_BAD_REQUEST
+                )
+        except ValidationError as e:
+            return Response(
+                {"error": e.messages}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({"status": period.status})
+
 
 # Invoice Views
 class InvoiceListCreateView(generics.ListCreateAPIView):
@@ -96,6 +340,23 @@ class InvoiceListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
+class InvoiceExportView(CSVExportMixin, InvoiceListCreateView):
+    export_filename = "invoices"
+    export_fields = [
+        ("invoice_number", "invoice_number"),
+        ("customer", "customer__name"),
+        ("issue_date", "issue_date"),
+        ("due_date", "due_date"),
+        ("status", "status"),
+        ("subtotal", "subtotal"),
+        ("tax", "tax"),
+        ("total_amount", "total_amount"),
+        ("currency", "currency"),
+        ("amount_paid", "amount_paid"),
+        ("balance_due", "balance_due"),
+    ]
+
+
 class InvoiceDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
@@ -126,6 +387,58 @@ class InvoiceActionView(generics.GenericAPIView):
         return Response({"status": "success"})
 
 
+class InvoiceLineListCreateView(generics.ListCreateAPIView):
+    serializer_class = InvoiceLineSerializer
+    permission_classes = [CanManageInvoices]
+
+    def get_queryset(self):
+        return InvoiceLine.objects.filter(invoice_id=self.kwargs["invoice_pk"])
+
+    def perform_create(self, serializer):
+        invoice = get_object_or_404(Invoice, pk=self.kwargs["invoice_pk"])
+        try:
+            serializer.save(invoice=invoice)
+        except ValidationError as e:
+            raise APIValidationError({"error": e.messages})
+
+
+class InvoiceLineDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = InvoiceLineSerializer
+    permission_classes = [CanManageInvoices]
+
+    def get_queryset(self):
+        return InvoiceLine.objects.filter(invoice_id=self.kwargs["invoice_pk"])
+
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except ValidationError as e:
+            raise APIValidationError({"error": e.messages})
+
+    def perform_destroy(self, instance):
+        try:
+            instance.delete()
+        except ValidationError as e:
+            raise APIValidationError({"error": e.messages})
+
+
+# Tax Rate Views
+class TaxRateListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    queryset = TaxRate.objects.all()
+    serializer_class = TaxRateSerializer
+    permission_classes = [CanManageAccounts]
+    cache_models = [TaxRate]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["is_active"]
+
+
+class TaxRateDetailView(CachedResponseMixin, generics.RetrieveUpdateAPIView):
+    queryset = TaxRate.objects.all()
+    serializer_class = TaxRateSerializer
+    permission_classes = [CanManageAccounts]
+    cache_models = [TaxRate]
+
+
 # Payment Views
 class PaymentListCreateView(generics.ListCreateAPIView):
     queryset = Payment.objects.all()
@@ -145,6 +458,20 @@ class PaymentListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
+class PaymentExportView(CSVExportMixin, PaymentListCreateView):
+    export_filename = "payments"
+    export_fields = [
+        ("reference_number", "reference_number"),
+        ("invoice_number", "invoice__invoice_number"),
+        ("customer", "invoice__customer__name"),
+        ("payment_date", "payment_date"),
+        ("payment_method", "payment_method"),
+        ("amount", "amount"),
+        ("currency", "currency"),
+        ("notes", "notes"),
+    ]
+
+
 class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
@@ -152,3 +479,118 @@ class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
+
+
+# Report Views
+class ARAgingView(generics.GenericAPIView):
+    queryset = Invoice.objects.all()
+    permission_classes = [CanViewReports]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["customer"]
+
+    def get(self, request, *args, **kwargs):
+        as_of = get_date_param(request, "as_of", default=date.today())
+        rows = list(self.filter_queryset(self.get_queryset()).aging(as_of))
+        buckets = ["current"] + [name for name, _, _ in AGING_BUCKETS] + ["total"]
+
+        # Rows are per customer and currency; totals are revalued into the
+        # base currency at the as_of rate in one batch
+        rates = get_rate_table()
+        totals = {}
+        try:
+            for bucket in buckets:
+                totals[bucket] = sum(
+                    rates.convert_many(
+                        (row[bucket], row["currency"], as_of) for row in rows
+                    ),
+                    ZERO,
+                )
+        except ValidationError as e:
+            raise APIValidationError({"as_of": e.messages})
+        return Response(
+            {
+                "as_of": as_of,
+                "base_currency": base_currency(),
+                "customers": rows,
+                "totals": totals,
+            }
+        )
+
+
+class TrialBalanceView(generics.GenericAPIView):
+    permission_classes = [CanViewReports]
+
+    def get(self, request, *args, **kwargs):
+        as_of = get_date_param(request, "as_of", default=date.today())
+        return Response(trial_balance(as_of))
+
+
+class GeneralLedgerView(generics.GenericAPIView):
+    queryset = Account.objects.all()
+    permission_classes = [CanViewReports]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["account_type", "is_active", "parent"]
+
+    def get(self, request, *args, **kwargs):
+        date_from = get_date_param(request, "date_from")
+        date_to = get_date_param(request, "date_to")
+        if date_to < date_from:
+            raise APIValidationError({"date_to": "date_to must not be before date_from."})
+        accounts = self.filter_queryset(self.get_queryset())
+        return Response(
+            {
+                "date_from": date_from,
+                "date_to": date_to,
+                "accounts": account_summaries(date_from, date_to, accounts),
+            }
+        )
+
+
+class AccountActivityView(generics.ListAPIView):
+    serializer_class = AccountActivityLineSerializer
+    permission_classes = [CanViewReports]
+
+    def get_queryset(self):
+        return (
+            posted_lines(self.date_from, self.date_to)
+            .filter(Account=self.account)
+            .select_related("transaction")
+            .order_by("transaction__date", "id")
+        )
+
+    def list(self, request, *args, **kwargs):
+        self.account = get_object_or_404(Account, pk=kwargs["pk"])
+        self.date_to = get_date_param(request, "date_to", default=date.today())
+        self.date_from = get_date_param(
+            request, "date_from", default=self.date_to.replace(month=1, day=1)
+        )
+
+        page = self.paginate_queryset(self.get_queryset())
+        lines = page if page is not None else list(self.get_queryset())
+        data = self.get_serializer(lines, many=True).data
+        if lines:
+            balance = running_balance_before(
+                self.account, self.date_from, self.date_to, lines[0]
+            )
+            for line, row in zip(lines, data):
+                rate = line.transaction.exchange_rate
+                balance += natural_delta(
+                    self.account.account_type,
+                    round_cents(line.debit_amount * rate),
+                    round_cents(line.credit_amount * rate),
+                )
+                row["balance"] = balance
+
+        response = (
+            self.get_paginated_response(data) if page is not None else Response(data)
+        )
+        response.data = {
+            "account": self.account.pk,
+            "date_from": self.date_from,
+            "date_to": self.date_to,
+            "closing_balance": balances_as_of(self.date_to, [self.account.pk]).get(
+                self.account.pk, ZERO
+            ),
+            "lines": response.data,
+        }
+        return response
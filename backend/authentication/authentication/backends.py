@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from .hashing import hashing_pool, verify_password
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords on the bounded hashing pool.
+
+    The user is looked up on the request thread and only the hash runs on
+    the pool. Outdated hashes are upgraded with a plain UPDATE, which keeps
+    the password-change token revocation signal from firing on login.
+    Unknown users and wrong passwords return None so the remaining backends
+    still get their turn.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            hashing_pool.run(make_password, password)
+            return None
+
+        is_correct, upgraded = hashing_pool.run(verify_password, password, user.password)
+        if not is_correct:
+            return None
+        if upgraded:
+            UserModel._default_manager.filter(pk=user.pk).update(password=upgraded)
+            user.password = upgraded
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+MARKER_KEY = 'auth:blacklisted:{}'
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized for the expected number of items and false positive rate; the k bit
+    positions of an item come from one blake2b digest by double hashing.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistIndex:
+    """
+    In-process index in front of the token_blacklist tables.
+
+    A Bloom filter of the blacklisted, unexpired jtis answers most checks
+    without a query: a miss means the token was not blacklisted when the
+    filter was built, and blacklistings since then are found through a
+    per-jti marker in the shared cache. Only Bloom hits reach the database,
+    and confirmed blacklistings are kept in a bounded LRU.
+
+    Markers written to a per-process cache are not seen by the other
+    processes, so the filter is only used with TOKEN_BLACKLIST_FILTER on;
+    otherwise every unconfirmed check is a database lookup. The filter is
+    rebuilt every TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS by a background
+    thread while the stale one keeps answering; checks go to the database
+    until the first build is done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+        self._refreshing = False
+        self._confirmed = OrderedDict()
+
+    def _rebuild(self):
+        jtis = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list('token__jti', flat=True)
+        count = jtis.count()
+        bloom = BloomFilter(
+            max(count * 2, 1024), getattr(settings, 'TOKEN_BLACKLIST_FILTER_ERROR_RATE', 0.01)
+        )
+        for jti in jtis.iterator(chunk_size=5000):
+            bloom.add(jti)
+        return bloom
+
+    def refresh(self):
+        """Rebuild the filter from the database in the calling thread."""
+        # Stamp before reading so blacklistings during the rebuild are still
+        # covered by their cache markers
+        built_at = time.monotonic()
+        bloom = self._rebuild()
+        with self._lock:
+            self._bloom = bloom
+            self._built_at = built_at
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Rebuilding the token blacklist filter failed')
+        finally:
+            self._refreshing = False
+            connection.close()
+
+    def bloom(self):
+        """
+        The current filter, or None when checks must go to the database. A
+        missing or stale filter is rebuilt in the background, at most one
+        rebuild at a time.
+        """
+        if not getattr(settings, 'TOKEN_BLACKLIST_FILTER', False):
+            return None
+        rebuild_seconds = getattr(settings, 'TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS', 300)
+        if self._bloom is None or time.monotonic() - self._built_at > rebuild_seconds:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(
+                    target=self._refresh_in_background, name='token-blacklist-refresh', daemon=True
+                ).start()
+        return self._bloom
+
+    def _remember(self, jti):
+        with self._lock:
+            self._confirmed[jti] = True
+            self._confirmed.move_to_end(jti)
+            while len(self._confirmed) > getattr(settings, 'TOKEN_BLACKLIST_LRU_SIZE', 10000):
+                self._confirmed.popitem(last=False)
+
+    def is_blacklisted(self, jti):
+        if jti in self._confirmed:
+            with self._lock:
+                if jti in self._confirmed:
+                    self._confirmed.move_to_end(jti)
+            return True
+        bloom = self.bloom()
+        if bloom is not None and jti not in bloom:
+            if not cache.get(MARKER_KEY.format(jti)):
+                return False
+        elif not BlacklistedToken.objects.filter(token__jti=jti).exists():
+            return False
+        self._remember(jti)
+        return True
+
+    def add(self, jti, expires_at):
+        """Record a new blacklisting locally and for the other processes."""
+        timeout = int((expires_at - timezone.now()).total_seconds())
+        if timeout > 0:
+            cache.set(MARKER_KEY.format(jti), True, timeout=timeout)
+        if self._bloom is not None:
+            self._bloom.add(jti)
+        self._remember(jti)
+
+    def clear(self):
+        with self._lock:
+            self._bloom = None
+            self._built_at = 0.0
+            self._refreshing = False
+            self._confirmed.clear()
+
+
+blacklist_index = BlacklistIndex()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check goes through the in-process index
+    """
+
+    def check_blacklist(self):
+        if blacklist_index.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
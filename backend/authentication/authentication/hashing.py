@@ -0,0 +1,102 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when the pool cannot hash in time: the wait queue is full or the wait timed out."""
+
+
+def verify_password(password, encoded):
+    """
+    Check password against an encoded hash.
+
+    Returns (is_correct, new_encoded) where new_encoded is a fresh hash when
+    the stored one uses an outdated hasher or cost, otherwise None. Only
+    hashing happens here, no database access, so it is safe to run on any
+    thread.
+    """
+    upgraded = []
+    is_correct = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return is_correct, (upgraded[0] if upgraded else None)
+
+
+class HashingPool:
+    """
+    Bounded thread pool for password hashing.
+
+    PBKDF2 releases the GIL, so a pool sized to the CPU count hashes in
+    parallel while capping how many hashes run at once however many request
+    threads are serving logins. At most queue_size calls wait for a worker;
+    beyond that run() fails fast with HashingPoolSaturated instead of letting
+    a login burst pile up behind the CPU, and so does a call still waiting
+    for its result after timeout seconds.
+    """
+
+    def __init__(self, workers=None, queue_size=None, timeout=None):
+        self._workers = workers
+        self._queue_size = queue_size
+        self._timeout = timeout
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return self._workers or getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+
+    @property
+    def queue_size(self):
+        if self._queue_size is not None:
+            return self._queue_size
+        return getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', self.workers * 4)
+
+    @property
+    def timeout(self):
+        return self._timeout or getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 10)
+
+    def _start(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='password-hashing'
+                    )
+        return self._executor
+
+    def submit(self, fn, *args):
+        """Schedule fn(*args) on the pool, or raise HashingPoolSaturated when it is full."""
+        executor = self._start()
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for its result."""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Drop it if it is still queued; a running hash cannot be interrupted
+            future.cancel()
+            raise HashingPoolSaturated()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._slots = None
+
+
+hashing_pool = HashingPool()
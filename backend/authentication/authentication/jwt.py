@@ -1,18 +1,110 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
+# User fields carried in every token; the stateless path builds users from them
+USER_CLAIMS = ('email', 'first_name', 'last_name', 'role', 'primary_module', 'accessible_modules')
+# Issue time in microseconds; iat has whole seconds only, too coarse to tell a
+# token issued just before a revocation from one issued just after it
+ISSUED_AT_CLAIM = 'iat_us'
+REVOCATION_KEY = 'auth:revoked-before:{}'
+
+
+def add_user_claims(token, user):
+    """
+    Copy the user's identity and access fields and the precise issue time into the token
+    """
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[ISSUED_AT_CLAIM] = int(token.current_time.timestamp() * 1_000_000)
+    return token
+
+
 def get_tokens_for_user(user):
     """
     Generate JWT tokens for user with custom claims
     """
-    refresh = RefreshToken.for_user(user)
-    
-    # Add custom claims
-    refresh['role'] = user.role
-    refresh['primary_module'] = user.primary_module
-    refresh['accessible_modules'] = user.accessible_modules
-    refresh['email'] = user.email
+    refresh = add_user_claims(RefreshToken.for_user(user), user)
 
     return {
         'refresh': str(refresh),
-        'access': str(refresh.access_token),
-    }
\ No newline at end of file
+        'access': str(add_user_claims(refresh.access_token, user)),
+    }
+
+
+def revoke_user_tokens(*user_ids):
+    """
+    Reject every access token issued to the users before now on the stateless path.
+
+    The markers only have to outlive the tokens they revoke, so they are kept in
+    the shared cache for one access token lifetime.
+    """
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    now = time.time_ns() // 1000
+    cache.set_many({REVOCATION_KEY.format(user_id): now for user_id in user_ids}, timeout=int(lifetime))
+
+
+def is_token_revoked(user_id, validated_token):
+    revoked_before = cache.get(REVOCATION_KEY.format(user_id))
+    if revoked_before is None:
+        return False
+    # Tokens without the precise claim count from the start of their iat second
+    issued_at = validated_token.get(ISSUED_AT_CLAIM, (validated_token.get('iat') or 0) * 1_000_000)
+    return issued_at < revoked_before
+
+
+class StatelessUserMixin:
+    """
+    Authenticate read-only requests from verified token claims, without loading
+    the user from the database.
+
+    The user is a CustomUser instance whose claim fields are populated and
+    whose remaining fields are deferred, so it can be compared, filtered on and
+    assigned to foreign keys, and any other field is fetched from the database
+    only if a view reads it. Unsafe methods and tokens without the user claims
+    use the regular database lookup.
+
+    Tokens issued before the user's revocation marker are rejected whatever
+    the method. Revocation markers live in the default cache, so
+    JWT_STATELESS_AUTH must only be enabled when that cache is shared by
+    every server process.
+    """
+
+    def authenticate(self, request):
+        self.stateless = (
+            getattr(settings, 'JWT_STATELESS_AUTH', False) and request.method in SAFE_METHODS
+        )
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None and is_token_revoked(user_id, validated_token):
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        if user_id is None or not self.stateless or any(claim not in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+        return self.user_from_claims(user_id, validated_token)
+
+    def user_from_claims(self, user_id, validated_token):
+        User = get_user_model()
+        values = {api_settings.USER_ID_FIELD: user_id, 'is_active': True}
+        values.update((claim, validated_token[claim]) for claim in USER_CLAIMS)
+        fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+        return User.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+
+
+class StatelessJWTAuthentication(StatelessUserMixin, JWTAuthentication):
+    pass
+
+
+class StatelessJWTCookieAuthentication(StatelessUserMixin, JWTCookieAuthentication):
+    pass
@@ -1,7 +1,24 @@
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
 from rest_framework.throttling import AnonRateThrottle
 
 class LoginRateThrottle(AnonRateThrottle):
     """
     Throttle for login attempts
+
+    Counters live in the 'throttle' cache so every process shares one limit.
+    """
+    cache = ConnectionProxy(caches, 'throttle')
+    rate = '5/minute'
+
+class LoginBackpressure(APIException):
+    """
+    Raised when the password hashing pool cannot take another login
     """
-    rate = '5/minute'
\ No newline at end of file
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, please retry shortly.')
+    default_code = 'login_backpressure'
+    wait = 1
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from authentication.authentication.hashing import HashingPool, HashingPoolSaturated, verify_password
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password checks per second through the login hashing pool, '
+        'total and per core, at the configured or a given PBKDF2 cost'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='PBKDF2 iterations to benchmark (default PASSWORD_HASH_ITERATIONS)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hashing pool size (default PASSWORD_HASHING_WORKERS)')
+        parser.add_argument('--clients', type=int, default=None,
+                            help='Concurrent login threads (default twice the pool size)')
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations'] or settings.PASSWORD_HASH_ITERATIONS
+        with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+            encoded = make_password('benchmark-password')
+            pool = HashingPool(workers=options['workers'])
+            clients = options['clients'] or pool.workers * 2
+            counts = [0] * clients
+            rejected = [0] * clients
+            deadline = time.monotonic() + options['seconds']
+
+            def client(index):
+                while time.monotonic() < deadline:
+                    try:
+                        pool.run(verify_password, 'benchmark-password', encoded)
+                    except HashingPoolSaturated:
+                        rejected[index] += 1
+                        time.sleep(0.001)
+                    else:
+                        counts[index] += 1
+
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+            pool.shutdown()
+
+        cores = min(pool.workers, os.cpu_count() or 1)
+        per_second = sum(counts) / elapsed
+        self.stdout.write(f'PBKDF2 iterations: {iterations}')
+        self.stdout.write(f'Pool workers: {pool.workers}, clients: {clients}, cores used: {cores}')
+        self.stdout.write(f'Logins checked: {sum(counts)} in {elapsed:.2f}s, rejected (503): {sum(rejected)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{per_second:.1f} logins/s total, {per_second / cores:.1f} logins/s per core'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from authentication.authentication.blacklist import blacklist_index
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by('pk')
+        deleted_outstanding = deleted_blacklisted = 0
+
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            # Short transactions keep locks brief while a large backlog drains
+            with transaction.atomic():
+                deleted_blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                deleted_outstanding += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+
+        blacklist_index.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted_outstanding} outstanding and {deleted_blacklisted} blacklisted tokens'
+        ))
@@ -2,6 +2,9 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication.hashing import HashingPoolSaturated
+from .authentication.jwt import add_user_claims
+from .authentication.throttling import LoginBackpressure
 
 User = get_user_model()
 
@@ -9,8 +12,15 @@ class LoginSerializer(TokenObtainPairSerializer):
     """
     Custom login serializer that includes additional user info in response
     """
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
-        data = super().validate(attrs)
+        try:
+            data = super().validate(attrs)
+        except HashingPoolSaturated:
+            raise LoginBackpressure()
         # Add extra responses
         data.update({
             'email': self.user.email,
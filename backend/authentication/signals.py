@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication.blacklist import blacklist_index
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def index_blacklisted_token(sender, instance, created, **kwargs):
+    """
+    Add a newly blacklisted token to this process's index and the shared cache.
+    """
+    if created:
+        blacklist_index.add(instance.token.jti, instance.token.expires_at)
@@ -1,6 +1,22 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from allauth.account.auth_backends import AuthenticationBackend
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from authentication.authentication.blacklist import CachedBlacklistRefreshToken, blacklist_index
+from authentication.authentication.hashing import HashingPool
+from authentication.authentication.jwt import REVOCATION_KEY
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
@@ -40,3 +56,211 @@ class LoginTest(APITestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertIn('detail', response.data)
+
+
+@override_settings(JWT_STATELESS_AUTH=True)
+class StatelessAuthenticationTest(APITestCase):
+    def setUp(self):
+        """
+        Set up an accounting user and log them in
+        """
+        caches['throttle'].clear()
+        self.user = User.objects.create_user(
+            email='ledger@mail.com',
+            password='blindspot',
+            first_name='Ledger',
+            last_name='Admin',
+            role='accounting_admin'
+        )
+        self.log_in()
+
+    def log_in(self):
+        response = self.client.post('/api/auth/login/', {
+            'email': 'ledger@mail.com',
+            'password': 'blindspot'
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_read_requests_do_not_query_the_user(self):
+        """
+        Safe requests build the user from token claims instead of the users table
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/accounting/accounts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('users_customuser' in query['sql'] for query in queries))
+
+    def test_user_changes_revoke_outstanding_tokens(self):
+        """
+        Changing a field carried in the token rejects tokens issued before the change
+        """
+        self.user.role = 'accountant'
+        self.user.save()
+        response = self.client.get('/api/accounting/accounts/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Issued within the same second as the revocation, but after it
+        self.log_in()
+        response = self.client.get('/api/accounting/accounts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_revoked_tokens_are_rejected_on_write_requests(self):
+        """
+        Write requests load the user from the database but still honour revocation
+        """
+        self.user.set_password('changed-password')
+        self.user.save()
+        response = self.client.post('/api/accounting/accounts/', {})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post('/api/auth/login/', {'email': 'ledger@mail.com', 'password': 'changed-password'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        response = self.client.post('/api/accounting/accounts/', {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_and_bulk_deactivated_users_lose_access(self):
+        """
+        Deleting a user or deactivating users in bulk revokes their tokens on read requests
+        """
+        User.objects.deactivate(User.objects.filter(pk=self.user.pk))
+        response = self.client.get('/api/accounting/accounts/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.log_in()
+        self.assertEqual(self.client.get('/api/accounting/accounts/').status_code, status.HTTP_200_OK)
+        self.user.delete()
+        response = self.client.get('/api/accounting/accounts/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenBlacklistTest(APITestCase):
+    def setUp(self):
+        """
+        Set up a user with a refresh token
+        """
+        self.user = User.objects.create_user(
+            email='clint@mail.comgg',
+            password='blindspot',
+            first_name='Clinton',
+            last_name='hn',
+            role='hr_admin'
+        )
+        self.refresh = str(CachedBlacklistRefreshToken.for_user(self.user))
+        blacklist_index.clear()
+
+    @override_settings(TOKEN_BLACKLIST_FILTER=True)
+    def test_blacklisted_token_is_rejected_without_querying_valid_ones(self):
+        """
+        Valid tokens are cleared by the Bloom filter; logged-out tokens are rejected
+        """
+        blacklist_index.refresh()
+        with self.assertNumQueries(1):  # the user lookup for fresh claims
+            response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_without_the_filter_blacklistings_elsewhere_are_seen_at_once(self):
+        """
+        With no shared cache every check reads the tables, so a token blacklisted
+        by another process (no local index update, no marker here) is rejected
+        """
+        blacklist_index.refresh()
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get())])
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TOKEN_BLACKLIST_FILTER=True, TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS=0)
+    def test_stale_filter_is_rebuilt_off_the_request_path(self):
+        """
+        A stale filter keeps answering while one background rebuild is started
+        """
+        blacklist_index.refresh()
+        with mock.patch('authentication.authentication.blacklist.threading.Thread') as thread:
+            with self.assertNumQueries(0):
+                self.assertFalse(blacklist_index.is_blacklisted('unknown'))
+                self.assertFalse(blacklist_index.is_blacklisted('other'))
+        thread.return_value.start.assert_called_once_with()
+        blacklist_index.clear()
+
+    def test_prune_deletes_expired_tokens(self):
+        """
+        Expired outstanding tokens and their blacklist entries are removed in batches
+        """
+        CachedBlacklistRefreshToken(self.refresh).blacklist()
+        OutstandingToken.objects.update(expires_at=timezone.now() - timedelta(days=1))
+        call_command('prune_token_blacklist', batch_size=1, stdout=StringIO())
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginThroughputTest(APITestCase):
+    def setUp(self):
+        """
+        Set up a user hashed at a low cost
+        """
+        caches['throttle'].clear()
+        self.user = User.objects.create_user(
+            email='clint@mail.comgg',
+            password='blindspot',
+            first_name='Clinton',
+            last_name='hn',
+            role='hr_admin'
+        )
+        self.login_url = '/api/auth/login/'
+
+    def test_login_upgrades_hash_to_configured_cost(self):
+        """
+        A changed PASSWORD_HASH_ITERATIONS re-hashes the password on login without revoking tokens
+        """
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self.client.post(self.login_url, {'email': 'clint@mail.comgg', 'password': 'blindspot'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertIsNone(caches['default'].get(REVOCATION_KEY.format(self.user.pk)))
+
+    def test_saturated_hashing_pool_returns_503(self):
+        """
+        Logins are refused with 503 instead of queueing when the pool is full
+        """
+        pool = HashingPool(workers=1, queue_size=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+        try:
+            with mock.patch('authentication.authentication.backends.hashing_pool', pool):
+                response = self.client.post(self.login_url, {'email': 'clint@mail.comgg', 'password': 'blindspot'})
+        finally:
+            release.set()
+            pool.shutdown()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_hashing_timeout_returns_503(self):
+        """
+        A login still waiting for a hashing worker after the timeout gets a 503, not a server error
+        """
+        pool = HashingPool(workers=1, queue_size=1, timeout=0.05)
+        release = threading.Event()
+        pool.submit(release.wait)
+        try:
+            with mock.patch('authentication.authentication.backends.hashing_pool', pool):
+                response = self.client.post(self.login_url, {'email': 'clint@mail.comgg', 'password': 'blindspot'})
+        finally:
+            release.set()
+            pool.shutdown()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_wrong_password_falls_through_to_the_next_backend(self):
+        """
+        A wrong password is not final; later authentication backends are still asked
+        """
+        with mock.patch.object(AuthenticationBackend, 'authenticate', return_value=None) as fallback:
+            response = self.client.post(self.login_url, {'email': 'clint@mail.comgg', 'password': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        fallback.assert_called_once()
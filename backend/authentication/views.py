@@ -1,12 +1,17 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
+from django.contrib.auth import get_user_model
 from .serializers import LoginSerializer, PasswordChangeSerializer
+from .authentication.blacklist import CachedBlacklistRefreshToken
+from .authentication.jwt import add_user_claims
 from .authentication.throttling import LoginRateThrottle
 
+User = get_user_model()
+
 class LoginView(TokenObtainPairView):
     """
     Login view that returns JWT tokens and user info
@@ -30,7 +35,7 @@ class LogoutView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             
             token.blacklist()
 
@@ -71,12 +76,20 @@ class TokenRefreshView(APIView):
     """
     View for refreshing access tokens
     """
+    # The refresh token is the credential; the access token may have expired
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
+
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
+            # Re-read the user so the new access token carries current claims
+            user = User.objects.get(pk=token[api_settings.USER_ID_CLAIM], is_active=True)
+            access = add_user_claims(token.access_token, user)
+            access.set_iat()
             return Response({
-                'access': str(token.access_token)
+                'access': str(access)
             }, status=status.HTTP_200_OK)
         except Exception:
             return Response(
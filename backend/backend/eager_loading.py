@@ -0,0 +1,78 @@
+"""
+Serializer-declared eager loading.
+
+A serializer lists the relations its fields read in select_related_fields
+(forward foreign keys, joined into the main query) and
+prefetch_related_fields (reverse and many-to-many relations, one extra
+query each). Views using EagerLoadingViewMixin apply those to their
+queryset, so a list endpoint runs a fixed number of queries whatever the
+page size. Prefetched relations serialized by a nested EagerLoadingMixin
+serializer also get that serializer's own relations, and relations of
+fields a request leaves out (see field_selection) are not prefetched.
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from .field_selection import FieldSelectionMixin, requested_selection
+
+
+class EagerLoadingMixin:
+    """Serializer mixin declaring the relations to load with its queryset."""
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def nested_serializer(cls, source):
+        """The EagerLoadingMixin serializer class rendering the relation at source, if any."""
+        for name, field in cls._declared_fields.items():
+            if (field.source or name) != source:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if isinstance(field, EagerLoadingMixin):
+                return type(field)
+        return None
+
+    @classmethod
+    def rendered(cls, source, fields=None, expand=()):
+        """Whether a field rendering the relation at source is in the response."""
+        for name, field in cls._declared_fields.items():
+            if (field.source or name) != source:
+                continue
+            if name in getattr(cls, 'expandable_fields', ()) and name not in expand:
+                return False
+            return fields is None or name in fields
+        return True
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, expand=()):
+        """
+        Load the serializer's relations with queryset. fields and expand are
+        the request's field selection, for FieldSelectionMixin serializers.
+        """
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        for lookup in cls.prefetch_related_fields:
+            if not cls.rendered(lookup, fields, expand):
+                continue
+            nested = cls.nested_serializer(lookup)
+            if nested is not None:
+                related = nested.Meta.model._default_manager.all()
+                lookup = Prefetch(lookup, queryset=nested.setup_eager_loading(related))
+            queryset = queryset.prefetch_related(lookup)
+        return queryset
+
+
+class EagerLoadingViewMixin:
+    """View mixin applying the serializer's eager loading to get_queryset()."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup_eager_loading is None:
+            return queryset
+        if issubclass(serializer_class, FieldSelectionMixin):
+            return setup_eager_loading(queryset, **requested_selection(self.request))
+        return setup_eager_loading(queryset)
@@ -0,0 +1,58 @@
+"""
+Sparse fieldsets and opt-in expansions for read endpoints.
+
+?fields=id,name limits a response to the listed fields, and
+?expand=contacts adds the serializer's expandable_fields (usually nested
+relations) that are left out by default. Both apply to the top-level
+serializer of GET requests only; nested serializers render in full.
+Views using EagerLoadingViewMixin pass the same selection to
+setup_eager_loading, so relations of fields that are not rendered are not
+prefetched either.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def requested_names(request, param):
+    """Names in a comma separated query parameter, or None when it is absent or empty."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    names = {name.strip() for name in request.query_params.get(param, '').split(',')} - {''}
+    return names or None
+
+
+def requested_selection(request):
+    """Keyword arguments for setup_eager_loading from the request's query parameters."""
+    return {
+        'fields': requested_names(request, FIELDS_PARAM),
+        'expand': requested_names(request, EXPAND_PARAM) or set(),
+    }
+
+
+class FieldSelectionMixin:
+    """Serializer mixin honouring ?fields= and ?expand=; unknown names are ignored."""
+
+    expandable_fields = ()
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request') if self.is_root() else None
+        expand = requested_names(request, EXPAND_PARAM) or set()
+        for name in self.expandable_fields:
+            if name not in expand:
+                fields.pop(name, None)
+        selected = requested_names(request, FIELDS_PARAM)
+        if selected:
+            for name in list(fields):
+                if name not in selected:
+                    del fields[name]
+        return fields
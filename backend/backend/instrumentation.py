@@ -0,0 +1,257 @@
+"""
+Per-endpoint query, latency and size instrumentation.
+
+InstrumentationMiddleware measures every request: SQL query count and time
+(through a connection execute wrapper), time spent evaluating serializer
+.data, total time and response size. Measurements are aggregated per
+resolved URL name and HTTP method in this process and exposed in the
+Prometheus text format by metrics_view; with INSTRUMENTATION_HEADERS they
+are also returned as X-* and Server-Timing response headers.
+
+Views can declare query_budget, either a number or a dict keyed by viewset
+action (or lower-case HTTP method for plain views); @action routes can pass
+query_budget=... as an action kwarg. Requests over budget are logged and
+counted, and QueryBudgetTestMixin lets tests assert responses stay within it.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNRESOLVED = '<unresolved>'
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """Measurements for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.response_bytes = 0
+        self.serializing = False
+        self.view_name = UNRESOLVED
+        self.query_budget = None
+
+    @property
+    def over_budget(self):
+        return self.query_budget is not None and self.queries > self.query_budget
+
+    def __call__(self, execute, sql, params, many, context):
+        # Connection execute wrapper: counts and times every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+class MetricsRegistry:
+    """Process-wide aggregates per (view name, method)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, method, metrics):
+        with self._lock:
+            series = self._series.setdefault((metrics.view_name, method), {
+                'requests': 0,
+                'queries': 0,
+                'db_seconds': 0.0,
+                'serializer_seconds': 0.0,
+                'response_bytes': 0,
+                'duration_seconds': 0.0,
+                'over_budget': 0,
+                'buckets': [0] * len(DURATION_BUCKETS),
+            })
+            series['requests'] += 1
+            series['queries'] += metrics.queries
+            series['db_seconds'] += metrics.db_time
+            series['serializer_seconds'] += metrics.serializer_time
+            series['response_bytes'] += metrics.response_bytes
+            series['duration_seconds'] += metrics.duration
+            series['over_budget'] += metrics.over_budget
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.duration <= bound:
+                    series['buckets'][index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(series, buckets=list(series['buckets'])) for key, series in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """The aggregates in the Prometheus text exposition format."""
+        snapshot = sorted(self.snapshot().items())
+        counters = [
+            ('http_requests_total', 'requests', 'Requests handled.'),
+            ('http_request_db_queries_total', 'queries', 'SQL queries run while handling requests.'),
+            ('http_request_db_seconds_total', 'db_seconds', 'Time spent in SQL queries.'),
+            ('http_request_serializer_seconds_total', 'serializer_seconds', 'Time spent evaluating serializer data.'),
+            ('http_request_response_bytes_total', 'response_bytes', 'Response body bytes sent.'),
+            ('http_request_query_budget_exceeded_total', 'over_budget', 'Requests that ran more queries than the view budget.'),
+        ]
+        lines = []
+        for name, key, help_text in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{{labels(view, method)}}} {series[key]}' for (view, method), series in snapshot]
+
+        name = 'http_request_duration_seconds'
+        lines += [f'# HELP {name} Request handling time.', f'# TYPE {name} histogram']
+        for (view, method), series in snapshot:
+            for bound, count in zip(DURATION_BUCKETS, series['buckets']):
+                lines.append(f'{name}_bucket{{{labels(view, method)},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels(view, method)},le="+Inf"}} {series["requests"]}')
+            lines.append(f'{name}_sum{{{labels(view, method)}}} {series["duration_seconds"]}')
+            lines.append(f'{name}_count{{{labels(view, method)}}} {series["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def labels(view, method):
+    escaped = view.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'view="{escaped}",method="{method}"'
+
+
+registry = MetricsRegistry()
+
+
+def timed_data(data_property):
+    """Wrap a serializer .data property to add its evaluation time to the current request."""
+
+    def data(self):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return data_property.fget(self)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return data_property.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializing = False
+
+    data.instrumented = True
+    return property(data, doc=data_property.__doc__)
+
+
+def install_serializer_timing():
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        data_property = serializer_class.__dict__['data']
+        if not getattr(data_property.fget, 'instrumented', False):
+            serializer_class.data = timed_data(data_property)
+
+
+def query_budget(request):
+    """The query budget declared by the view that handled request, if any."""
+    match = getattr(request, 'resolver_match', None)
+    view = getattr(match, 'func', None)
+    budget = getattr(view, 'initkwargs', {}).get('query_budget')
+    if budget is None:
+        budget = getattr(getattr(view, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        method = request.method.lower()
+        action = (getattr(view, 'actions', None) or {}).get(method, method)
+        budget = budget.get(action)
+    return budget
+
+
+class InstrumentationMiddleware:
+    """Measure each request and record it in the registry; goes first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name:
+            metrics.view_name = match.view_name
+        metrics.query_budget = query_budget(request)
+        metrics.duration = time.perf_counter() - metrics.started
+        response.metrics = metrics
+
+        if metrics.over_budget:
+            logger.warning(
+                '%s %s ran %d queries, over its budget of %d',
+                request.method, metrics.view_name, metrics.queries, metrics.query_budget,
+            )
+        if getattr(settings, 'INSTRUMENTATION_HEADERS', False):
+            self.add_headers(response, metrics)
+
+        if response.streaming:
+            response.streaming_content = self.count_streamed(response.streaming_content, request.method, metrics)
+        else:
+            metrics.response_bytes = len(response.content)
+            registry.record(request.method, metrics)
+        return response
+
+    def count_streamed(self, content, method, metrics):
+        # Streamed bodies are measured as they are sent; the request is recorded once finished
+        try:
+            for chunk in content:
+                metrics.response_bytes += len(chunk)
+                yield chunk
+        finally:
+            registry.record(method, metrics)
+
+    def add_headers(self, response, metrics):
+        response['X-Query-Count'] = str(metrics.queries)
+        if metrics.query_budget is not None:
+            response['X-Query-Budget'] = str(metrics.query_budget)
+        response['X-DB-Time-Ms'] = f'{metrics.db_time * 1000:.1f}'
+        response['X-Serializer-Time-Ms'] = f'{metrics.serializer_time * 1000:.1f}'
+        response['X-Response-Time-Ms'] = f'{metrics.duration * 1000:.1f}'
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f}',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={metrics.duration * 1000:.1f}',
+        ])
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, only answered for INTERNAL_IPS."""
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin asserting responses stayed within their view's query budget."""
+
+    def assertWithinQueryBudget(self, response):
+        metrics = response.metrics
+        self.assertIsNotNone(
+            metrics.query_budget, f'{metrics.view_name} does not declare a query budget'
+        )
+        self.assertLessEqual(
+            metrics.queries, metrics.query_budget,
+            f'{metrics.view_name} ran {metrics.queries} queries, over its budget of {metrics.query_budget}',
+        )
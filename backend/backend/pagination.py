@@ -0,0 +1,245 @@
+"""
+Keyset pagination for the API list endpoints.
+
+Pages are selected with a WHERE clause on the view's ordering columns,
+continuing from the last row of the previous page, instead of OFFSET. With
+an index on the ordering columns every page, however deep, is an index
+seek. The ordering comes from the view's OrderingFilter (so ?ordering=
+keeps working), else the queryset's ordering, and the primary key is
+appended as a tie-breaker so positions are unique. The row count is only
+computed when the client asks for it with ?count=true.
+"""
+import base64
+import datetime
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+PK_NAMES = ('pk', 'id')
+
+
+def encode_value(value):
+    """JSON default for cursor values; datetimes keep their microseconds."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def resolve_field(model, path):
+    """The model field a lookup path points at, or None for annotations."""
+    field = None
+    for part in path.split(LOOKUP_SEP):
+        if model is None:
+            return None
+        try:
+            field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model
+    return field
+
+
+class OrderingKey:
+    """One column of a keyset: lookup path, direction and how to read and parse it."""
+
+    def __init__(self, model, term):
+        self.descending = term.startswith('-')
+        self.path = term.lstrip('-')
+        field = resolve_field(model, self.path)
+        if field is not None and field.is_relation:
+            # Order by the foreign key column itself, not the target's Meta.ordering
+            self.path = f'{self.path}{LOOKUP_SEP}pk'
+            field = field.target_field
+        self.field = field
+        self.nullable = field is None or field.null
+
+    def value(self, row):
+        if isinstance(row, dict):
+            return row[self.path]
+        for part in self.path.split(LOOKUP_SEP):
+            if row is None:
+                return None
+            row = row.pk if part == 'pk' else getattr(row, part)
+        return row
+
+    def parse(self, value):
+        return value if value is None or self.field is None else self.field.to_python(value)
+
+    def ascending(self, reverse):
+        return self.descending == reverse
+
+    def order_by(self, reverse):
+        # No NULLS clause: PostgreSQL sorts NULL as the largest value, which keeps
+        # both walk directions servable by a plain btree index
+        return F(self.path).asc() if self.ascending(reverse) else F(self.path).desc()
+
+    def beyond(self, value, reverse):
+        """Q for rows strictly past value in the walk direction, or None when there are none."""
+        if self.ascending(reverse):
+            if value is None:
+                return None
+            condition = Q(**{f'{self.path}__gt': value})
+            return condition | Q(**{f'{self.path}__isnull': True}) if self.nullable else condition
+        if value is None:
+            return Q(**{f'{self.path}__isnull': False})
+        return Q(**{f'{self.path}__lt': value})
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.path}__isnull': True})
+        return Q(**{self.path: value})
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over an arbitrary multi-column ordering.
+
+    The cursor holds the ordering key values of the row it continues from and
+    the walk direction. Clients pick a page size with ?page_size= (capped at
+    max_page_size) and opt into a total with ?count=true.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering or ['-pk']
+        for term in ordering:
+            if not isinstance(term, str) or term == '?':
+                raise ImproperlyConfigured(
+                    f'{self.__class__.__name__} needs field name orderings, got {term!r}.'
+                )
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in PK_NAMES:
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.keys = [OrderingKey(queryset.model, term) for term in self.ordering]
+        self.count = queryset.count() if self.wants_count(request) else None
+
+        values, reverse = self.decode_cursor(request) or (None, False)
+        queryset = queryset.order_by(*[key.order_by(reverse) for key in self.keys])
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else values is not None
+        self.next_values = [key.value(rows[-1]) for key in self.keys] if rows else None
+        self.previous_values = [key.value(rows[0]) for key in self.keys] if rows else None
+        self.page = rows
+        return rows
+
+    def seek(self, values, reverse):
+        """WHERE clause for the rows after values: (a > x) OR (a = x AND b > y) OR ..."""
+        terms = []
+        prefix = Q()
+        for key, value in zip(self.keys, values):
+            beyond = key.beyond(value, reverse)
+            if beyond is not None:
+                terms.append(prefix & beyond)
+            prefix &= key.equal(value)
+        if not terms:
+            return Q(pk__in=[])
+        condition = reduce(operator.or_, terms)
+        first, value = self.keys[0], values[0]
+        if value is not None and not (first.nullable and first.ascending(reverse)):
+            # A plain range on the leading column gives the planner its index bound
+            lookup = 'gte' if first.ascending(reverse) else 'lte'
+            condition &= Q(**{f'{first.path}__{lookup}': value})
+        return condition
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if payload['o'] != self.ordering or len(payload['v']) != len(self.keys):
+                raise ValueError('cursor ordering does not match')
+            values = [key.parse(value) for key, value in zip(self.keys, payload['v'])]
+            return values, bool(payload['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'o': self.ordering, 'v': values, 'r': int(reverse)}, default=encode_value)
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def first_page_link(self):
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.next_values is None:
+            return self.first_page_link()
+        return self.encode_cursor(self.next_values, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.previous_values is None:
+            return self.first_page_link()
+        return self.encode_cursor(self.previous_values, True)
+
+    def get_paginated_response(self, data):
+        body = {}
+        if self.count is not None:
+            body['count'] = self.count
+        body.update({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = {
+            'count': {'type': 'integer', 'example': 123, 'description': 'Only present with ?count=true'},
+            **response_schema['properties'],
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Include the total number of results.',
+            'schema': {'type': 'boolean'},
+        }]
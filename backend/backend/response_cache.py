@@ -0,0 +1,186 @@
+"""
+Shared cache for API responses built from rarely changing reference data.
+
+Views opt in with CachedResponseMixin (list and retrieve) or the
+cache_response decorator (any other GET handler), naming the models their
+responses are read from. Each model has a version number in the
+'responses' cache; a response is stored under the current versions of its
+models, the requesting user's role and the normalized request URL. Saving
+or deleting a row of a model (post_save/post_delete) bumps its version, so
+every response built from it is never read again and simply expires.
+
+Writes through QuerySet.update() or bulk_create send no signals; code doing
+those on a cached model calls invalidate() itself. Versions live in the
+cache backend, so several server processes need a shared backend such as
+Redis for invalidation to reach all of them.
+"""
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.connection import ConnectionProxy
+from rest_framework import status
+from rest_framework.response import Response
+
+cache = ConnectionProxy(caches, 'responses')
+
+VERSION_KEY = 'response-cache:version:{}'
+RESPONSE_KEY = 'response-cache:response:{}'
+
+# Labels of the models some cached response is built from
+cached_models = set()
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def register(*models):
+    cached_models.update(model_label(model) for model in models)
+
+
+def versions(labels):
+    """Current version of each label, starting missing ones from the clock."""
+    keys = [VERSION_KEY.format(label) for label in labels]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # A clock start keeps a version lost to eviction from coming back
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        found.update(cache.get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def bump(label):
+    key = VERSION_KEY.format(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*models):
+    """
+    Stop serving responses built from models. Versions are bumped at once
+    and again when the current transaction commits, so a response cached
+    by a concurrent request before the commit is dropped as well.
+    """
+    labels = {model_label(model) for model in models}
+
+    def bump_all():
+        for label in labels:
+            bump(label)
+
+    bump_all()
+    transaction.on_commit(bump_all)
+
+
+def invalidate_on_change(sender, **kwargs):
+    if model_label(sender) in cached_models:
+        invalidate(sender)
+
+
+post_save.connect(invalidate_on_change, dispatch_uid='response_cache_post_save')
+post_delete.connect(invalidate_on_change, dispatch_uid='response_cache_post_delete')
+
+
+def permission_scope(user):
+    """Responses are shared by users of the same role; permissions are role based."""
+    if not (user and user.is_authenticated):
+        return 'anonymous'
+    return getattr(user, 'role', None) or 'none'
+
+
+def response_key(request, labels, model_versions):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    renderer = getattr(request, 'accepted_renderer', None)
+    parts = [
+        ','.join(f'{label}={version}' for label, version in zip(labels, model_versions)),
+        permission_scope(request.user),
+        getattr(renderer, 'format', ''),
+        request.get_host(),
+        request.path,
+        query,
+    ]
+    return RESPONSE_KEY.format(hashlib.sha256('\n'.join(parts).encode()).hexdigest())
+
+
+def cached_response(request, models, respond, timeout=None):
+    """
+    The response of respond() for request, from the cache when the data it
+    was built from has not changed since. Only successful GETs are cached.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return respond()
+    labels = sorted({model_label(model) for model in models})
+    model_versions = versions(labels)
+    if None in model_versions:
+        return respond()
+
+    key = response_key(request, labels, model_versions)
+    hit = cache.get(key)
+    if hit is not None:
+        response = Response(hit, status=status.HTTP_200_OK)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = respond()
+    if response.status_code == status.HTTP_200_OK:
+        if timeout is None:
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+        cache.set(key, response.data, timeout)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def cache_response(*models, timeout=None):
+    """Cache a view handler's responses until one of models changes."""
+    register(*models)
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            return cached_response(
+                request, models, lambda: handler(self, request, *args, **kwargs), timeout
+            )
+
+        return wrapper
+
+    return decorator
+
+
+class CachedResponseMixin:
+    """
+    Cache list and retrieve responses of a view until one of cache_models
+    changes; cache_timeout defaults to RESPONSE_CACHE_TIMEOUT.
+
+    View permissions are checked before the cache is read, object
+    permissions are not, so only use it on views whose objects every user
+    passing has_permission may read.
+    """
+    cache_models = ()
+    cache_timeout = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        register(*cls.cache_models)
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, self.cache_models,
+            lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs),
+            self.cache_timeout,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(
+            request, self.cache_models,
+            lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs),
+            self.cache_timeout,
+        )
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',  # Required for AllAuth
+    'django.contrib.postgres',  # Search lookups used by crm/search.py
     
     # Local apps
     'crm',
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
     'manager',
     'okrapp',
     'personalapp',
+    'benchmarks',
     
     # Third-party apps
     'rest_framework',
@@ -60,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.instrumentation.InstrumentationMiddleware',  # First, so it measures the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,8 +97,9 @@ CORS_ALLOW_HEADERS = [
 # Rest Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'dj_rest_auth.jwt_auth.JWTCookieAuthentication',  # For cookie-based JWTs (browser clients)
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # For header-based JWTs (API clients)
+        # Read-only requests are authenticated from token claims without a user query
+        'authentication.authentication.jwt.StatelessJWTCookieAuthentication',  # For cookie-based JWTs (browser clients)
+        'authentication.authentication.jwt.StatelessJWTAuthentication',  # For header-based JWTs (API clients)
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',  # Ensures all views require authentication by default
@@ -104,8 +108,8 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',  # Enforces JSON response format
     ),
 
-    # Pagination settings for large datasets (default pagination class with a page size of 10)
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Keyset pagination: ?page_size= (up to 100), ?cursor= from next/previous, ?count=true for a total
+    'DEFAULT_PAGINATION_CLASS': 'backend.pagination.KeysetPagination',
     'PAGE_SIZE': 10
 
 }
@@ -113,7 +117,7 @@ REST_FRAMEWORK = {
 
 # AllAuth Settings
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'authentication.authentication.backends.PooledModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
 
@@ -162,6 +166,48 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# Refresh-token blacklist lookups (in-process Bloom filter + LRU in front of the tables).
+# The filter relies on markers in the default cache, so it is off unless
+# CACHE_URL points at a shared cache; without it every check reads the tables
+TOKEN_BLACKLIST_FILTER = env('TOKEN_BLACKLIST_FILTER', cast=bool, default='CACHE_URL' in os.environ)
+TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS = env('TOKEN_BLACKLIST_FILTER_REBUILD_SECONDS', cast=int, default=300)
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = env('TOKEN_BLACKLIST_FILTER_ERROR_RATE', cast=float, default=0.01)
+TOKEN_BLACKLIST_LRU_SIZE = env('TOKEN_BLACKLIST_LRU_SIZE', cast=int, default=10000)
+
+# Password hashing: the PBKDF2 cost is configurable and outdated hashes are
+# upgraded on login; hashing runs on a bounded pool that answers 503 when full
+PASSWORD_HASHERS = [
+    'authentication.authentication.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = env('PASSWORD_HASH_ITERATIONS', cast=int, default=870000)
+PASSWORD_HASHING_WORKERS = env('PASSWORD_HASHING_WORKERS', cast=int, default=os.cpu_count() or 1)
+PASSWORD_HASHING_QUEUE_SIZE = env('PASSWORD_HASHING_QUEUE_SIZE', cast=int, default=PASSWORD_HASHING_WORKERS * 4)
+PASSWORD_HASHING_TIMEOUT = env('PASSWORD_HASHING_TIMEOUT', cast=int, default=10)
+
+# Build users from token claims on read-only requests. Revocations live in the
+# default cache, so this is off unless CACHE_URL points at a shared cache
+JWT_STATELESS_AUTH = env('JWT_STATELESS_AUTH', cast=bool, default='CACHE_URL' in os.environ)
+
+# Cache (must be shared between processes, e.g. redis://, in multi-process deployments)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+    # Rate limit counters; point at the same shared backend as the default cache
+    'throttle': env.cache('THROTTLE_CACHE_URL', default=env('CACHE_URL', default='locmemcache://throttle')),
+    # Cached API responses and their model versions (backend/response_cache.py);
+    # several server processes need a shared backend such as Redis
+    'responses': env.cache('RESPONSE_CACHE_URL', default=env('CACHE_URL', default='locmemcache://responses')),
+}
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=300)
+
+# Request instrumentation: /api/metrics/ answers INTERNAL_IPS only; per-request
+# query/time headers are added when INSTRUMENTATION_HEADERS is on
+INTERNAL_IPS = env.list('INTERNAL_IPS', default=['127.0.0.1'])
+INSTRUMENTATION_HEADERS = env('INSTRUMENTATION_HEADERS', cast=bool, default=False)
+
 # Email Configuration
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = env('EMAIL_HOST', default='')
@@ -235,3 +281,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Accounting
+ACCOUNTING_BASE_CURRENCY = env('ACCOUNTING_BASE_CURRENCY', default='USD')
+EXCHANGE_RATE_CACHE_TTL = env('EXCHANGE_RATE_CACHE_TTL', cast=int, default=300)
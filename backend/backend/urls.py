@@ -21,6 +21,7 @@ from drf_yasg import openapi
 from rest_framework import permissions
 from django.conf.urls.static import static
 from django.conf import settings
+from backend.instrumentation import metrics_view
 
 
 schema_view = get_schema_view(
@@ -35,6 +36,7 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path('api/admin/', admin.site.urls),
+    path('api/metrics/', metrics_view, name='metrics'),
     path('api/users/', include('users.urls')),
     path('api/auth/', include('authentication.urls')),
     path('api/accounting/', include('accounting.urls')),
@@ -0,0 +1,185 @@
+"""
+Benchmark runner: transports, latency statistics and baseline comparison.
+
+A transport issues authenticated GET requests and reports the status code
+and the number of SQL queries the request ran, read from the request
+instrumentation (response.metrics in process, X-Query-Count over HTTP).
+"""
+import json
+import math
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+class TestClientTransport:
+    """In-process requests through the DRF test client; one request at a time."""
+    name = 'test'
+    max_concurrency = 1
+
+    def __init__(self, user):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def get(self, path):
+        response = self.client.get(path)
+        metrics = getattr(response, 'metrics', None)
+        return response.status_code, metrics.queries if metrics else None
+
+
+class HTTPTransport:
+    """Requests to a running server, authenticated with a bearer access token."""
+    max_concurrency = None
+
+    def __init__(self, name, base_url, access_token):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+
+    def get(self, path):
+        request = urllib.request.Request(self.base_url + path, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, headers = e.code, e.headers
+        queries = headers.get('X-Query-Count')
+        return status, int(queries) if queries is not None else None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def wsgi_server():
+    """Serve the project's WSGI application on a local port; yields its base URL."""
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def asgi_server():
+    """Serve the project's ASGI application with uvicorn on a local port; yields its base URL."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise ImproperlyConfigured('The ASGI benchmark needs uvicorn installed.')
+    from django.core.asgi import get_asgi_application
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        get_asgi_application(), host='127.0.0.1', port=port, log_level='warning', lifespan='off',
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started and thread.is_alive():
+        time.sleep(0.05)
+    try:
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run_scenario(transport, path, requests, concurrency=1, warmup=5):
+    """Issue requests GETs to path and summarize latency, throughput and queries."""
+    for _ in range(warmup):
+        transport.get(path)
+
+    def timed_get(_):
+        start = time.perf_counter()
+        status, queries = transport.get(path)
+        return time.perf_counter() - start, status, queries
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(timed_get, range(requests)))
+    else:
+        samples = [timed_get(i) for i in range(requests)]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, status, _ in samples if status >= 400),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'rps': round(requests / wall, 1) if wall else None,
+        'queries': max(queries) if queries else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of results against baseline, as messages.
+
+    Latency may grow and throughput drop by the tolerance fraction; query
+    counts are deterministic and errors should not appear, so any increase
+    in either is a regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            if base.get(key) and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {result[key]} > baseline {base[key]}')
+        if base.get('rps') and result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: rps {result["rps"]} < baseline {base["rps"]}')
+        if base.get('queries') is not None and (result['queries'] or 0) > base['queries']:
+            regressions.append(f'{name}: queries {result["queries"]} > baseline {base["queries"]}')
+        if result['errors'] > base.get('errors', 0):
+            regressions.append(f'{name}: errors {result["errors"]} > baseline {base.get("errors", 0)}')
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)['results']
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results, metadata):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump({'metadata': metadata, 'results': results}, handle, indent=2, sort_keys=True)
+        handle.write('\n')
@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.synthetic import ANCHOR_DATE, GENERATORS, GENERATORS_BY_NAME, SCALES, generate
+
+
+def parse_factor(value):
+    name, _, multiplier = value.partition('=')
+    if name not in GENERATORS_BY_NAME:
+        raise CommandError(f'Unknown generator {name!r}; choose from {", ".join(GENERATORS_BY_NAME)}')
+    try:
+        multiplier = float(multiplier)
+    except ValueError:
+        raise CommandError(f'--factor {value!r} needs a number, e.g. {name}=2')
+    if multiplier <= 0:
+        raise CommandError(f'--factor {value!r} must be positive')
+    return name, multiplier
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with consistent, cross-linked synthetic data for '
+        'scale testing. Chunks are written with bulk_create by a pool of '
+        'processes; the same seed and anchor date always produce the same data.'
+    )
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group()
+        size.add_argument('--rows', type=int, help='Approximate number of rows to write')
+        size.add_argument('--scale', choices=sorted(SCALES), default='10k', help='Preset row count')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--anchor-date', type=date.fromisoformat, default=ANCHOR_DATE, metavar='YYYY-MM-DD',
+                            help=f'Day the generated dates count back from (default {ANCHOR_DATE})')
+        parser.add_argument('--factor', action='append', default=[], metavar='NAME=MULTIPLIER',
+                            help='Scale one generator, e.g. --factor crm=2 --factor documents=0.5')
+        parser.add_argument('--only', nargs='*', choices=list(GENERATORS_BY_NAME),
+                            help='Generators to run (default all)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default one per CPU)')
+
+    def handle(self, *args, **options):
+        total_rows = options['rows'] or SCALES[options['scale']]
+        if total_rows <= 0:
+            raise CommandError('--rows must be positive')
+        factors = dict(parse_factor(value) for value in options['factor'])
+        generators = GENERATORS
+        if options['only']:
+            generators = [generator for generator in GENERATORS if generator.name in options['only']]
+        workers = max(options['workers'], 1)
+
+        self.stdout.write(f'Writing about {total_rows} rows with {workers} worker(s)...')
+        started = time.monotonic()
+        written = generate(
+            total_rows, seed=options['seed'], generators=generators, factors=factors,
+            workers=workers, log=self.stdout.write, anchor_date=options['anchor_date'],
+        )
+        elapsed = time.monotonic() - started
+        rows = sum(written.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
@@ -0,0 +1,141 @@
+import os
+import platform
+from contextlib import contextmanager
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from authentication.authentication.jwt import get_tokens_for_user
+from benchmarks.harness import (
+    HTTPTransport, TestClientTransport, asgi_server, compare, load_baseline, run_scenario, save_baseline,
+    wsgi_server,
+)
+from benchmarks.scenarios import SCENARIOS, resolve
+from benchmarks.synthetic import ANCHOR_DATE, SCALES, benchmark_user, generate
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'baselines')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a dedicated database with synthetic data and benchmark the API '
+        'endpoints through the test client or a real WSGI/ASGI server. Reports '
+        'p50/p95/p99 latency, requests per second and queries per request, and '
+        'fails when results regress against the stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='10k',
+                            help='Approximate number of seeded rows')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--anchor-date', type=date.fromisoformat, default=ANCHOR_DATE, metavar='YYYY-MM-DD',
+                            help=f'Day the seeded dates count back from (default {ANCHOR_DATE})')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes seeding the database')
+        parser.add_argument('--transport', choices=['test', 'wsgi', 'asgi'], default='test')
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Concurrent requests (server transports only)')
+        parser.add_argument('--only', nargs='*', help='Scenario name prefixes, e.g. crm accounting.invoices')
+        parser.add_argument('--baseline', help='Baseline file (default baselines/<scale>-<transport>.json)')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed latency/throughput regression as a fraction')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the seeded database for the next run at this scale')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        baseline_path = options['baseline'] or os.path.join(BASELINE_DIR, f'{scale}-{options["transport"]}.json')
+
+        # Each scale gets its own database so --keepdb can reuse the seeded data
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        test_settings['NAME'] = f'{connection.settings_dict["NAME"]}_benchmark_{scale}'
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb']
+        )
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.report(results)
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(baseline_path) or '.', exist_ok=True)
+            save_baseline(baseline_path, results, {
+                'scale': scale, 'seed': options['seed'], 'anchor_date': options['anchor_date'].isoformat(),
+                'transport': options['transport'],
+                'requests': options['requests'], 'concurrency': options['concurrency'],
+                'python': platform.python_version(), 'machine': platform.machine(),
+            })
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+            return
+
+        baseline = load_baseline(baseline_path)
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; run with --save-baseline'))
+            return
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def run(self, options):
+        from crm.models import Customer
+
+        if Customer.objects.exists():
+            self.stdout.write('Reusing seeded data')
+        else:
+            self.stdout.write(f'Seeding about {SCALES[options["scale"]]} rows...')
+            generate(
+                SCALES[options['scale']], seed=options['seed'], workers=options['workers'], log=self.stdout.write,
+                anchor_date=options['anchor_date'],
+            )
+
+        user = benchmark_user()
+        scenarios = resolve(SCENARIOS, options['only'])
+        if not scenarios:
+            raise CommandError('No scenarios match --only')
+
+        with override_settings(INSTRUMENTATION_HEADERS=True, ALLOWED_HOSTS=['testserver', '127.0.0.1']):
+            with self.transport(options['transport'], user) as transport:
+                concurrency = options['concurrency']
+                if transport.max_concurrency:
+                    concurrency = min(concurrency, transport.max_concurrency)
+                results = {}
+                for scenario in scenarios:
+                    self.stdout.write(f'  {scenario.name} {scenario.path}')
+                    results[scenario.name] = run_scenario(
+                        transport, scenario.path, options['requests'], concurrency, options['warmup']
+                    )
+        return results
+
+    @contextmanager
+    def transport(self, name, user):
+        if name == 'test':
+            yield TestClientTransport(user)
+            return
+        server = wsgi_server if name == 'wsgi' else asgi_server
+        access = get_tokens_for_user(user)['access']
+        try:
+            with server() as base_url:
+                yield HTTPTransport(name, base_url, access)
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+    def report(self, results):
+        header = f'{"scenario":<32} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>8} {"queries":>8} {"errors":>7}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in results.items():
+            queries = '-' if result['queries'] is None else result['queries']
+            self.stdout.write(
+                f'{name:<32} {result["p50_ms"]:>9} {result["p95_ms"]:>9} {result["p99_ms"]:>9} '
+                f'{result["rps"]:>8} {queries:>8} {result["errors"]:>7}'
+            )
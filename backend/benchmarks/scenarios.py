@@ -0,0 +1,63 @@
+"""
+Endpoints exercised by the benchmark harness.
+
+Paths may contain {customer}, {account} or {objective}, which are filled
+with the first row of that model so detail endpoints hit seeded data.
+"""
+from collections import namedtuple
+
+Scenario = namedtuple('Scenario', 'name path')
+
+SCENARIOS = [
+    Scenario('crm.customers', '/api/crm/customers/'),
+    Scenario('crm.customer_detail', '/api/crm/customers/{customer}/'),
+    Scenario('crm.customer_interactions', '/api/crm/customers/{customer}/interactions/'),
+    Scenario('crm.customer_timeline', '/api/crm/customers/{customer}/timeline/'),
+    Scenario('crm.contacts', '/api/crm/contacts/'),
+    Scenario('crm.interactions', '/api/crm/interactions/'),
+    Scenario('crm.interactions_recent', '/api/crm/interactions/recent/'),
+    Scenario('crm.interactions_search', '/api/crm/interactions/?search=renewal'),
+    Scenario('crm.search', '/api/crm/search/?q=renewal'),
+    Scenario('accounting.accounts', '/api/accounting/accounts/'),
+    Scenario('accounting.account_tree', '/api/accounting/accounts/tree/'),
+    Scenario('accounting.account_activity', '/api/accounting/accounts/{account}/activity/'),
+    Scenario('accounting.transactions', '/api/accounting/transactions/'),
+    Scenario('accounting.invoices', '/api/accounting/invoices/'),
+    Scenario('accounting.payments', '/api/accounting/payments/'),
+    Scenario('accounting.trial_balance', '/api/accounting/reports/trial-balance/'),
+    Scenario('accounting.ar_aging', '/api/accounting/reports/ar-aging/'),
+    Scenario('hrm.employees', '/api/hrm/employees/'),
+    Scenario('hrm.leave_requests', '/api/hrm/leave-requests/'),
+    Scenario('okr.objectives', '/api/okr/objectives/'),
+    Scenario('okr.objective_detail', '/api/okr/objectives/{objective}/'),
+    Scenario('okr.keyresults', '/api/okr/keyresults/'),
+    Scenario('okr.tasks', '/api/okr/tasks/'),
+    Scenario('documents.documents', '/api/documents/documents/'),
+    Scenario('meetings.meetings', '/api/meeting_mgmt/meetings/'),
+]
+
+
+def path_parameters():
+    from accounting.models import Account
+    from crm.models import Customer
+    from okrapp.models import Objective
+
+    def first(model, **filters):
+        return model._default_manager.filter(**filters).order_by('pk').values_list('pk', flat=True).first()
+
+    return {
+        'customer': first(Customer),
+        # A leaf account that has seeded lines
+        'account': first(Account, account_code='1010'),
+        'objective': first(Objective),
+    }
+
+
+def resolve(scenarios, only=None):
+    """Scenarios filtered by name prefix, with their path parameters filled in."""
+    parameters = path_parameters()
+    return [
+        scenario._replace(path=scenario.path.format(**parameters))
+        for scenario in scenarios
+        if not only or scenario.name.startswith(tuple(only))
+    ]
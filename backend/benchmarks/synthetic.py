@@ -0,0 +1,599 @@
+"""
+Synthetic, cross-linked data for benchmarks and scale testing.
+
+Each generator writes one kind of unit, a parent row with its children
+(a customer with its contacts and their interactions, a transaction with
+balanced lines, an invoice with its lines and payment), so related rows
+always agree. Units are written in chunks and every chunk draws from its
+own random generator seeded from (seed, generator, chunk number), so a
+seed reproduces the same data and chunks can be written in any order, by
+any number of processes. Dates count back from a fixed anchor date rather
+than today, so the data does not change from one day to the next.
+"""
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from datetime import time as day_time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+BENCHMARK_USER_EMAIL = 'benchmark@example.com'
+BENCHMARK_USER_PASSWORD = 'benchmark-password'
+
+# Units per chunk, and rows per INSERT statement
+CHUNK_SIZE = 2000
+BATCH_SIZE = 5000
+
+# Day the generated dates count back from; generate() takes another
+ANCHOR_DATE = date(2026, 1, 1)
+
+CENT = Decimal('0.01')
+FIRST_NAMES = ['Ada', 'Ben', 'Chloe', 'David', 'Esi', 'Femi', 'Grace', 'Hugo', 'Ines', 'Jamal', 'Kofi', 'Lena']
+LAST_NAMES = ['Mensah', 'Smith', 'Okafor', 'Garcia', 'Chen', 'Novak', 'Khan', 'Silva', 'Mwangi', 'Rossi']
+WORDS = [
+    'quarterly', 'review', 'renewal', 'pricing', 'support', 'onboarding', 'contract', 'delivery',
+    'invoice', 'follow-up', 'proposal', 'demo', 'training', 'migration', 'feedback', 'budget',
+]
+
+
+def chunk_rng(seed, name, chunk):
+    return random.Random(f'{seed}:{name}:{chunk}')
+
+
+def token(rng):
+    """A 32 character hex string, unique for practical purposes."""
+    return f'{rng.getrandbits(128):032x}'
+
+
+def sentence(rng, words=6):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def money(rng, low, high):
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def random_date(rng, anchor_date, days_back=3 * 365):
+    return anchor_date - timedelta(days=rng.randint(0, days_back))
+
+
+def random_datetime(rng, anchor_date, days_back=3 * 365):
+    moment = datetime.combine(
+        random_date(rng, anchor_date, days_back), day_time(rng.randint(8, 17), rng.randint(0, 59))
+    )
+    return timezone.make_aware(moment)
+
+
+class GenerationContext:
+    """
+    Data shared by the generators: the anchor date, the benchmark user and
+    ids of parent rows.
+    """
+
+    def __init__(self, anchor_date=ANCHOR_DATE):
+        self.anchor_date = anchor_date
+        self._ids = {}
+        self._user_id = None
+
+    @property
+    def user_id(self):
+        if self._user_id is None:
+            self._user_id = benchmark_user().pk
+        return self._user_id
+
+    def ids(self, model, *fields):
+        """pk (or the given field values) of every row of model, read once."""
+        key = (model, fields)
+        if key not in self._ids:
+            queryset = model._default_manager.order_by('pk')
+            self._ids[key] = list(
+                queryset.values_list(*fields) if fields else queryset.values_list('pk', flat=True)
+            )
+        return self._ids[key]
+
+
+def benchmark_user():
+    User = get_user_model()
+    user = User.objects.filter(email=BENCHMARK_USER_EMAIL).first()
+    if user is None:
+        user = User.objects.create_user(
+            email=BENCHMARK_USER_EMAIL,
+            password=BENCHMARK_USER_PASSWORD,
+            first_name='Benchmark',
+            last_name='User',
+            role=User.Role.SUPER_ADMIN,
+            is_staff=True,
+            is_superuser=True,
+        )
+    return user
+
+
+class Generator:
+    """
+    Writes units of related rows.
+
+    share is the fraction of the total row count this generator produces and
+    rows_per_unit the average number of rows one unit writes. Generators
+    named in requires must have finished before this one starts.
+    """
+    name = ''
+    share = 0.0
+    rows_per_unit = 1
+    requires = ()
+
+    def units(self, total_rows, factor=1.0):
+        return max(int(total_rows * self.share * factor / self.rows_per_unit), 1)
+
+    def setup(self, context):
+        """Create reference rows once, before any chunk is written."""
+
+    def write_chunk(self, rng, count, context):
+        """Write count units; returns the number of rows written."""
+        raise NotImplementedError
+
+    def finish(self, context):
+        """Derive aggregates once every chunk is written."""
+
+
+class CRMGenerator(Generator):
+    """Customers, two contacts each and interactions with those contacts."""
+    name = 'crm'
+    share = 0.40
+    rows_per_unit = 8
+
+    def write_chunk(self, rng, count, context):
+        from crm.models import Contact, Customer, Interaction
+
+        customers = Customer.objects.bulk_create([
+            Customer(
+                name=f'{rng.choice(LAST_NAMES)} {rng.choice(WORDS).title()} {token(rng)[:6]}',
+                email=f'{token(rng)[:12]}@customer.example',
+                phone=f'+1555{rng.randint(1000000, 9999999)}',
+                status=rng.choice(['lead', 'customer', 'customer', 'inactive']),
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        contacts = Contact.objects.bulk_create([
+            Contact(
+                customer=customer,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{token(rng)[:12]}@contact.example',
+                position=rng.choice(['CEO', 'CFO', 'Buyer', 'Engineer', 'Office Manager']),
+                is_primary=index == 0,
+            )
+            for customer in customers
+            for index in range(2)
+        ], batch_size=BATCH_SIZE)
+        interactions = Interaction.objects.bulk_create([
+            Interaction(
+                customer_id=contact.customer_id,
+                contact=contact,
+                type=rng.choice(['call', 'email', 'meeting', 'note']),
+                notes=sentence(rng, 12),
+                date=random_datetime(rng, context.anchor_date),
+                created_by_id=context.user_id,
+            )
+            for contact in contacts
+            for _ in range(rng.choice((2, 3)))
+        ], batch_size=BATCH_SIZE)
+        return len(customers) + len(contacts) + len(interactions)
+
+
+# Synthetic chart of accounts: (code, name, type, parent code)
+CHART_OF_ACCOUNTS = [
+    ('1000', 'Assets', 'asset', None),
+    ('1010', 'Cash', 'asset', '1000'),
+    ('1020', 'Bank', 'asset', '1000'),
+    ('1100', 'Accounts Receivable', 'asset', '1000'),
+    ('2000', 'Liabilities', 'liability', None),
+    ('2100', 'Accounts Payable', 'liability', '2000'),
+    ('3000', 'Owner Equity', 'equity', None),
+    ('4000', 'Income', 'income', None),
+    ('4010', 'Product Sales', 'income', '4000'),
+    ('4020', 'Service Revenue', 'income', '4000'),
+    ('5000', 'Expenses', 'expense', None),
+    ('5010', 'Rent', 'expense', '5000'),
+    ('5020', 'Salaries', 'expense', '5000'),
+    ('5030', 'Supplies', 'expense', '5000'),
+]
+
+
+class LedgerGenerator(Generator):
+    """Transactions with two to four lines whose debits and credits balance."""
+    name = 'ledger'
+    share = 0.25
+    rows_per_unit = 4
+
+    def setup(self, context):
+        from accounting.models import Account
+
+        for code, name, account_type, parent_code in CHART_OF_ACCOUNTS:
+            if not Account.objects.filter(account_code=code).exists():
+                Account.objects.create(
+                    account_code=code,
+                    name=name,
+                    account_type=account_type,
+                    parent=Account.objects.filter(account_code=parent_code).first(),
+                )
+
+    def split(self, rng, total, parts):
+        """total split into parts positive amounts that add up exactly."""
+        cents = int(total / CENT)
+        cuts = sorted(rng.sample(range(1, cents), parts - 1)) if parts > 1 else []
+        bounds = [0] + cuts + [cents]
+        return [Decimal(high - low) * CENT for low, high in zip(bounds, bounds[1:])]
+
+    def write_chunk(self, rng, count, context):
+        from accounting.models import Account, Transaction, TransactionLine
+
+        leaf_accounts = context.ids(Account, 'pk', 'account_code')
+        leaf_ids = [pk for pk, code in leaf_accounts if not code.endswith('000')]
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                date=random_date(rng, context.anchor_date),
+                description=sentence(rng),
+                reference_number=f'SYN-{token(rng)}',
+                status=rng.choice(['posted'] * 9 + ['draft']),
+                transaction_type=rng.choice(['invoice', 'payment', 'expense', 'journal']),
+                total_amount=money(rng, 10, 5000),
+                created_by_id=context.user_id,
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+
+        lines = []
+        for txn in transactions:
+            accounts = rng.sample(leaf_ids, rng.choice((2, 3, 4)))
+            amounts = self.split(rng, txn.total_amount, len(accounts) - 1)
+            split_debits = rng.random() < 0.5
+            for account_id, amount in zip(accounts[1:], amounts):
+                lines.append(TransactionLine(
+                    transaction=txn,
+                    Account_id=account_id,
+                    debit_amount=amount if split_debits else 0,
+                    credit_amount=0 if split_debits else amount,
+                ))
+            lines.append(TransactionLine(
+                transaction=txn,
+                Account_id=accounts[0],
+                debit_amount=0 if split_debits else txn.total_amount,
+                credit_amount=txn.total_amount if split_debits else 0,
+            ))
+        TransactionLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+        return len(transactions) + len(lines)
+
+    def finish(self, context):
+        from accounting.ledger import rebuild_account_balances
+
+        rebuild_account_balances()
+
+
+class InvoiceGenerator(Generator):
+    """Invoices for existing customers with their lines and, for most, a payment."""
+    name = 'invoices'
+    share = 0.15
+    rows_per_unit = 3.6
+    requires = ('crm',)
+
+    def write_chunk(self, rng, count, context):
+        from accounting.models import Invoice, InvoiceLine, Payment
+        from crm.models import Customer
+
+        customer_ids = context.ids(Customer)
+        anchor_date = context.anchor_date
+        invoices, lines, payments = [], [], []
+        for _ in range(count):
+            issue_date = random_date(rng, context.anchor_date)
+            invoice = Invoice(
+                customer_id=rng.choice(customer_ids),
+                invoice_number=f'SYN-{token(rng)}',
+                issue_date=issue_date,
+                due_date=issue_date + timedelta(days=rng.choice((15, 30, 60))),
+                created_by_id=context.user_id,
+            )
+            invoice_lines = [
+                InvoiceLine(
+                    invoice=invoice,
+                    description=sentence(rng, 3),
+                    quantity=Decimal(rng.randint(1, 10)),
+                    unit_price=money(rng, 5, 800),
+                )
+                for _ in range(rng.choice((1, 2, 3)))
+            ]
+            invoice.subtotal = invoice.total_amount = sum(
+                (line.quantity * line.unit_price).quantize(CENT) for line in invoice_lines
+            )
+            invoice.status = 'sent'
+            if rng.random() < 0.6:
+                amount = invoice.total_amount if rng.random() < 0.8 else (invoice.total_amount / 2).quantize(CENT)
+                payments.append(Payment(
+                    invoice=invoice,
+                    payment_date=min(issue_date + timedelta(days=rng.randint(0, 45)), anchor_date),
+                    payment_method=rng.choice(['cash', 'bank_transfer', 'credit_card', 'check', 'mobile_money']),
+                    amount=amount,
+                    reference_number=f'SYN-{token(rng)}',
+                    created_by_id=context.user_id,
+                ))
+                invoice.amount_paid = amount
+            invoice.balance_due = invoice.total_amount - invoice.amount_paid
+            if not invoice.balance_due:
+                invoice.status = 'paid'
+            elif invoice.due_date < anchor_date:
+                invoice.status = 'overdue'
+            invoices.append(invoice)
+            lines.extend(invoice_lines)
+
+        # Lines and payments take the invoice pks assigned by this insert
+        Invoice.objects.bulk_create(invoices, batch_size=BATCH_SIZE)
+        InvoiceLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+        Payment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+        return len(invoices) + len(lines) + len(payments)
+
+
+class HRMGenerator(Generator):
+    """Employees with their leave requests."""
+    name = 'hrm'
+    share = 0.08
+    rows_per_unit = 5
+
+    def setup(self, context):
+        from hrm.models import LeaveType
+
+        for name, days in (('Annual', 21), ('Sick', 10), ('Unpaid', 30)):
+            LeaveType.objects.get_or_create(name=name, defaults={'days_allowed': days})
+
+    def write_chunk(self, rng, count, context):
+        from hrm.models import Employee, LeaveRequest, LeaveType
+
+        leave_type_ids = context.ids(LeaveType)
+        employees = Employee.objects.bulk_create([
+            Employee(
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{token(rng)[:16]}@employee.example',
+                phone=f'+1555{rng.randint(1000000, 9999999)}',
+                department=rng.choice(['Sales', 'Finance', 'Engineering', 'Support', 'People']),
+                position=rng.choice(['Associate', 'Specialist', 'Lead', 'Manager']),
+                hire_date=random_date(rng, context.anchor_date, 10 * 365),
+                status=rng.choice(['active'] * 8 + ['inactive', 'terminated']),
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        leave_requests = []
+        for employee in employees:
+            for _ in range(4):
+                start_date = random_date(rng, context.anchor_date, 2 * 365)
+                leave_requests.append(LeaveRequest(
+                    employee=employee,
+                    leave_type_id=rng.choice(leave_type_ids),
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=rng.randint(0, 10)),
+                    reason=sentence(rng),
+                    status=rng.choice(['pending', 'approved', 'approved', 'rejected']),
+                ))
+        LeaveRequest.objects.bulk_create(leave_requests, batch_size=BATCH_SIZE)
+        return len(employees) + len(leave_requests)
+
+
+class OKRGenerator(Generator):
+    """Objectives with three key results each, plus one task per objective."""
+    name = 'okr'
+    share = 0.07
+    rows_per_unit = 5
+
+    def write_chunk(self, rng, count, context):
+        from okrapp.models import KeyResult, Objective, Task
+
+        objectives = Objective.objects.bulk_create([
+            Objective(
+                title=sentence(rng, 4),
+                description=sentence(rng, 12),
+                owner_id=context.user_id,
+                due_date=random_date(rng, context.anchor_date, 365) + timedelta(days=365),
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        key_results = KeyResult.objects.bulk_create([
+            KeyResult(
+                objective=objective,
+                title=sentence(rng, 4),
+                target_value=float(rng.randint(10, 1000)),
+                current_value=float(rng.randint(0, 1000)),
+            )
+            for objective in objectives
+            for _ in range(3)
+        ], batch_size=BATCH_SIZE)
+        tasks = Task.objects.bulk_create([
+            Task(
+                title=sentence(rng, 4),
+                description=sentence(rng, 10),
+                due_date=random_date(rng, context.anchor_date, 365) + timedelta(days=180),
+                completed=rng.random() < 0.4,
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        return len(objectives) + len(key_results) + len(tasks)
+
+
+class DocumentGenerator(Generator):
+    """Document records owned by the benchmark user (no files are written)."""
+    name = 'documents'
+    share = 0.03
+
+    def write_chunk(self, rng, count, context):
+        from documents.models import Document
+
+        documents = Document.objects.bulk_create([
+            Document(
+                title=sentence(rng, 4),
+                description=sentence(rng, 10),
+                file=f'documents/synthetic-{token(rng)}.{rng.choice(["pdf", "docx", "txt"])}',
+                created_by_id=context.user_id,
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        return len(documents)
+
+
+class MeetingGenerator(Generator):
+    """Meetings organized by the benchmark user with three attendees each, half of them with a customer."""
+    name = 'meetings'
+    share = 0.02
+    rows_per_unit = 4
+    requires = ('crm',)
+    attendee_count = 20
+
+    def setup(self, context):
+        User = get_user_model()
+        existing = set(User.objects.filter(email__endswith='@attendee.example').values_list('email', flat=True))
+        User.objects.bulk_create([
+            User(
+                email=email,
+                first_name=FIRST_NAMES[index % len(FIRST_NAMES)],
+                last_name=LAST_NAMES[index % len(LAST_NAMES)],
+                role=User.Role.PROJECT_MEMBER,
+                password='!',
+            )
+            for index in range(self.attendee_count)
+            if (email := f'attendee-{index}@attendee.example') not in existing
+        ])
+
+    def write_chunk(self, rng, count, context):
+        from crm.models import Customer
+        from meeting_mgmt.models import Meeting
+
+        User = get_user_model()
+        customer_ids = context.ids(Customer)
+        attendee_ids = [pk for pk, email in context.ids(User, 'pk', 'email') if email.endswith('@attendee.example')]
+        meetings = Meeting.objects.bulk_create([
+            Meeting(
+                title=sentence(rng, 4),
+                description=sentence(rng, 10),
+                meeting_time=random_datetime(rng, context.anchor_date, 365),
+                organizer_id=context.user_id,
+                google_meet_link=f'https://meet.google.com/{token(rng)[:10]}',
+                customer_id=rng.choice(customer_ids) if customer_ids and rng.random() < 0.5 else None,
+            )
+            for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        Attendee = Meeting.attendees.through
+        attendees = Attendee.objects.bulk_create([
+            Attendee(meeting_id=meeting.pk, customuser_id=user_id)
+            for meeting in meetings
+            for user_id in rng.sample(attendee_ids, 3)
+        ], batch_size=BATCH_SIZE)
+        return len(meetings) + len(attendees)
+
+
+GENERATORS = [
+    CRMGenerator(),
+    LedgerGenerator(),
+    InvoiceGenerator(),
+    HRMGenerator(),
+    OKRGenerator(),
+    DocumentGenerator(),
+    MeetingGenerator(),
+]
+
+
+GENERATORS_BY_NAME = {generator.name: generator for generator in GENERATORS}
+
+# Context of a worker process, set up by init_worker
+_worker_context = None
+
+
+def write_chunk(generator, seed, chunk, count, context):
+    with db_transaction.atomic():
+        return generator.write_chunk(chunk_rng(seed, generator.name, chunk), count, context)
+
+
+def init_worker(database_name, anchor_date):
+    """Process pool initializer: set up Django against the parent's database."""
+    global _worker_context
+    import django
+
+    django.setup()
+    from django.db import connections
+
+    connections['default'].settings_dict['NAME'] = database_name
+    _worker_context = GenerationContext(anchor_date)
+
+
+def run_chunk(name, seed, chunk, count):
+    return write_chunk(GENERATORS_BY_NAME[name], seed, chunk, count, _worker_context)
+
+
+def phases(generators):
+    """Generators grouped so each group only requires generators of earlier groups."""
+    names = {generator.name for generator in generators}
+    done, remaining, grouped = set(), list(generators), []
+    while remaining:
+        ready = [g for g in remaining if all(name in done or name not in names for name in g.requires)]
+        if not ready:
+            raise ValueError('Generators have circular requirements')
+        grouped.append(ready)
+        done.update(generator.name for generator in ready)
+        remaining = [generator for generator in remaining if generator not in ready]
+    return grouped
+
+
+def chunks(units, chunk_size=CHUNK_SIZE):
+    return [(chunk, min(chunk_size, units - start)) for chunk, start in enumerate(range(0, units, chunk_size))]
+
+
+def generate(total_rows, seed=0, generators=GENERATORS, factors=None, workers=1, log=None,
+             anchor_date=ANCHOR_DATE):
+    """
+    Write about total_rows rows across the generators, dated up to anchor_date.
+
+    factors scales individual generators by name. With workers > 1 the
+    chunks of each phase are spread over that many processes, interleaving
+    generators so every table is written in parallel. Returns the number
+    of rows written per generator name.
+    """
+    factors = factors or {}
+    context = GenerationContext(anchor_date)
+    benchmark_user()
+    for generator in generators:
+        generator.setup(context)
+
+    written = {generator.name: 0 for generator in generators}
+    for phase in phases(generators):
+        started = time.monotonic()
+        tasks = [
+            (generator.name, seed, chunk, count)
+            for generator in phase
+            for chunk, count in chunks(generator.units(total_rows, factors.get(generator.name, 1.0)))
+        ]
+        tasks.sort(key=lambda task: task[2])
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(connection.settings_dict['NAME'], anchor_date),
+            ) as pool:
+                for task, rows in zip(tasks, pool.map(run_chunk, *zip(*tasks))):
+                    written[task[0]] += rows
+        else:
+            for name, *arguments in tasks:
+                written[name] += write_chunk(GENERATORS_BY_NAME[name], *arguments, context)
+
+        for generator in phase:
+            generator.finish(context)
+        if log:
+            elapsed = time.monotonic() - started
+            rows = sum(written[generator.name] for generator in phase)
+            log(
+                ', '.join(f'{generator.name}: {written[generator.name]} rows' for generator in phase)
+                + f' ({elapsed:.1f}s, {rows / elapsed if elapsed else 0:.0f} rows/s)'
+            )
+    return written
@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.db.models import F, Max, Min, Sum
+from django.test import TestCase
+
+from crm.models import Interaction
+from accounting.models import Invoice, Transaction
+from .harness import compare, percentile
+from .synthetic import CRMGenerator, InvoiceGenerator, LedgerGenerator, chunks, generate, phases
+
+
+class HarnessTest(TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = {'crm.customers': {'p95_ms': 10, 'p99_ms': 20, 'rps': 100, 'queries': 2, 'errors': 0}}
+        within = {'crm.customers': {'p95_ms': 12, 'p99_ms': 24, 'rps': 80, 'queries': 2, 'errors': 0}}
+        worse = {'crm.customers': {'p95_ms': 13, 'p99_ms': 20, 'rps': 100, 'queries': 3, 'errors': 0}}
+        self.assertEqual(compare(within, baseline, 0.25), [])
+        self.assertEqual(len(compare(worse, baseline, 0.25)), 2)
+
+
+class SyntheticDataTest(TestCase):
+    def test_generated_rows_are_consistent(self):
+        """
+        Ledger entries balance and interactions belong to their contact's customer
+        """
+        written = generate(500, seed=1)
+        self.assertEqual(set(written), {'crm', 'ledger', 'invoices', 'hrm', 'okr', 'documents', 'meetings'})
+        unbalanced = Transaction.objects.annotate(
+            debits=Sum('lines__debit_amount'), credits=Sum('lines__credit_amount')
+        ).exclude(debits=F('credits'))
+        self.assertFalse(unbalanced.exists())
+        self.assertFalse(Interaction.objects.exclude(customer=F('contact__customer')).exists())
+
+    def test_generators_run_after_their_requirements(self):
+        crm, ledger, invoices = CRMGenerator(), LedgerGenerator(), InvoiceGenerator()
+        self.assertEqual(phases([invoices, crm, ledger]), [[crm, ledger], [invoices]])
+        self.assertEqual(phases([invoices]), [[invoices]])
+        self.assertEqual(chunks(4500), [(0, 2000), (1, 2000), (2, 500)])
+
+    def test_factors_scale_single_generators(self):
+        written = generate(500, seed=1, generators=[CRMGenerator()], factors={'crm': 2})
+        self.assertGreater(written['crm'], 500 * CRMGenerator.share * 1.5)
+
+    def test_dates_count_back_from_the_anchor_date(self):
+        """
+        Dates and invoice statuses depend on the anchor date, not on the day the data is generated
+        """
+        anchor_date = date(2020, 6, 30)
+        generate(500, seed=1, generators=[CRMGenerator(), InvoiceGenerator()], anchor_date=anchor_date)
+        issued = Invoice.objects.aggregate(first=Min('issue_date'), last=Max('issue_date'))
+        self.assertGreaterEqual(issued['first'], date(2017, 7, 1))
+        self.assertLessEqual(issued['last'], anchor_date)
+        self.assertFalse(Invoice.objects.filter(status='overdue', due_date__gte=anchor_date).exists())
+        self.assertFalse(Interaction.objects.filter(date__date__gt=anchor_date).exists())
@@ -0,0 +1,321 @@
+"""
+Duplicate detection and merging for customers and contacts.
+
+Comparing every pair of records does not scale, so each record gets a few
+blocking keys (email domain, website host, phonetic name, phone digits,
+see the keys() methods) stored in BlockingKey. A run rebuilds the keys of
+the records changed since the previous finished run and scores each of
+them only against the records sharing one of its keys; pairs scoring at
+least the finder's threshold become DuplicateCandidates. Keys shared by
+more than MAX_BLOCK_SIZE records (a very common surname, say) tell little
+and are skipped.
+
+merge() folds one record into another: rows of every model pointing at
+the duplicate are re-pointed with one UPDATE per relation, blank fields
+of the survivor are filled from the duplicate and the duplicate is
+deleted. Contacts moved to a customer that already has a primary contact
+stop being primary; contacts of different customers are not merged.
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import islice
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import BlockingKey, Contact, Customer, DedupRun, DuplicateCandidate
+
+CHUNK_SIZE = 2000
+MAX_BLOCK_SIZE = 200
+
+# Words that do not tell companies apart
+LEGAL_SUFFIXES = {
+    'ag', 'bv', 'co', 'company', 'corp', 'corporation', 'gmbh', 'inc', 'incorporated', 'limited',
+    'llc', 'ltd', 'plc', 'sa', 'the',
+}
+# Addresses at these domains say nothing about the company
+FREE_MAIL_DOMAINS = {
+    'aol.com', 'gmail.com', 'gmx.de', 'googlemail.com', 'hotmail.com', 'icloud.com', 'live.com',
+    'mail.com', 'outlook.com', 'proton.me', 'protonmail.com', 'yahoo.com', 'yandex.ru',
+}
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def name_tokens(name):
+    """Lower-case ASCII words of a name, without legal suffixes."""
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    return [token for token in re.split(r'[^a-z0-9]+', text) if token and token not in LEGAL_SUFFIXES]
+
+
+def soundex(word):
+    """American Soundex code of a word, e.g. Robert -> R163."""
+    letters = [char for char in word.lower() if char.isalpha()]
+    if not letters:
+        return word
+    code, previous = letters[0].upper(), SOUNDEX_CODES.get(letters[0])
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+        # h and w do not separate letters with the same code; vowels do
+        if char not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def phone_digits(phone):
+    """The last nine digits of a phone number, so country prefixes do not matter."""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-9:] if len(digits) >= 7 else ''
+
+
+def email_domain(email):
+    domain = (email or '').rpartition('@')[2].lower()
+    return '' if domain in FREE_MAIL_DOMAINS else domain
+
+
+def website_host(url):
+    if not url:
+        return ''
+    host = urlsplit(url if '//' in url else f'//{url}').hostname or ''
+    return host.removeprefix('www.')
+
+
+def similarity(first, second):
+    if not first or not second:
+        return 0.0
+    return SequenceMatcher(None, first, second).ratio()
+
+
+class DuplicateFinder:
+    """Blocking keys and pair scoring of one model."""
+    kind = None
+    model = None
+    fields = ()
+    threshold = 0.6
+
+    def prepare(self, row):
+        """Normalized values of a row of fields, used by keys() and score()."""
+        raise NotImplementedError
+
+    def keys(self, record):
+        raise NotImplementedError
+
+    def score(self, first, second):
+        """(score, reasons) of a pair of prepared records."""
+        raise NotImplementedError
+
+    def records(self, ids):
+        rows = self.model._default_manager.filter(pk__in=ids).values('pk', *self.fields)
+        return {row['pk']: self.prepare(row) for row in rows}
+
+    def changed_ids(self, since):
+        queryset = self.model._default_manager.order_by('pk')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        return queryset.values_list('pk', flat=True).iterator(chunk_size=CHUNK_SIZE)
+
+    def run(self, full=False):
+        """Rebuild the keys of changed records and store their new candidate pairs; returns the DedupRun."""
+        previous = None if full else (
+            DedupRun.objects.filter(kind=self.kind, finished_at__isnull=False).order_by('-started_at').first()
+        )
+        run = DedupRun.objects.create(kind=self.kind, full=previous is None, started_at=timezone.now())
+        if previous is None:
+            BlockingKey.objects.filter(kind=self.kind).delete()
+
+        ids = self.changed_ids(previous.started_at if previous else None)
+        while chunk := list(islice(ids, CHUNK_SIZE)):
+            with transaction.atomic():
+                run.candidates += self.process_chunk(chunk)
+            run.records += len(chunk)
+
+        run.finished_at = timezone.now()
+        run.save()
+        return run
+
+    def process_chunk(self, ids):
+        records = self.records(ids)
+        record_keys = {pk: self.keys(record) for pk, record in records.items()}
+
+        BlockingKey.objects.filter(kind=self.kind, record_id__in=ids).delete()
+        BlockingKey.objects.bulk_create([
+            BlockingKey(kind=self.kind, record_id=pk, key=key)
+            for pk, keys in record_keys.items()
+            for key in keys
+        ])
+        # Changed records are scored afresh; merged and dismissed pairs stay decided
+        DuplicateCandidate.objects.filter(
+            Q(first_id__in=ids) | Q(second_id__in=ids), kind=self.kind, status='open'
+        ).delete()
+
+        all_keys = {key for keys in record_keys.values() for key in keys}
+        usable = [
+            row['key'] for row in BlockingKey.objects.filter(kind=self.kind, key__in=all_keys)
+            .values('key').annotate(size=Count('id')).filter(size__gt=1, size__lte=MAX_BLOCK_SIZE)
+        ]
+        blocks = {}
+        for key, record_id in BlockingKey.objects.filter(kind=self.kind, key__in=usable).values_list(
+            'key', 'record_id'
+        ):
+            blocks.setdefault(key, []).append(record_id)
+
+        pairs = {
+            (min(pk, other), max(pk, other))
+            for pk, keys in record_keys.items()
+            for key in keys
+            for other in blocks.get(key, ())
+            if other != pk
+        }
+        partners = self.records({pk for pair in pairs for pk in pair} - records.keys())
+        partners.update(records)
+
+        candidates = []
+        for first_id, second_id in pairs:
+            if first_id not in partners or second_id not in partners:
+                continue  # deleted since its keys were written
+            score, reasons = self.score(partners[first_id], partners[second_id])
+            if score >= self.threshold:
+                candidates.append(DuplicateCandidate(
+                    kind=self.kind, first_id=first_id, second_id=second_id, score=round(score, 4), reasons=reasons,
+                ))
+        return len(DuplicateCandidate.objects.bulk_create(candidates, ignore_conflicts=True))
+
+
+class CustomerDuplicateFinder(DuplicateFinder):
+    kind = 'customer'
+    model = Customer
+    fields = ('name', 'email', 'phone', 'website')
+
+    def prepare(self, row):
+        tokens = name_tokens(row['name'])
+        return {
+            'name': ' '.join(tokens),
+            'phonetic': ' '.join(soundex(token) for token in tokens[:2]),
+            'email': row['email'].lower(),
+            'domain': email_domain(row['email']),
+            'host': website_host(row['website']),
+            'phone': phone_digits(row['phone']),
+        }
+
+    def keys(self, record):
+        keys = []
+        if record['phonetic']:
+            keys.append(f'name:{record["phonetic"]}')
+        for field in ('domain', 'host', 'phone'):
+            if record[field]:
+                keys.append(f'{field}:{record[field]}')
+        return keys
+
+    def score(self, first, second):
+        name = similarity(first['name'], second['name'])
+        score, reasons = 0.6 * name, [f'name {name:.2f}']
+        if first['email'] and first['email'] == second['email']:
+            score, reasons = score + 0.4, reasons + ['email']
+        elif first['domain'] and first['domain'] == second['domain']:
+            score, reasons = score + 0.2, reasons + ['email domain']
+        for field, weight, reason in (('host', 0.2, 'website'), ('phone', 0.3, 'phone')):
+            if first[field] and first[field] == second[field]:
+                score, reasons = score + weight, reasons + [reason]
+        return min(score, 1.0), reasons
+
+
+class ContactDuplicateFinder(DuplicateFinder):
+    kind = 'contact'
+    model = Contact
+    fields = ('customer_id', 'first_name', 'last_name', 'email', 'phone')
+
+    def prepare(self, row):
+        first, last = name_tokens(row['first_name']), name_tokens(row['last_name'])
+        return {
+            'customer': row['customer_id'],
+            'name': ' '.join(first + last),
+            'phonetic': '-'.join(soundex(token) for token in first[:1] + last[-1:]),
+            'email': row['email'].lower(),
+            'phone': phone_digits(row['phone']),
+        }
+
+    def keys(self, record):
+        keys = []
+        if record['phonetic']:
+            keys.append(f'name:{record["phonetic"]}')
+        for field in ('email', 'phone'):
+            if record[field]:
+                keys.append(f'{field}:{record[field]}')
+        return keys
+
+    def score(self, first, second):
+        name = similarity(first['name'], second['name'])
+        score, reasons = 0.4 * name, [f'name {name:.2f}']
+        for field, weight, reason in (('email', 0.6, 'email'), ('phone', 0.2, 'phone'), ('customer', 0.1, 'customer')):
+            if first[field] and first[field] == second[field]:
+                score, reasons = score + weight, reasons + [reason]
+        return min(score, 1.0), reasons
+
+
+FINDERS = {
+    'customer': CustomerDuplicateFinder,
+    'contact': ContactDuplicateFinder,
+}
+
+
+class MergeError(ValueError):
+    """The two records cannot be merged."""
+
+
+def merge(survivor, duplicate):
+    """
+    Fold duplicate into survivor, which must be of the same model, and
+    return survivor. Returns after the duplicate has been deleted.
+    Contacts of different customers are not merged.
+    """
+    model = type(survivor)
+    kind = {Customer: 'customer', Contact: 'contact'}[model]
+    now = timezone.now()
+    with transaction.atomic():
+        # Both rows are locked and read again so a concurrent edit or merge is not lost
+        locked = model.objects.select_for_update().order_by('pk').in_bulk([survivor.pk, duplicate.pk])
+        if len(locked) != 2:
+            raise MergeError('One of the two records no longer exists')
+        survivor, duplicate = locked[survivor.pk], locked[duplicate.pk]
+        if model is Contact and survivor.customer_id != duplicate.customer_id:
+            # Their interactions would keep the customer of the dropped contact
+            raise MergeError('Contacts of different customers cannot be merged')
+        if model is Customer and Contact.objects.filter(customer=survivor, is_primary=True).exists():
+            # A customer has one primary contact; the survivor keeps its own
+            Contact.objects.filter(customer=duplicate, is_primary=True).update(is_primary=False)
+        for relation in model._meta.related_objects:
+            if not relation.one_to_many:
+                continue
+            changes = {relation.field.name: survivor}
+            # Moved rows count as changed for the next incremental run
+            if any(getattr(field, 'auto_now', False) and field.name == 'updated_at'
+                   for field in relation.related_model._meta.concrete_fields):
+                changes['updated_at'] = now
+            relation.related_model._base_manager.filter(**{relation.field.name: duplicate}).update(**changes)
+
+        fill = [
+            field for field in model._meta.concrete_fields
+            if field.editable and not field.primary_key and not field.is_relation
+            and getattr(survivor, field.attname) in ('', None)
+            and getattr(duplicate, field.attname) not in ('', None)
+        ]
+        for field in fill:
+            setattr(survivor, field.attname, getattr(duplicate, field.attname))
+
+        BlockingKey.objects.filter(kind=kind, record_id=duplicate.pk).delete()
+        pair = (min(survivor.pk, duplicate.pk), max(survivor.pk, duplicate.pk))
+        DuplicateCandidate.objects.filter(kind=kind, first_id=pair[0], second_id=pair[1]).update(status='merged')
+        DuplicateCandidate.objects.filter(
+            Q(first_id=duplicate.pk) | Q(second_id=duplicate.pk), kind=kind
+        ).exclude(first_id=pair[0], second_id=pair[1]).delete()
+        duplicate.delete()
+        if fill:
+            survivor.save(update_fields=[field.name for field in fill] + ['updated_at'])
+    return survivor
@@ -0,0 +1,359 @@
+"""
+Streaming bulk import of customers and contacts from CSV or NDJSON.
+
+Files are read one record at a time and handled in chunks, so memory use
+depends on the chunk size and not on the file. Every chunk is checked as a
+whole: field values against the model fields, then duplicate external ids
+and emails within the chunk and against existing rows with one query each,
+and the valid rows are upserted on external_id with a single
+bulk_create(update_conflicts=True). Each chunk commits on its own, so a long
+import keeps what it has written if it is interrupted.
+
+Rejected rows are written to an error report (line, external_id, field,
+message) as they are found. Empty cells take the field's default; columns
+missing from the file are left untouched on existing rows. The first NDJSON
+record sets the file's columns, and later records with other keys are
+rejected.
+"""
+import codecs
+import csv
+import io
+import json
+import tempfile
+from dataclasses import dataclass
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import Contact, Customer
+
+CHUNK_SIZE = 5000
+FORMATS = ('csv', 'ndjson')
+ERROR_REPORT_HEADER = ['line', 'external_id', 'field', 'message']
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported (unknown format, bad header)."""
+
+
+@dataclass
+class ImportResult:
+    total_rows: int = 0
+    created_rows: int = 0
+    updated_rows: int = 0
+    failed_rows: int = 0
+
+
+def detect_format(file_name, declared=None):
+    if declared:
+        if declared not in FORMATS:
+            raise ImportFileError(f'Unsupported format {declared!r}; use csv or ndjson')
+        return declared
+    extension = file_name.rsplit('.', 1)[-1].lower() if '.' in file_name else ''
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    raise ImportFileError('Cannot tell the file format from its name; pass format=csv or format=ndjson')
+
+
+def read_records(binary_file, file_format):
+    """
+    Yield (line number, record) from a binary file. Records are dicts, or
+    an error message for NDJSON lines that are not JSON objects.
+    """
+    text = codecs.getreader('utf-8-sig')(binary_file)
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, f'Invalid JSON: {e}'
+            continue
+        yield line_number, record if isinstance(record, dict) else 'Expected a JSON object'
+
+
+class Importer:
+    """
+    Validation and upsert of one model. columns maps file columns to model
+    fields; a file must have the required columns and no unknown ones.
+    """
+    model = None
+    columns = {}
+    required = ()
+    # Columns holding references that resolve() turns into foreign keys
+    resolved_columns = ()
+    # Duplicate emails are looked for among rows sharing these columns
+    email_scope = ()
+
+    def __init__(self, report):
+        self.report = report
+        self.fields = {column: self.model._meta.get_field(name) for column, name in self.columns.items()}
+        self.present = None
+
+    def check_columns(self, record):
+        columns = set(record)
+        unknown = sorted(columns - set(self.columns))
+        if unknown:
+            raise ImportFileError(f'Unknown columns: {", ".join(unknown)}')
+        missing = [column for column in self.required if column not in columns]
+        if missing:
+            raise ImportFileError(f'Missing required columns: {", ".join(missing)}')
+        self.present = [column for column in self.columns if column in columns]
+
+    def column_mismatch(self, record):
+        """
+        Why an NDJSON record's keys differ from the first record's, or None.
+        The first record fixes the columns written for the whole file, so a
+        record without one of them would blank it on existing rows.
+        """
+        # csv.DictReader keeps cells beyond the header under None
+        columns = set(record) - {None}
+        if columns == set(self.present):
+            return None
+        unknown = sorted(columns - set(self.columns))
+        if unknown:
+            return f'Unknown columns: {", ".join(unknown)}'
+        missing = [column for column in self.present if column not in columns]
+        extra = [column for column in self.columns if column in columns and column not in self.present]
+        return 'Columns differ from the first record: ' + '; '.join(
+            f'{label} {", ".join(names)}' for label, names in (('missing', missing), ('extra', extra)) if names
+        )
+
+    def reject(self, line, key, field, messages):
+        for message in messages:
+            self.report(line, key, field, message)
+
+    def clean_row(self, line, record):
+        """Model field values of a record, or None after reporting its errors."""
+        values, failed = {}, False
+        key = str(record.get('external_id') or '').strip()
+        for column in self.present:
+            field = self.fields[column]
+            value = record.get(column)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                value = field.get_default() if field.has_default() else ''
+            elif isinstance(value, str):
+                value = value.strip()
+            if column not in self.resolved_columns:
+                try:
+                    value = field.clean(value, None)
+                except ValidationError as e:
+                    self.reject(line, key, column, e.messages)
+                    failed = True
+                    continue
+            values[column] = value
+        if not key:
+            self.report(line, '', 'external_id', 'This field is required.')
+            failed = True
+        return None if failed else values
+
+    def resolve(self, rows):
+        """Turn reference columns into foreign keys; returns the rows that resolved."""
+        return rows
+
+    def clean_chunk(self, chunk, started):
+        """Rows of chunk that pass every check, as (line, values) pairs."""
+        rows = []
+        for line, record in chunk:
+            if isinstance(record, str):
+                self.report(line, '', '', record)
+                continue
+            if self.present is None:
+                self.check_columns(record)
+            elif message := self.column_mismatch(record):
+                self.report(line, str(record.get('external_id') or '').strip(), '', message)
+                continue
+            values = self.clean_row(line, record)
+            if values is not None:
+                rows.append((line, values))
+        if not rows:
+            return [], {}
+        rows = self.resolve(rows)
+
+        # Each external id once per file; ids written since the import
+        # started came from an earlier chunk of the same file
+        keys = [values['external_id'] for _, values in rows]
+        existing = {
+            key: (pk, updated_at)
+            for key, pk, updated_at in self.model.objects.filter(external_id__in=keys)
+            .values_list('external_id', 'pk', 'updated_at')
+        }
+        unique_rows, seen = [], set()
+        for line, values in rows:
+            key = values['external_id']
+            previous = existing.get(key)
+            if key in seen or (previous and previous[1] >= started):
+                self.report(line, key, 'external_id', 'Appears more than once in the file')
+                continue
+            seen.add(key)
+            unique_rows.append((line, values))
+        return self.check_emails(unique_rows), existing
+
+    def email_owner_key(self, values):
+        return (values['email'].lower(), *(values[column] for column in self.email_scope))
+
+    def check_emails(self, rows):
+        """Reject rows whose email another row of the chunk or the table already uses."""
+        if 'email' not in self.present:
+            return rows
+        emails = {values['email'].lower() for _, values in rows if values['email']}
+        owners = {}
+        scope_fields = [self.columns[column] for column in self.email_scope]
+        for email, external_id, *scope in (
+            self.model.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails)
+            .values_list('email', 'external_id', *scope_fields)
+        ):
+            owners.setdefault((email.lower(), *scope), set()).add(external_id)
+
+        clean = []
+        for line, values in rows:
+            if values['email']:
+                owner = self.email_owner_key(values)
+                others = owners.get(owner, set()) - {values['external_id']}
+                if others:
+                    self.report(line, values['external_id'], 'email', 'Email is already used by another row')
+                    continue
+                owners.setdefault(owner, set()).add(values['external_id'])
+            clean.append((line, values))
+        return clean
+
+    def write(self, rows):
+        objects = [
+            self.model(**{self.columns[column]: value for column, value in values.items()})
+            for _, values in rows
+        ]
+        update_fields = [self.columns[column] for column in self.present if column != 'external_id']
+        self.model.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['external_id'],
+            update_fields=update_fields + ['updated_at'],
+        )
+
+    def import_chunk(self, chunk, result, started):
+        with transaction.atomic():
+            rows, existing = self.clean_chunk(chunk, started)
+            if rows:
+                self.write(rows)
+        result.total_rows += len(chunk)
+        updated = sum(1 for _, values in rows if values['external_id'] in existing)
+        result.updated_rows += updated
+        result.created_rows += len(rows) - updated
+        result.failed_rows += len(chunk) - len(rows)
+
+
+class CustomerImporter(Importer):
+    model = Customer
+    columns = {
+        'external_id': 'external_id',
+        'name': 'name',
+        'email': 'email',
+        'phone': 'phone',
+        'website': 'website',
+        'address': 'address',
+        'status': 'status',
+    }
+    required = ('external_id', 'name')
+
+
+class ContactImporter(Importer):
+    """Contacts name their customer by its external_id in the customer column."""
+    model = Contact
+    columns = {
+        'external_id': 'external_id',
+        'customer': 'customer_id',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+        'phone': 'phone',
+        'position': 'position',
+        'is_primary': 'is_primary',
+    }
+    required = ('external_id', 'customer', 'first_name', 'last_name')
+    resolved_columns = ('customer',)
+    email_scope = ('customer',)
+
+    def resolve(self, rows):
+        keys = {values['customer'] for _, values in rows}
+        customers = dict(Customer.objects.filter(external_id__in=keys).values_list('external_id', 'pk'))
+        resolved = []
+        for line, values in rows:
+            customer_id = customers.get(values['customer'])
+            if customer_id is None:
+                self.report(line, values['external_id'], 'customer', f'Unknown customer {values["customer"]!r}')
+                continue
+            resolved.append((line, dict(values, customer=customer_id)))
+        return resolved
+
+
+IMPORTERS = {
+    'customers': CustomerImporter,
+    'contacts': ContactImporter,
+}
+
+
+def import_records(kind, records, report, chunk_size=CHUNK_SIZE, result=None):
+    """
+    Import (line, record) pairs of kind in chunks, passing every rejected
+    row to report(line, external_id, field, message). Counts are added to
+    result as each chunk commits; returns it.
+    """
+    importer = IMPORTERS[kind](report)
+    result = result or ImportResult()
+    started = timezone.now()
+    records = iter(records)
+    while chunk := list(islice(records, chunk_size)):
+        importer.import_chunk(chunk, result, started)
+    return result
+
+
+def import_file(kind, binary_file, file_format, report, chunk_size=CHUNK_SIZE, result=None):
+    try:
+        return import_records(kind, read_records(binary_file, file_format), report, chunk_size, result)
+    except UnicodeDecodeError:
+        raise ImportFileError('The file is not UTF-8 encoded')
+    except csv.Error as e:
+        raise ImportFileError(f'Malformed CSV: {e}')
+
+
+def run_import_job(job, binary_file, file_format, chunk_size=CHUNK_SIZE):
+    """Import a file for job, saving its counts, status and error report."""
+    result = ImportResult()
+    with tempfile.TemporaryFile() as buffer:
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(ERROR_REPORT_HEADER)
+        try:
+            import_file(job.kind, binary_file, file_format, lambda *row: writer.writerow(row), chunk_size, result)
+        except ImportFileError as e:
+            job.status, job.error = 'failed', str(e)
+        except Exception as e:
+            job.status, job.error = 'failed', f'Import stopped: {e}'
+            raise
+        else:
+            job.status = 'completed'
+        finally:
+            job.total_rows = result.total_rows
+            job.created_rows = result.created_rows
+            job.updated_rows = result.updated_rows
+            job.failed_rows = result.failed_rows
+            job.finished_at = timezone.now()
+            text.flush()
+            if result.failed_rows:
+                buffer.seek(0)
+                job.error_report.save(f'import-{job.pk}-errors.csv', File(buffer), save=False)
+            job.save()
+            text.detach()
+    return job
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.dedup import FINDERS
+
+
+class Command(BaseCommand):
+    help = (
+        'Look for duplicate customers and contacts. Only records changed '
+        'since the previous run are compared, against the records sharing a '
+        'blocking key with them; --full rebuilds every key.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=[*FINDERS, 'all'], default='all')
+        parser.add_argument('--full', action='store_true', help='Compare every record, not only changed ones')
+
+    def handle(self, *args, **options):
+        kinds = list(FINDERS) if options['kind'] == 'all' else [options['kind']]
+        for kind in kinds:
+            started = time.monotonic()
+            run = FINDERS[kind]().run(full=options['full'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{kind}: {run.records} records checked{" (full run)" if run.full else ""} '
+                f'in {elapsed:.1f}s, {run.candidates} new candidate pairs'
+            ))
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-18 03:32
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_full_text_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customers', 'Customers'), ('contacts', 'Contacts')], help_text='What the file contains', max_length=20)),
+                ('file_name', models.CharField(help_text='Name of the uploaded file', max_length=255)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', help_text='Progress of the import', max_length=20)),
+                ('total_rows', models.PositiveIntegerField(default=0, help_text='Rows read from the file')),
+                ('created_rows', models.PositiveIntegerField(default=0, help_text='Rows inserted')),
+                ('updated_rows', models.PositiveIntegerField(default=0, help_text='Existing rows updated')),
+                ('failed_rows', models.PositiveIntegerField(default=0, help_text='Rows rejected by validation')),
+                ('error', models.TextField(blank=True, help_text='Why the import stopped, if it failed as a whole')),
+                ('error_report', models.FileField(blank=True, help_text='CSV listing every rejected row and why', upload_to='crm/imports/')),
+                ('started_at', models.DateTimeField(auto_now_add=True, help_text='Date and time the import started')),
+                ('finished_at', models.DateTimeField(blank=True, help_text='Date and time the import finished', null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Identifier in the system this contact was imported from', max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Identifier in the system this customer was imported from', max_length=100, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='crm_contact_email_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='crm_customer_email_lower'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='created_by',
+            field=models.ForeignKey(help_text='User who started the import', on_delete=django.db.models.deletion.CASCADE, related_name='crm_imports', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
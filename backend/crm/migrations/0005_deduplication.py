@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_bulk_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DedupRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer', 'Customer'), ('contact', 'Contact')], max_length=20)),
+                ('full', models.BooleanField(default=False, help_text='Whether every record was compared')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('records', models.PositiveIntegerField(default=0, help_text='Records whose blocking keys were rebuilt')),
+                ('candidates', models.PositiveIntegerField(default=0, help_text='New candidate pairs found')),
+            ],
+            options={
+                'get_latest_by': 'started_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='BlockingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer', 'Customer'), ('contact', 'Contact')], max_length=20)),
+                ('record_id', models.PositiveBigIntegerField(help_text='Primary key of the customer or contact')),
+                ('key', models.CharField(max_length=255)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'key'], name='crm_blockin_kind_7c890b_idx'), models.Index(fields=['kind', 'record_id'], name='crm_blockin_kind_05f1a9_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer', 'Customer'), ('contact', 'Contact')], max_length=20)),
+                ('first_id', models.PositiveBigIntegerField(help_text='Lower primary key of the pair')),
+                ('second_id', models.PositiveBigIntegerField(help_text='Higher primary key of the pair')),
+                ('score', models.FloatField(help_text='Similarity between 0 and 1')),
+                ('reasons', models.JSONField(default=list, help_text='What the two records have in common')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('merged', 'Merged'), ('dismissed', 'Dismissed')], default='open', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-score', 'id'],
+                'indexes': [models.Index(fields=['kind', 'second_id'], name='crm_duplica_kind_c47226_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'first_id', 'second_id'), name='crm_duplicate_pair_unique')],
+            },
+        ),
+    ]
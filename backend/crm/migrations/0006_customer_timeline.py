@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 03:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0005_deduplication'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(fields=['customer', 'date', 'id'], name='crm_interac_custome_38ce13_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_customer_timeline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['customer', 'last_name', 'id'], name='crm_contact_custome_353a25_idx'),
+        ),
+    ]
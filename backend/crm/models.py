@@ -1,7 +1,31 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models.functions import Lower
 from django.conf import settings
 
+# Text search configuration of the stored search vectors; queries must use the same
+SEARCH_CONFIG = 'english'
+
+
+def search_document(*weighted_fields):
+    """
+    Stored tsvector over (weight, fields) pairs, maintained by PostgreSQL.
+
+    A generated column is recomputed on every INSERT and UPDATE, including
+    bulk_create and QuerySet.update(), so it cannot drift from the text.
+    """
+    vectors = [SearchVector(*fields, weight=weight, config=SEARCH_CONFIG) for weight, fields in weighted_fields]
+    expression = vectors[0]
+    for vector in vectors[1:]:
+        expression = expression + vector
+    return models.GeneratedField(
+        expression=expression,
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
 class Customer(models.Model):
     """
     Represents a customer or potential customer in the CRM system.
@@ -16,6 +40,13 @@ class Customer(models.Model):
         max_length=200,
         help_text="Company or customer name"
     )
+    external_id = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Identifier in the system this customer was imported from"
+    )
     email = models.EmailField(
         blank=True,
         help_text="Primary email address for the customer"
@@ -59,6 +90,18 @@ class Customer(models.Model):
         help_text="Date and time of the last update"
     )
 
+    # Full-text search document (crm/search.py)
+    search_vector = search_document(('A', ['name']), ('B', ['email', 'website']), ('C', ['phone', 'address']))
+
+    class Meta:
+        indexes = [
+            # Keyset pagination seeks on the list ordering plus the id tie-breaker
+            models.Index(fields=['created_at', 'id']),
+            GinIndex(fields=['search_vector']),
+            # Duplicate email checks of imports (crm/imports.py)
+            models.Index(Lower('email'), name='crm_customer_email_lower'),
+        ]
+
     def __str__(self):
         """Returns the string representation of the customer."""
         return self.name
@@ -78,6 +121,14 @@ class Contact(models.Model):
         help_text="The customer/company this contact belongs to"
     )
     
+    external_id = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Identifier in the system this contact was imported from"
+    )
+
     # Personal Information
     first_name = models.CharField(
         max_length=100,
@@ -116,6 +167,16 @@ class Contact(models.Model):
         help_text="Date and time of the last update"
     )
 
+    # Full-text search document (crm/search.py)
+    search_vector = search_document(('A', ['first_name', 'last_name']), ('B', ['email']), ('C', ['position', 'phone']))
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'last_name', 'id']),
+            GinIndex(fields=['search_vector']),
+            models.Index(Lower('email'), name='crm_contact_email_lower'),
+        ]
+
     def __str__(self):
         """Returns the full name of the contact."""
         return f"{self.first_name} {self.last_name}"
@@ -176,6 +237,168 @@ class Interaction(models.Model):
         help_text="User who recorded this interaction"
     )
 
+    # Full-text search document (crm/search.py)
+    search_vector = search_document(('A', ['notes']), ('D', ['type']))
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['customer', 'date', 'id']),
+            GinIndex(fields=['search_vector']),
+        ]
+
     def __str__(self):
         """Returns a description of the interaction."""
         return f"{self.type} with {self.customer.name} on {self.date.date()}"
+
+class ImportJob(models.Model):
+    """
+    One bulk import of customers or contacts from a CSV or NDJSON file.
+
+    Rows are validated and upserted in chunks (see crm/imports.py); rows
+    that fail validation are skipped and listed in the error report.
+    """
+
+    KIND_CHOICES = [
+        ('customers', 'Customers'),
+        ('contacts', 'Contacts'),
+    ]
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        help_text="What the file contains"
+    )
+    file_name = models.CharField(
+        max_length=255,
+        help_text="Name of the uploaded file"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='running',
+        help_text="Progress of the import"
+    )
+    total_rows = models.PositiveIntegerField(default=0, help_text="Rows read from the file")
+    created_rows = models.PositiveIntegerField(default=0, help_text="Rows inserted")
+    updated_rows = models.PositiveIntegerField(default=0, help_text="Existing rows updated")
+    failed_rows = models.PositiveIntegerField(default=0, help_text="Rows rejected by validation")
+    error = models.TextField(
+        blank=True,
+        help_text="Why the import stopped, if it failed as a whole"
+    )
+    error_report = models.FileField(
+        upload_to='crm/imports/',
+        blank=True,
+        help_text="CSV listing every rejected row and why"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='crm_imports',
+        help_text="User who started the import"
+    )
+    started_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Date and time the import started"
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Date and time the import finished"
+    )
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        """Returns a description of the import."""
+        return f"{self.kind} import of {self.file_name} ({self.status})"
+
+
+DEDUP_KIND_CHOICES = [
+    ('customer', 'Customer'),
+    ('contact', 'Contact'),
+]
+
+
+class BlockingKey(models.Model):
+    """
+    A blocking key of a customer or contact, such as its email domain or
+    phonetic name (see crm/dedup.py). Only records sharing a key are
+    compared when looking for duplicates.
+    """
+
+    kind = models.CharField(max_length=20, choices=DEDUP_KIND_CHOICES)
+    record_id = models.PositiveBigIntegerField(help_text="Primary key of the customer or contact")
+    key = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'key']),
+            models.Index(fields=['kind', 'record_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.record_id}: {self.key}"
+
+
+class DuplicateCandidate(models.Model):
+    """
+    Two customers or two contacts that look like the same record.
+
+    first_id is always the lower primary key of the pair. Candidates stay
+    open until the pair is merged or dismissed; dismissed pairs are not
+    proposed again.
+    """
+
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('merged', 'Merged'),
+        ('dismissed', 'Dismissed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=DEDUP_KIND_CHOICES)
+    first_id = models.PositiveBigIntegerField(help_text="Lower primary key of the pair")
+    second_id = models.PositiveBigIntegerField(help_text="Higher primary key of the pair")
+    score = models.FloatField(help_text="Similarity between 0 and 1")
+    reasons = models.JSONField(default=list, help_text="What the two records have in common")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'first_id', 'second_id'], name='crm_duplicate_pair_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'second_id']),
+        ]
+        ordering = ['-score', 'id']
+
+    def __str__(self):
+        return f"{self.kind} {self.first_id} ~ {self.second_id} ({self.score:.2f})"
+
+
+class DedupRun(models.Model):
+    """
+    One pass of the duplicate finder over the customers or contacts
+    changed since the previous finished run.
+    """
+
+    kind = models.CharField(max_length=20, choices=DEDUP_KIND_CHOICES)
+    full = models.BooleanField(default=False, help_text="Whether every record was compared")
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    records = models.PositiveIntegerField(default=0, help_text="Records whose blocking keys were rebuilt")
+    candidates = models.PositiveIntegerField(default=0, help_text="New candidate pairs found")
+
+    class Meta:
+        get_latest_by = 'started_at'
+
+    def __str__(self):
+        return f"{self.kind} dedup run at {self.started_at}"
@@ -0,0 +1,91 @@
+"""
+Full-text and trigram search over customers, contacts and interactions.
+
+Each model stores a weighted tsvector in search_vector, a generated column
+with a GIN index (see models.py). A search matches rows whose vector holds
+every term as a word prefix, so typing part of a name already finds it.
+When the pg_trgm extension is installed the TRIGRAM_FIELDS are matched by
+word similarity as well, catching typos and fragments inside words; both
+kinds of match are served from GIN indexes instead of ILIKE table scans.
+"""
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+from .models import SEARCH_CONFIG, Contact, Customer, Interaction
+
+# Short text columns with a trigram index (migration 0003)
+TRIGRAM_FIELDS = {
+    Customer: ['name', 'email'],
+    Contact: ['first_name', 'last_name', 'email'],
+    Interaction: [],
+}
+
+
+@lru_cache(maxsize=None)
+def trigram_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def prefix_query(text):
+    """A tsquery matching rows that contain every term of text as a word prefix."""
+    terms = text.split()
+    if not terms:
+        return None
+    quoted = ("'{}':*".format(term.replace('\\', '\\\\').replace("'", "''")) for term in terms)
+    return SearchQuery(' & '.join(quoted), search_type='raw', config=SEARCH_CONFIG)
+
+
+def trigram_fields(model):
+    return TRIGRAM_FIELDS.get(model, []) if trigram_installed() else []
+
+
+def search_condition(model, text):
+    """Q matching rows of model for text, or None when text has no terms."""
+    query = prefix_query(text)
+    if query is None:
+        return None
+    condition = Q(search_vector=query)
+    for field in trigram_fields(model):
+        condition |= Q(**{f'{field}__trigram_word_similar': text})
+    return condition
+
+
+def search_rank(model, text):
+    """Relevance of a matching row: the better of text rank and trigram similarity."""
+    rank = SearchRank(F('search_vector'), prefix_query(text))
+    fields = trigram_fields(model)
+    if fields:
+        rank = Greatest(rank, *[TrigramWordSimilarity(text, field) for field in fields])
+    return rank
+
+
+def ranked_search(queryset, text):
+    """Rows of queryset matching text, best first, annotated with search_rank."""
+    condition = search_condition(queryset.model, text)
+    if condition is None:
+        return queryset.none()
+    return (
+        queryset.filter(condition)
+        .annotate(search_rank=search_rank(queryset.model, text))
+        .order_by('-search_rank', '-pk')
+    )
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the stored search vectors instead of ILIKE over
+    search_fields. Lists keep their own ordering so they stay pageable.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        condition = search_condition(queryset.model, ' '.join(self.get_search_terms(request)))
+        if condition is None:
+            return queryset
+        return queryset.filter(condition)
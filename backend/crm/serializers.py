@@ -1,7 +1,11 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Customer, Contact, Interaction
+from backend.eager_loading import EagerLoadingMixin
+from backend.field_selection import FieldSelectionMixin
+from .imports import FORMATS
+from .models import Customer, Contact, DuplicateCandidate, ImportJob, Interaction
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(FieldSelectionMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Contact model.
     
@@ -58,16 +62,20 @@ class ContactSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Please provide a valid email address")
         return value
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(FieldSelectionMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Customer model.
     
     Includes basic customer information and optionally includes
-    related contacts when requested.
+    related contacts when requested with ?expand=contacts.
     """
     
-    # Nested serializer for contacts - will be included when specified
-    contacts = ContactSerializer(many=True, read_only=True, required=False)
+    # Nested serializer for contacts - only included with ?expand=contacts
+    contacts = ContactSerializer(many=True, read_only=True, required=False, source='contact_set')
+    expandable_fields = ['contacts']
+
+    # Relations read by the fields above, loaded with the queryset when rendered
+    prefetch_related_fields = ['contact_set']
     
     class Meta:
         model = Customer
@@ -85,7 +93,7 @@ class CustomerSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
-class InteractionSerializer(serializers.ModelSerializer):
+class InteractionSerializer(FieldSelectionMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Interaction model.
     
@@ -95,7 +103,11 @@ class InteractionSerializer(serializers.ModelSerializer):
     # Add custom fields to show related names
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     contact_name = serializers.SerializerMethodField()
-    created_by_username = serializers.CharField(source='created_by.username', read_only=True)
+    # CustomUser has no username field; email is its USERNAME_FIELD
+    created_by_username = serializers.CharField(source='created_by.get_username', read_only=True)
+
+    # Relations read by the fields above, loaded with the queryset
+    select_related_fields = ['customer', 'contact', 'created_by']
 
     class Meta:
         model = Interaction
@@ -127,3 +139,84 @@ class InteractionSerializer(serializers.ModelSerializer):
         if obj.contact:
             return f"{obj.contact.first_name} {obj.contact.last_name}"
         return None
+
+class ImportUploadSerializer(serializers.Serializer):
+    """
+    Validates an import upload: what it contains, the file, and its format
+    when the file name does not tell.
+    """
+    kind = serializers.ChoiceField(choices=ImportJob.KIND_CHOICES)
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ImportJob model.
+
+    error_report links to the downloadable CSV of rejected rows, if any.
+    """
+    error_report = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'kind',
+            'file_name',
+            'status',
+            'total_rows',
+            'created_rows',
+            'updated_rows',
+            'failed_rows',
+            'error',
+            'error_report',
+            'started_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_error_report(self, obj):
+        """
+        Get the URL of the error report download.
+
+        Args:
+            obj: ImportJob instance
+
+        Returns:
+            str: Absolute URL of the report or None
+        """
+        if not obj.error_report:
+            return None
+        url = reverse('import-errors', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class DuplicateCandidateSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the DuplicateCandidate model.
+
+    first_id and second_id are customer or contact ids depending on kind.
+    """
+
+    class Meta:
+        model = DuplicateCandidate
+        fields = [
+            'id',
+            'kind',
+            'first_id',
+            'second_id',
+            'score',
+            'reasons',
+            'status',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+class MergeSerializer(serializers.Serializer):
+    """
+    Validates a merge request: keep is the id of the record that survives,
+    either of the pair (default the lower id).
+    """
+    keep = serializers.IntegerField(required=False)
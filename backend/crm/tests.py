@@ -1,3 +1,584 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounting.models import Invoice, Payment
+from backend.instrumentation import QueryBudgetTestMixin, registry
+from .dedup import CustomerDuplicateFinder, ContactDuplicateFinder, merge, soundex
+from .imports import import_records
+from meeting_mgmt.models import Meeting
+from .models import BlockingKey, Contact, Customer, DuplicateCandidate, Interaction
+
+User = get_user_model()
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        """
+        Set up interactions where several share the same date
+        """
+        self.user = User.objects.create_user(
+            email='crm@mail.com',
+            password='blindspot',
+            first_name='Cara',
+            last_name='Admin',
+            role='crm_admin'
+        )
+        self.client.force_authenticate(self.user)
+        customer = Customer.objects.create(name='Acme')
+        now = timezone.now().replace(microsecond=123456)
+        dates = [now, now, now, now - timedelta(days=1), now - timedelta(days=2)]
+        self.interactions = [
+            Interaction.objects.create(customer=customer, type='note', notes=str(i), date=date)
+            for i, date in enumerate(dates)
+        ]
+        self.expected = [
+            i.pk for i in sorted(self.interactions, key=lambda i: (i.date, i.pk), reverse=True)
+        ]
+
+    def walk(self, url, direction):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page = [row['id'] for row in response.data['results']]
+            ids = ids + page if direction == 'next' else page + ids
+            last = response.data
+            url = response.data[direction]
+        return ids, last
+
+    def test_pages_follow_view_ordering_without_gaps(self):
+        """
+        Walking next links visits every row once in -date order, and previous links walk back
+        """
+        ids, last = self.walk('/api/crm/interactions/?page_size=2', 'next')
+        self.assertEqual(ids, self.expected)
+        self.assertNotIn('count', last)
+
+        ids, _ = self.walk(last['previous'], 'previous')
+        self.assertEqual(ids, self.expected[:4])
+
+    def test_page_size_cap_and_opt_in_count(self):
+        """
+        page_size is capped and the total is only returned when requested
+        """
+        response = self.client.get('/api/crm/interactions/', {'page_size': 1000, 'count': 'true'})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        """
+        A tampered cursor gives a 404 rather than a server error
+        """
+        response = self.client.get('/api/crm/interactions/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ListQueryCountTest(QueryBudgetTestMixin, APITestCase):
+    """
+    List endpoints run a fixed number of queries however many rows they return
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='crm@mail.com',
+            password='blindspot',
+            first_name='Cara',
+            last_name='Admin',
+            role='crm_admin'
+        )
+        self.client.force_authenticate(self.user)
+        self.customer = self.add_rows()
+
+    def add_rows(self, count=3):
+        customer = None
+        for i in range(count):
+            customer = Customer.objects.create(name=f'Customer {i}')
+            contact = Contact.objects.create(customer=customer, first_name='Ann', last_name=str(i))
+            Interaction.objects.create(
+                customer=customer, contact=contact, type='call', notes='', date=timezone.now(),
+                created_by=self.user
+            )
+        return customer
+
+    def test_list_endpoints_have_constant_query_counts(self):
+        # The nested actions also load the customer; contacts are prefetched only when expanded
+        endpoints = {
+            '/api/crm/customers/': 1,
+            '/api/crm/customers/?expand=contacts': 2,
+            '/api/crm/contacts/': 1,
+            '/api/crm/interactions/': 1,
+            '/api/crm/interactions/recent/': 1,
+            f'/api/crm/customers/{self.customer.pk}/contacts/': 2,
+            f'/api/crm/customers/{self.customer.pk}/interactions/': 2,
+        }
+        for rows in (3, 6):
+            for url, queries in endpoints.items():
+                with self.subTest(url=url, rows=rows), self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertWithinQueryBudget(response)
+            self.add_rows()
+
+    def test_interaction_names_are_serialized(self):
+        response = self.client.get(f'/api/crm/customers/{self.customer.pk}/interactions/')
+        self.assertEqual(response.data['results'][0]['created_by_username'], 'crm@mail.com')
+        self.assertEqual(response.data['results'][0]['contact_name'], 'Ann 2')
+
+    def test_nested_actions_are_paginated(self):
+        """
+        Nested actions page with a cursor in their own ordering and honour ?fields=
+        """
+        for i in range(4):
+            Contact.objects.create(customer=self.customer, first_name='Bo', last_name=f'Z{i}')
+        url = f'/api/crm/customers/{self.customer.pk}/contacts/'
+        response = self.client.get(url, {'page_size': 3, 'fields': 'id,last_name'})
+        self.assertEqual([row['last_name'] for row in response.data['results']], ['2', 'Z0', 'Z1'])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'last_name'})
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['last_name'] for row in response.data['results']], ['Z2', 'Z3'])
+        self.assertIsNone(response.data['next'])
+
+    def test_contacts_are_expanded_on_request(self):
+        """
+        Customers leave out their contacts unless ?expand=contacts asks for them
+        """
+        response = self.client.get(f'/api/crm/customers/{self.customer.pk}/')
+        self.assertNotIn('contacts', response.data)
+        response = self.client.get(
+            f'/api/crm/customers/{self.customer.pk}/', {'expand': 'contacts', 'fields': 'name,contacts'}
+        )
+        self.assertEqual(set(response.data), {'name', 'contacts'})
+        # Nested serializers render in full
+        self.assertEqual(response.data['contacts'][0]['full_name'], 'Ann 2')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/crm/customers/', {'fields': 'id,name', 'expand': 'contacts'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+    @override_settings(INSTRUMENTATION_HEADERS=True)
+    def test_metrics_are_exposed_per_view(self):
+        """
+        Requests are aggregated per URL name for scraping and reported in debug headers
+        """
+        registry.clear()
+        response = self.client.get('/api/crm/interactions/')
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertEqual(response['X-Query-Budget'], '2')
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+        metrics = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('http_requests_total{view="interaction-list",method="GET"} 1', metrics)
+        self.assertIn('http_request_db_queries_total{view="interaction-list",method="GET"} 1', metrics)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="interaction-list",method="GET",le="+Inf"} 1', metrics
+        )
+
+        with override_settings(INTERNAL_IPS=[]):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SearchTest(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        """
+        Set up customers with contacts and interaction notes to search
+        """
+        self.user = User.objects.create_user(
+            email='search@mail.com',
+            password='blindspot',
+            first_name='Sam',
+            last_name='Admin',
+            role='crm_admin'
+        )
+        self.client.force_authenticate(self.user)
+        self.acme = Customer.objects.create(name='Acme Logistics', email='hello@acme.example')
+        self.globex = Customer.objects.create(name='Globex', address='Acme Street 4')
+        self.jane = Contact.objects.create(customer=self.acme, first_name='Jane', last_name='Doe')
+        self.renewal = Interaction.objects.create(
+            customer=self.acme, contact=self.jane, type='call', date=timezone.now(),
+            notes='Discussed the contract renewals and pricing for next year',
+        )
+        Interaction.objects.create(customer=self.globex, type='note', date=timezone.now(), notes='Sent the invoice')
+
+    def test_list_search_uses_stored_vectors(self):
+        """
+        ?search= matches stemmed words and word prefixes across the indexed columns
+        """
+        response = self.client.get('/api/crm/interactions/', {'search': 'renewal pric'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.renewal.pk])
+        response = self.client.get('/api/crm/customers/', {'search': 'acm'})
+        self.assertEqual({row['id'] for row in response.data['results']}, {self.acme.pk, self.globex.pk})
+        response = self.client.get('/api/crm/contacts/', {'search': "o'brien"})
+        self.assertEqual(response.data['results'], [])
+
+    def test_unified_search_ranks_each_type(self):
+        """
+        /api/crm/search/ returns ranked matches of every type within its query budget
+        """
+        response = self.client.get('/api/crm/search/', {'q': 'acme'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertWithinQueryBudget(response)
+        customers = response.data['results']['customers']
+        # The name is weighted above the address
+        self.assertEqual([row['id'] for row in customers], [self.acme.pk, self.globex.pk])
+        self.assertGreater(customers[0]['rank'], customers[1]['rank'])
+        self.assertEqual(response.data['results']['contacts'], [])
+
+        response = self.client.get('/api/crm/search/', {'q': 'jane', 'types': 'contacts'})
+        self.assertEqual(list(response.data['results']), ['contacts'])
+        self.assertEqual(response.data['results']['contacts'][0]['full_name'], 'Jane Doe')
+
+        self.assertEqual(self.client.get('/api/crm/search/').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/crm/search/', {'q': 'acme', 'types': 'invoices'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportTest(APITestCase):
+    def setUp(self):
+        """
+        Set up a CRM admin and an existing customer created through the API
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(
+            email='import@mail.com',
+            password='blindspot',
+            first_name='Ivy',
+            last_name='Admin',
+            role='crm_admin'
+        )
+        self.client.force_authenticate(self.user)
+        Customer.objects.create(name='Existing', email='taken@example.com')
+
+    def upload(self, kind, name, content, **extra):
+        return self.client.post('/api/crm/imports/', {
+            'kind': kind, 'file': SimpleUploadedFile(name, content.encode()), **extra,
+        }, format='multipart')
+
+    def test_csv_customers_are_validated_and_upserted(self):
+        """
+        Valid rows are inserted, then updated on re-import; bad rows land in the error report
+        """
+        response = self.upload('customers', 'customers.csv', (
+            'external_id,name,email,status\n'
+            'C1,Acme,info@acme.example,customer\n'
+            'C2,Globex,not-an-email,\n'
+            'C1,Acme again,,lead\n'
+            'C3,Initech,TAKEN@example.com,\n'
+            'C4,Umbrella,,unknown\n'
+            'C5,Hooli,,\n'
+        ))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [response.data[key] for key in ('status', 'total_rows', 'created_rows', 'updated_rows', 'failed_rows')],
+            ['completed', 6, 2, 0, 4],
+        )
+        self.assertEqual(Customer.objects.get(external_id='C5').status, 'lead')
+
+        report = self.client.get(response.data['error_report'])
+        lines = b''.join(report.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'line,external_id,field,message')
+        # Field checks come first, then the duplicate checks of the chunk
+        self.assertEqual([line.split(',')[:3] for line in lines[1:]], [
+            ['3', 'C2', 'email'], ['6', 'C4', 'status'], ['4', 'C1', 'external_id'], ['5', 'C3', 'email'],
+        ])
+
+        response = self.upload('customers', 'update.ndjson', '{"external_id": "C1", "name": "Acme Corp"}\n')
+        self.assertEqual((response.data['created_rows'], response.data['updated_rows']), (0, 1))
+        acme = Customer.objects.get(external_id='C1')
+        self.assertEqual((acme.name, acme.email, acme.status), ('Acme Corp', 'info@acme.example', 'customer'))
+        self.assertIsNone(response.data['error_report'])
+
+    def test_ndjson_contacts_resolve_customers_across_chunks(self):
+        """
+        Contacts reference customers by external id; duplicates are caught across chunks
+        """
+        Customer.objects.create(name='Acme', external_id='C1')
+        records = [
+            (1, {'external_id': 'P1', 'customer': 'C1', 'first_name': 'Jane', 'last_name': 'Doe', 'is_primary': True}),
+            (2, {'external_id': 'P2', 'customer': 'C9', 'first_name': 'John', 'last_name': 'Roe', 'is_primary': False}),
+            (3, 'Invalid JSON: Expecting value'),
+            (4, {'external_id': 'P1', 'customer': 'C1', 'first_name': 'Jane', 'last_name': 'Again', 'is_primary': False}),
+        ]
+        errors = []
+        result = import_records('contacts', records, lambda *row: errors.append(row), chunk_size=2)
+        self.assertEqual((result.total_rows, result.created_rows, result.failed_rows), (4, 1, 3))
+        self.assertEqual([(line, field) for line, _, field, _ in errors], [(2, 'customer'), (3, ''), (4, 'external_id')])
+        jane = Contact.objects.get(external_id='P1')
+        self.assertEqual((jane.last_name, jane.is_primary, jane.customer.external_id), ('Doe', True, 'C1'))
+
+    def test_ndjson_records_must_have_the_keys_of_the_first(self):
+        """
+        A record missing a key of the first record, or with an unknown key, is rejected
+        """
+        Customer.objects.create(name='Acme', external_id='C1', email='info@acme.example')
+        records = [
+            (1, {'external_id': 'C2', 'name': 'Globex', 'email': 'info@globex.example'}),
+            (2, {'external_id': 'C1', 'name': 'Acme Corp'}),
+            (3, {'external_id': 'C3', 'name': 'Initech', 'email': '', 'extra': 'x'}),
+            (4, {'external_id': 'C4', 'name': 'Hooli', 'email': '', 'phone': '555'}),
+        ]
+        errors = []
+        result = import_records('customers', records, lambda *row: errors.append(row))
+        self.assertEqual((result.created_rows, result.updated_rows, result.failed_rows), (1, 0, 3))
+        self.assertEqual(errors, [
+            (2, 'C1', '', 'Columns differ from the first record: missing email'),
+            (3, 'C3', '', 'Unknown columns: extra'),
+            (4, 'C4', '', 'Columns differ from the first record: extra phone'),
+        ])
+        acme = Customer.objects.get(external_id='C1')
+        self.assertEqual((acme.name, acme.email), ('Acme', 'info@acme.example'))
+        self.assertFalse(Customer.objects.filter(external_id__in=['C3', 'C4']).exists())
+
+    def test_bad_files_and_permissions_are_rejected(self):
+        """
+        Unknown columns fail the job as a whole and only users who may create the rows can import
+        """
+        response = self.upload('customers', 'customers.csv', 'external_id,name,colour\nC1,Acme,red\n')
+        self.assertEqual((response.data['status'], response.data['error']), ('failed', 'Unknown columns: colour'))
+        self.assertFalse(Customer.objects.filter(external_id='C1').exists())
+
+        response = self.upload('customers', 'customers.txt', 'external_id,name\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        manager = User.objects.create_user(
+            email='manager@mail.com', password='blindspot', first_name='Max', last_name='Manager', role='crm_manager'
+        )
+        self.client.force_authenticate(manager)
+        response = self.upload('customers', 'customers.csv', 'external_id,name\n')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.upload('contacts', 'contacts.csv', 'external_id,customer,first_name,last_name\n')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class DedupTest(APITestCase):
+    def setUp(self):
+        """
+        Set up a CRM admin and customers of which two are the same company
+        """
+        self.user = User.objects.create_user(
+            email='dedup@mail.com',
+            password='blindspot',
+            first_name='Dee',
+            last_name='Admin',
+            role='crm_admin'
+        )
+        self.client.force_authenticate(self.user)
+        self.acme = Customer.objects.create(name='Acme Inc.', email='info@acme.example', phone='+1 555 010 9999')
+        self.acme_copy = Customer.objects.create(
+            name='ACME', email='sales@acme.example', phone='555-010-9999', website='https://www.acme.example',
+        )
+        self.globex = Customer.objects.create(name='Globex', email='hello@gmail.com')
+
+    def test_blocking_and_scoring(self):
+        """
+        Only records sharing a blocking key are compared, and free mail domains are no key
+        """
+        self.assertEqual([soundex(word) for word in ('Robert', 'Rupert', 'Ashcraft', 'Tymczak')],
+                         ['R163', 'R163', 'A261', 'T522'])
+        run = CustomerDuplicateFinder().run()
+        self.assertEqual((run.full, run.records, run.candidates), (True, 3, 1))
+        candidate = DuplicateCandidate.objects.get()
+        self.assertEqual((candidate.first_id, candidate.second_id), (self.acme.pk, self.acme_copy.pk))
+        self.assertIn('phone', candidate.reasons)
+        self.assertFalse(BlockingKey.objects.filter(key__endswith='gmail.com').exists())
+
+    def test_incremental_run_compares_changed_records_only(self):
+        """
+        A later run rebuilds the keys of changed records and keeps dismissed pairs dismissed
+        """
+        CustomerDuplicateFinder().run()
+        DuplicateCandidate.objects.update(status='dismissed')
+        globex_copy = Customer.objects.create(name='Globex Corporation', email='billing@gmail.com')
+
+        run = CustomerDuplicateFinder().run()
+        self.assertEqual((run.full, run.records, run.candidates), (False, 1, 1))
+        self.assertEqual(
+            list(DuplicateCandidate.objects.order_by('second_id').values_list('second_id', 'status')),
+            [(self.acme_copy.pk, 'dismissed'), (globex_copy.pk, 'open')],
+        )
+
+        contact = Contact.objects.create(customer=self.acme, first_name='Jon', last_name='Smith', email='jon@acme.example')
+        Contact.objects.create(customer=self.acme_copy, first_name='John', last_name='Smyth', email='JON@acme.example')
+        Contact.objects.create(customer=self.acme, first_name='Jane', last_name='Smith')
+        self.assertEqual(ContactDuplicateFinder().run().candidates, 1)
+        self.assertEqual(DuplicateCandidate.objects.get(kind='contact').first_id, contact.pk)
+
+    def test_merge_repoints_related_rows(self):
+        """
+        Merging moves contacts, interactions and invoices to the survivor and deletes the duplicate
+        """
+        contact = Contact.objects.create(customer=self.acme_copy, first_name='Jon', last_name='Smith')
+        Interaction.objects.create(customer=self.acme_copy, contact=contact, type='call', notes='', date=timezone.now())
+        Invoice.objects.create(
+            customer=self.acme_copy, invoice_number='INV-1', issue_date=date(2024, 1, 1),
+            due_date=date(2024, 2, 1), total_amount=100, created_by=self.user,
+        )
+        CustomerDuplicateFinder().run()
+        candidate = DuplicateCandidate.objects.get()
+
+        manager = User.objects.create_user(
+            email='manager@mail.com', password='blindspot', first_name='Max', last_name='Manager', role='crm_manager'
+        )
+        self.client.force_authenticate(manager)
+        response = self.client.post(f'/api/crm/duplicates/{candidate.pk}/merge/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(f'/api/crm/duplicates/{candidate.pk}/merge/', {'keep': self.globex.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(f'/api/crm/duplicates/{candidate.pk}/merge/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['id'], response.data['website']), (self.acme.pk, 'https://www.acme.example'))
+
+        self.assertFalse(Customer.objects.filter(pk=self.acme_copy.pk).exists())
+        self.assertEqual(Contact.objects.get().customer_id, self.acme.pk)
+        self.assertEqual(Interaction.objects.get().customer_id, self.acme.pk)
+        self.assertEqual(Invoice.objects.get().customer_id, self.acme.pk)
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.status, 'merged')
+        response = self.client.post(f'/api/crm/duplicates/{candidate.pk}/dismiss/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_merge_keeps_one_primary_contact(self):
+        """
+        The survivor keeps its primary contact; the duplicate's primary only stays primary if it has none
+        """
+        kept = Contact.objects.create(customer=self.acme, first_name='Ann', last_name='Lee', is_primary=True)
+        moved = Contact.objects.create(customer=self.acme_copy, first_name='Jon', last_name='Smith', is_primary=True)
+        merge(self.acme, self.acme_copy)
+        self.assertEqual(
+            dict(Contact.objects.filter(customer=self.acme).values_list('pk', 'is_primary')),
+            {kept.pk: True, moved.pk: False},
+        )
+
+        globex_copy = Customer.objects.create(name='Globex Corp')
+        only = Contact.objects.create(customer=globex_copy, first_name='Hank', last_name='Scorpio', is_primary=True)
+        merge(self.globex, globex_copy)
+        only.refresh_from_db()
+        self.assertEqual((only.customer_id, only.is_primary), (self.globex.pk, True))
+
+    def test_contacts_of_different_customers_are_not_merged(self):
+        """
+        Merging contacts of two customers is refused and leaves both contacts and their interactions as they were
+        """
+        ann = Contact.objects.create(customer=self.acme, first_name='Ann', last_name='Lee')
+        other = Contact.objects.create(customer=self.globex, first_name='Ann', last_name='Lee', phone='555')
+        interaction = Interaction.objects.create(
+            customer=self.globex, contact=other, type='call', notes='', date=timezone.now()
+        )
+        candidate = DuplicateCandidate.objects.create(kind='contact', first_id=ann.pk, second_id=other.pk, score=1)
+        response = self.client.post(f'/api/crm/duplicates/{candidate.pk}/merge/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Contact.objects.filter(pk=other.pk).exists())
+        interaction.refresh_from_db()
+        self.assertEqual((interaction.customer_id, interaction.contact_id), (self.globex.pk, other.pk))
+
+        copy = Contact.objects.create(customer=self.acme, first_name='Ann', last_name='Lee', phone='555')
+        survivor = merge(ann, copy)
+        ann.refresh_from_db()
+        self.assertEqual((survivor.phone, ann.phone), ('555', '555'))
+        self.assertFalse(Contact.objects.filter(pk=copy.pk).exists())
+
+
+class TimelineTest(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        """
+        Set up a customer with interactions, invoices, payments and meetings on interleaved days
+        """
+        self.user = User.objects.create_user(
+            email='timeline@mail.com',
+            password='blindspot',
+            first_name='Tim',
+            last_name='Admin',
+            role='super_admin'
+        )
+        self.client.force_authenticate(self.user)
+        self.acme = Customer.objects.create(name='Acme')
+        other = Customer.objects.create(name='Globex')
+
+        def at(day, hour=12):
+            return timezone.make_aware(datetime(2024, 1, day, hour))
+
+        expected = []
+        for day in range(1, 11):
+            interaction = Interaction.objects.create(customer=self.acme, type='call', notes=f'Call {day}', date=at(day))
+            invoice = Invoice.objects.create(
+                customer=self.acme, invoice_number=f'INV-{day}', issue_date=date(2024, 1, day),
+                due_date=date(2024, 2, day), total_amount=100, created_by=self.user,
+            )
+            expected += [('interaction', interaction.pk), ('invoice', invoice.pk)]
+            if day % 2:
+                payment = Payment.objects.create(
+                    invoice=invoice, payment_date=date(2024, 1, day), payment_method='cash', amount=10,
+                    reference_number=f'PAY-{day}', created_by=self.user,
+                )
+                expected.append(('payment', payment.pk))
+            if day % 3 == 0:
+                meeting = Meeting.objects.create(
+                    title=f'Review {day}', description='', meeting_time=at(day, 9), organizer=self.user,
+                    google_meet_link='https://meet.google.com/abc', customer=self.acme,
+                )
+                expected.append(('meeting', meeting.pk))
+        Interaction.objects.create(customer=other, type='call', notes='Elsewhere', date=at(5))
+        # Newest first: noon interaction, morning meeting, then the day's dated invoice and payment
+        order = {'interaction': 0, 'meeting': 1, 'invoice': 2, 'payment': 3}
+        days = {}
+        for event in Interaction.objects.filter(customer=self.acme):
+            days[('interaction', event.pk)] = event.date.day
+        for event in Invoice.objects.all():
+            days[('invoice', event.pk)] = event.issue_date.day
+        for event in Payment.objects.all():
+            days[('payment', event.pk)] = event.payment_date.day
+        for event in Meeting.objects.all():
+            days[('meeting', event.pk)] = event.meeting_time.day
+        self.expected = sorted(expected, key=lambda item: (-days[item], order[item[0]]))
+
+    def walk(self, url, **params):
+        events, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertWithinQueryBudget(response)
+            events += [(event['type'], event['id']) for event in response.data['results']]
+            pages += 1
+            if not response.data['next']:
+                return events, pages
+            response = self.client.get(response.data['next'])
+
+    def test_pages_merge_every_source_in_time_order(self):
+        """
+        Walking the cursor yields every event of the customer exactly once, newest first
+        """
+        events, pages = self.walk(f'/api/crm/customers/{self.acme.pk}/timeline/', page_size=4)
+        self.assertEqual(events, self.expected)
+        self.assertEqual(pages, -(-len(self.expected) // 4))
+
+        events, _ = self.walk(f'/api/crm/customers/{self.acme.pk}/timeline/', types='payment,meeting', page_size=3)
+        self.assertEqual(events, [event for event in self.expected if event[0] in ('payment', 'meeting')])
+
+    def test_sources_follow_permissions(self):
+        """
+        Users without accounting access see no invoices or payments; bad parameters are rejected
+        """
+        crm_admin = User.objects.create_user(
+            email='crm@mail.com', password='blindspot', first_name='Cara', last_name='Admin', role='crm_admin'
+        )
+        self.client.force_authenticate(crm_admin)
+        events, _ = self.walk(f'/api/crm/customers/{self.acme.pk}/timeline/', page_size=100)
+        self.assertEqual(events, [event for event in self.expected if event[0] in ('interaction', 'meeting')])
+
+        response = self.client.get(f'/api/crm/customers/{self.acme.pk}/timeline/', {'types': 'email'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f'/api/crm/customers/{self.acme.pk}/timeline/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
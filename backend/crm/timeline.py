@@ -0,0 +1,206 @@
+"""
+Time-ordered feed of everything that happened with a customer.
+
+Interactions, invoices, payments and meetings live in different tables,
+so a page of the feed is a k-way merge: each source is read newest first
+with a keyset query (after its position on the previous page, at most
+one page plus one row, served by a (customer, time, id) index) and the
+sorted streams are merged with heapq. The cursor holds every source's
+last consumed position, so a page costs one query per source whatever the
+length of the history; sources that ran out are marked done and skipped.
+
+Invoices and payments only have a date; they are placed at the start of
+their day in the current time zone.
+"""
+import base64
+import datetime
+import heapq
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from accounting.models import Invoice, Payment
+from backend.pagination import encode_value
+from meeting_mgmt.models import Meeting
+
+from .models import Interaction
+
+
+class TimelineSource:
+    """
+    One kind of event: how to find a customer's rows, when they happened
+    and how to show them. time_field must be non-null and indexed together
+    with the customer.
+    """
+    name = ''
+    model = None
+    customer_path = 'customer'
+    time_field = ''
+    fields = ()
+
+    def queryset(self, customer):
+        return self.model._default_manager.filter(**{self.customer_path: customer})
+
+    def parse(self, value):
+        return self.model._meta.get_field(self.time_field).to_python(value)
+
+    def rows(self, customer, position, limit):
+        """Up to limit rows after position (time, pk), newest first."""
+        queryset = self.queryset(customer)
+        if position is not None:
+            time, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.time_field}__lt': time}) | Q(**{self.time_field: time, 'pk__lt': pk}),
+                **{f'{self.time_field}__lte': time},
+            )
+        queryset = queryset.order_by(f'-{self.time_field}', '-pk').values('pk', self.time_field, *self.fields)
+        return list(queryset[:limit])
+
+    def timestamp(self, row):
+        value = row[self.time_field]
+        if not isinstance(value, datetime.datetime):
+            value = timezone.make_aware(datetime.datetime.combine(value, datetime.time.min))
+        return value
+
+    def event(self, row):
+        return {
+            'type': self.name,
+            'id': row['pk'],
+            'time': self.timestamp(row),
+            **self.describe(row),
+        }
+
+    def describe(self, row):
+        raise NotImplementedError
+
+
+class InteractionSource(TimelineSource):
+    name = 'interaction'
+    model = Interaction
+    time_field = 'date'
+    fields = ('type', 'notes', 'contact_id')
+
+    def describe(self, row):
+        return {'title': row['type'], 'summary': row['notes'][:200], 'contact': row['contact_id']}
+
+
+class InvoiceSource(TimelineSource):
+    name = 'invoice'
+    model = Invoice
+    time_field = 'issue_date'
+    fields = ('invoice_number', 'status', 'total_amount', 'balance_due', 'currency')
+
+    def describe(self, row):
+        return {
+            'title': row['invoice_number'],
+            'summary': f"{row['status']}, {row['total_amount']} {row['currency']}",
+            'status': row['status'],
+            'amount': row['total_amount'],
+            'balance_due': row['balance_due'],
+            'currency': row['currency'],
+        }
+
+
+class PaymentSource(TimelineSource):
+    name = 'payment'
+    model = Payment
+    customer_path = 'invoice__customer'
+    time_field = 'payment_date'
+    fields = ('reference_number', 'amount', 'currency', 'payment_method', 'invoice_id')
+
+    def describe(self, row):
+        return {
+            'title': row['reference_number'],
+            'summary': f"{row['amount']} {row['currency']} by {row['payment_method']}",
+            'amount': row['amount'],
+            'currency': row['currency'],
+            'invoice': row['invoice_id'],
+        }
+
+
+class MeetingSource(TimelineSource):
+    name = 'meeting'
+    model = Meeting
+    time_field = 'meeting_time'
+    fields = ('title', 'description', 'google_meet_link')
+
+    def describe(self, row):
+        return {
+            'title': row['title'],
+            'summary': row['description'][:200],
+            'link': row['google_meet_link'],
+        }
+
+
+SOURCES = {source.name: source for source in (InteractionSource(), InvoiceSource(), PaymentSource(), MeetingSource())}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(positions):
+    payload = json.dumps(positions, default=encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(encoded, sources):
+    """Positions by source name: None to start at the top, False when done, else (time, pk)."""
+    if not encoded:
+        return {source.name: None for source in sources}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        positions = {}
+        for source in sources:
+            position = payload[source.name]
+            if position is None or position is False:
+                positions[source.name] = position
+            else:
+                time, pk = position
+                positions[source.name] = (source.parse(time), int(pk))
+        return positions
+    except (TypeError, ValueError, KeyError, ValidationError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def timeline_page(customer, sources, page_size, cursor=None):
+    """
+    One page of customer's events from sources, newest first. Returns the
+    events and the cursor of the next page, or None on the last page.
+    """
+    positions = decode_cursor(cursor, sources)
+    fetched = {}
+    for source in sources:
+        if positions[source.name] is not False:
+            fetched[source.name] = source.rows(customer, positions[source.name], page_size + 1)
+
+    def stream(rank, source):
+        for row in fetched.get(source.name, ()):
+            # rank breaks ties between sources the same way on every page
+            yield (source.timestamp(row), -rank, row['pk']), source, row
+
+    merged = heapq.merge(
+        *(stream(rank, source) for rank, source in enumerate(sources)), key=lambda item: item[0], reverse=True
+    )
+    page = list(islice(merged, page_size))
+
+    consumed = {}
+    for _, source, row in page:
+        consumed[source.name] = consumed.get(source.name, 0) + 1
+        positions[source.name] = (row[source.time_field], row['pk'])
+    has_more = False
+    for source in sources:
+        if source.name not in fetched:
+            continue
+        rows = fetched[source.name]
+        if consumed.get(source.name, 0) < len(rows):
+            has_more = True
+        else:
+            # Every row it had fit in the page
+            positions[source.name] = False
+
+    events = [source.event(row) for _, source, row in page]
+    return events, encode_cursor(positions) if has_more else None
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CustomerViewSet, ContactViewSet, InteractionViewSet
+from .views import CustomerViewSet, ContactViewSet, DuplicateCandidateViewSet, ImportJobViewSet, InteractionViewSet, SearchView
 
 # Initialize the router
 router = DefaultRouter()
@@ -9,8 +9,11 @@ router = DefaultRouter()
 router.register(r"customers", CustomerViewSet, basename="customer")
 router.register(r"contacts", ContactViewSet, basename="contact")
 router.register(r"interactions", InteractionViewSet, basename="interaction")
+router.register(r"imports", ImportJobViewSet, basename="import")
+router.register(r"duplicates", DuplicateCandidateViewSet, basename="duplicate")
 
 # Include the router's URLs in urlpatterns
 urlpatterns = [
+    path("search/", SearchView.as_view(), name="crm-search"),
     path("", include(router.urls)),
 ]
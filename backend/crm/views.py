@@ -1,13 +1,27 @@
-from rest_framework import viewsets, filters, status
+from django.http import FileResponse
+from rest_framework import generics, mixins, viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Customer, Contact, Interaction
+from accounting.permissions import CanManageInvoices, CanManagePayments
+from backend.eager_loading import EagerLoadingViewMixin
+from backend.field_selection import requested_selection
+from .dedup import MergeError, merge
+from .imports import ImportFileError, detect_format, run_import_job
+from .models import Customer, Contact, DuplicateCandidate, ImportJob, Interaction
 from .permissions import CanManageCustomers, CanManageContacts, CanManageInteractions
-from .serializers import CustomerSerializer, ContactSerializer, InteractionSerializer
+from .search import FullTextSearchFilter, ranked_search
+from .timeline import SOURCES, InvalidCursor, timeline_page
+from .serializers import (
+    CustomerSerializer, ContactSerializer, DuplicateCandidateSerializer, ImportJobSerializer, ImportUploadSerializer,
+    InteractionSerializer, MergeSerializer,
+)
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing customer data.
     
@@ -17,47 +31,116 @@ class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAuthenticated, CanManageCustomers]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status']
-    search_fields = ['name', 'email', 'phone']
     ordering_fields = ['name', 'created_at', 'updated_at']
     ordering = ['-created_at']
+    # Lists allow one more query for the opt-in ?count=true
+    query_budget = {'list': 3, 'retrieve': 2}
 
-    @action(detail=True, methods=['get'])
+    def get_customer(self):
+        """The customer of a nested action, without the serializer's prefetches."""
+        customer = generics.get_object_or_404(Customer.objects.all(), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, customer)
+        return customer
+
+    def paginate_related(self, queryset, serializer_class):
+        """
+        A keyset page of queryset, in its own ordering rather than the
+        customer list's, rendered by serializer_class with ?fields= applied.
+        """
+        queryset = serializer_class.setup_eager_loading(queryset, **requested_selection(self.request))
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, self.request)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    # The customer and the page, plus the opt-in ?count=true
+    @action(detail=True, methods=['get'], query_budget=3)
     def contacts(self, request, pk=None):
         """
-        Retrieve all contacts for a specific customer.
+        Retrieve a page of contacts for a specific customer.
         
         Args:
             request: HTTP request object
             pk: Primary key of the customer
             
         Returns:
-            Response: List of contacts for the customer
+            Response: Page of contacts for the customer, by last name
         """
-        customer = self.get_object()
-        contacts = Contact.objects.filter(customer=customer)
-        serializer = ContactSerializer(contacts, many=True)
-        return Response(serializer.data)
+        customer = self.get_customer()
+        return self.paginate_related(
+            Contact.objects.filter(customer=customer).order_by(*ContactViewSet.ordering), ContactSerializer
+        )
 
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], query_budget=3)
     def interactions(self, request, pk=None):
         """
-        Retrieve all interactions for a specific customer.
+        Retrieve a page of interactions for a specific customer.
         
         Args:
             request: HTTP request object
             pk: Primary key of the customer
             
         Returns:
-            Response: List of interactions for the customer
+            Response: Page of interactions for the customer, newest first
         """
-        customer = self.get_object()
-        interactions = Interaction.objects.filter(customer=customer)
-        serializer = InteractionSerializer(interactions, many=True)
-        return Response(serializer.data)
+        customer = self.get_customer()
+        return self.paginate_related(
+            Interaction.objects.filter(customer=customer).order_by(*InteractionViewSet.ordering), InteractionSerializer
+        )
+
+    timeline_permissions = {
+        'interaction': CanManageInteractions,
+        'invoice': CanManageInvoices,
+        'payment': CanManagePayments,
+        'meeting': None,
+    }
+    timeline_page_size = 25
+    timeline_max_page_size = 100
 
-class ContactViewSet(viewsets.ModelViewSet):
+    # The customer, then one query per event type
+    @action(detail=True, methods=['get'], query_budget=5)
+    def timeline(self, request, pk=None):
+        """
+        Retrieve a page of the customer's interactions, invoices, payments
+        and meetings, newest first.
+
+        Query parameters: types, a comma separated subset of interaction,
+        invoice, payment and meeting (default all the user may view);
+        page_size (default 25, at most 100); cursor, from the next link.
+
+        Args:
+            request: HTTP request object
+            pk: Primary key of the customer
+
+        Returns:
+            Response: The events of the page and the link to the next one
+        """
+        customer = self.get_customer()
+        requested = request.query_params.get('types')
+        names = requested.split(',') if requested else list(SOURCES)
+        unknown = [name for name in names if name not in SOURCES]
+        if unknown:
+            raise ValidationError({'types': f'Unknown types: {", ".join(unknown)}'})
+        try:
+            page_size = int(request.query_params.get('page_size', self.timeline_page_size))
+        except ValueError:
+            raise ValidationError({'page_size': 'A valid integer is required.'})
+        page_size = max(min(page_size, self.timeline_max_page_size), 1)
+
+        sources = [
+            SOURCES[name] for name in names
+            if self.timeline_permissions[name] is None or self.timeline_permissions[name]().has_permission(request, self)
+        ]
+        try:
+            events, cursor = timeline_page(customer, sources, page_size, request.query_params.get('cursor'))
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        next_link = replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor else None
+        return Response({'next': next_link, 'results': events})
+
+class ContactViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing contact data.
     
@@ -66,11 +149,11 @@ class ContactViewSet(viewsets.ModelViewSet):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated, CanManageContacts]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['customer', 'is_primary']
-    search_fields = ['first_name', 'last_name', 'email', 'position']
     ordering_fields = ['last_name', 'created_at']
     ordering = ['last_name']
+    query_budget = {'list': 2, 'retrieve': 1}
 
     @action(detail=True, methods=['post'])
     def set_primary(self, request, pk=None):
@@ -92,7 +175,7 @@ class ContactViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(contact)
         return Response(serializer.data)
 
-class InteractionViewSet(viewsets.ModelViewSet):
+class InteractionViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing interaction data.
     
@@ -101,11 +184,11 @@ class InteractionViewSet(viewsets.ModelViewSet):
     queryset = Interaction.objects.all()
     serializer_class = InteractionSerializer
     permission_classes = [IsAuthenticated, CanManageInteractions]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['customer', 'contact', 'type']
-    search_fields = ['notes']
     ordering_fields = ['date', 'created_at']
     ordering = ['-date']
+    query_budget = {'list': 2, 'retrieve': 1}
 
     def perform_create(self, serializer):
         """
@@ -116,7 +199,7 @@ class InteractionViewSet(viewsets.ModelViewSet):
         """
         serializer.save(created_by=self.request.user)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], query_budget=1)
     def recent(self, request):
         """
         Get recent interactions across all customers.
@@ -127,11 +210,11 @@ class InteractionViewSet(viewsets.ModelViewSet):
         Returns:
             Response: List of recent interactions
         """
-        recent_interactions = Interaction.objects.order_by('-date')[:10]
+        recent_interactions = self.get_queryset().order_by('-date')[:10]
         serializer = self.get_serializer(recent_interactions, many=True)
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], query_budget=1)
     def by_type(self, request):
         """
         Get interaction counts grouped by type.
@@ -150,3 +233,191 @@ class InteractionViewSet(viewsets.ModelViewSet):
         )
         return Response(type_counts)
 
+
+class SearchView(generics.GenericAPIView):
+    """
+    Ranked search across customers, contacts and interactions at once.
+
+    Query parameters: q, the search text; types, a comma separated subset
+    of customers, contacts and interactions; limit, results per type
+    (default 10, at most 50). Only types the user may view are searched.
+    """
+    permission_classes = [IsAuthenticated]
+    # One query per type, plus the contacts of customers with ?expand=contacts
+    query_budget = 4
+    max_limit = 50
+    types = {
+        'customers': (Customer, CustomerSerializer, CanManageCustomers),
+        'contacts': (Contact, ContactSerializer, CanManageContacts),
+        'interactions': (Interaction, InteractionSerializer, CanManageInteractions),
+    }
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        try:
+            limit = max(min(int(request.query_params.get('limit', 10)), self.max_limit), 1)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        requested = request.query_params.get('types')
+        names = requested.split(',') if requested else list(self.types)
+        unknown = [name for name in names if name not in self.types]
+        if unknown:
+            raise ValidationError({'types': f'Unknown types: {", ".join(unknown)}'})
+
+        allowed = [name for name in names if self.types[name][2]().has_permission(request, self)]
+        if not allowed:
+            self.permission_denied(request)
+
+        results = {}
+        for name in allowed:
+            model, serializer_class, _ = self.types[name]
+            queryset = serializer_class.setup_eager_loading(model.objects.all(), **requested_selection(request))
+            queryset = ranked_search(queryset, text)
+            rows = list(queryset[:limit])
+            data = serializer_class(rows, many=True, context=self.get_serializer_context()).data
+            results[name] = [dict(item, rank=round(row.search_rank, 4)) for item, row in zip(data, rows)]
+        return Response({'query': text, 'results': results})
+
+
+class ImportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    ViewSet for bulk imports of customers and contacts.
+
+    POST a multipart upload (kind, file and optionally format) to import a
+    CSV or NDJSON file; the response is the finished job with its counts.
+    Rejected rows can be downloaded from the errors action as CSV.
+    """
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    import_permissions = {
+        'customers': CanManageCustomers,
+        'contacts': CanManageContacts,
+    }
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        upload_serializer = ImportUploadSerializer(data=request.data)
+        upload_serializer.is_valid(raise_exception=True)
+        kind = upload_serializer.validated_data['kind']
+        upload = upload_serializer.validated_data['file']
+        # Importing needs the same permission as creating the rows one by one
+        if not self.import_permissions[kind]().has_permission(request, self):
+            self.permission_denied(request)
+        try:
+            file_format = detect_format(upload.name, upload_serializer.validated_data.get('format'))
+        except ImportFileError as e:
+            raise ValidationError({'format': str(e)})
+
+        job = ImportJob.objects.create(kind=kind, file_name=upload.name[:255], created_by=request.user)
+        run_import_job(job, upload, file_format)
+        serializer = self.get_serializer(job)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'], url_path='errors', url_name='errors')
+    def errors(self, request, pk=None):
+        """
+        Download the CSV report of the rows an import rejected.
+
+        Args:
+            request: HTTP request object
+            pk: Primary key of the import job
+
+        Returns:
+            FileResponse: The error report as an attachment
+        """
+        job = self.get_object()
+        if not job.error_report:
+            raise NotFound('This import rejected no rows')
+        return FileResponse(
+            job.error_report.open('rb'), as_attachment=True, filename=f'import-{job.pk}-errors.csv',
+            content_type='text/csv',
+        )
+
+
+class DuplicateCandidateViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet for the possible duplicates found by the find_duplicates command.
+
+    Candidates can be filtered by kind and status. Merging folds one record
+    of the pair into the other and needs the permission to delete it;
+    dismissing keeps the pair from being proposed again.
+    """
+    serializer_class = DuplicateCandidateSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['kind', 'status']
+    ordering_fields = ['score', 'created_at']
+    query_budget = {'list': 2, 'retrieve': 1}
+    kinds = {
+        'customer': (Customer, CustomerSerializer, CanManageCustomers),
+        'contact': (Contact, ContactSerializer, CanManageContacts),
+    }
+
+    def get_queryset(self):
+        visible = [
+            kind for kind, (_, _, permission) in self.kinds.items()
+            if permission().has_action_permission(self.request, f'view_{kind}')
+        ]
+        return DuplicateCandidate.objects.filter(kind__in=visible)
+
+    def get_open_candidate(self, kind_action):
+        candidate = self.get_object()
+        if not self.kinds[candidate.kind][2]().has_action_permission(self.request, f'{kind_action}_{candidate.kind}'):
+            self.permission_denied(self.request)
+        if candidate.status != 'open':
+            raise ValidationError({'status': f'This candidate is already {candidate.status}.'})
+        return candidate
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Merge the two records of a candidate pair.
+
+        Args:
+            request: HTTP request object, optionally with keep, the id of
+                the record to keep (default the lower id)
+            pk: Primary key of the candidate
+
+        Returns:
+            Response: The surviving record
+        """
+        candidate = self.get_open_candidate('delete')
+        serializer = MergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        keep = serializer.validated_data.get('keep', candidate.first_id)
+        if keep not in (candidate.first_id, candidate.second_id):
+            raise ValidationError({'keep': 'Must be one of the two records of the pair.'})
+        drop = candidate.second_id if keep == candidate.first_id else candidate.first_id
+
+        model, record_serializer, _ = self.kinds[candidate.kind]
+        records = model.objects.in_bulk([keep, drop])
+        if len(records) != 2:
+            raise NotFound('One of the two records no longer exists')
+        try:
+            survivor = merge(records[keep], records[drop])
+        except MergeError as e:
+            raise ValidationError({'error': str(e)})
+        return Response(record_serializer(survivor, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """
+        Mark a candidate pair as not being duplicates.
+
+        Args:
+            request: HTTP request object
+            pk: Primary key of the candidate
+
+        Returns:
+            Response: The dismissed candidate
+        """
+        candidate = self.get_open_candidate('update')
+        candidate.status = 'dismissed'
+        candidate.save(update_fields=['status'])
+        return Response(self.get_serializer(candidate).data)
@@ -7,16 +7,19 @@ from hrm.permissions import CanManageDepartments, CanManageLeaves, CanManageSala
 from .models import Department, Employee, Salary, LeaveRequest, LeaveType
 from .serializers import DepartmentSerializer, EmployeeSerializer, LeaveRequestSerializer, LeaveTypeSerializer, SalarySerializer
 from rest_framework import status
+from backend.response_cache import CachedResponseMixin, cache_response
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     Viewset for managing departments in the HR module.
     """
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
     permission_classes = [IsAuthenticated, CanManageDepartments]
+    cache_models = [Department]
 
     @action(detail=False, methods=['get'])
+    @cache_response(Department)
     def list_departments(self, request):
         """
         Custom action to list departments
@@ -130,6 +133,7 @@ class LeaveViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cache_response(LeaveType)
     def list_leave_types(self, request):
         """
         Custom action to list all leave types
@@ -8,8 +8,14 @@ class Meeting(models.Model):
     organizer = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     attendees = models.ManyToManyField(get_user_model(), related_name='meetings_attending')
     google_meet_link = models.URLField(max_length=500)
+    customer = models.ForeignKey(
+        'crm.Customer', on_delete=models.SET_NULL, null=True, blank=True, related_name='meetings'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['customer', 'meeting_time', 'id'])]
+
     def __str__(self) -> str:
         return str(self.title)
@@ -6,4 +6,7 @@ class UsersConfig(AppConfig):
     name = 'users'
 
     def ready(self):
-        import users.signals
\ No newline at end of file
+        import users.signals
+        from users.permissions import build_permission_matrix
+
+        build_permission_matrix()
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import transaction
 
 class CustomUserManager(BaseUserManager):
     """
@@ -30,3 +31,19 @@ class CustomUserManager(BaseUserManager):
             raise ValueError('Superuser must have is_superuser=True.')
 
         return self.create_user(email, first_name, last_name, password, **extra_fields)
+
+    def deactivate(self, users):
+        """
+        Deactivate the given users (a queryset) with a single UPDATE and revoke their access tokens.
+
+        QuerySet.update() sends no post_save, so bulk deactivations must come
+        through here for stateless token authentication to notice them.
+        Returns the number of users deactivated.
+        """
+        from authentication.authentication.jwt import revoke_user_tokens
+
+        with transaction.atomic():
+            user_ids = list(users.filter(is_active=True).values_list('pk', flat=True))
+            self.filter(pk__in=user_ids).update(is_active=False)
+            revoke_user_tokens(*user_ids)
+        return len(user_ids)
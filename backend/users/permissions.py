@@ -1,5 +1,10 @@
+import functools
 from enum import Enum
-from typing import Dict, Optional, Any, ClassVar
+from importlib import import_module
+from importlib.util import find_spec
+from typing import Dict, FrozenSet, Optional, Any, ClassVar, Iterable, Tuple, Type
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 from rest_framework.request import Request
 from rest_framework.views import APIView
@@ -19,6 +24,118 @@ class Action(Enum):
     DELETE = "DELETE"
 
 
+class PermissionMatrix:
+    """
+    Role levels and action requirements of every module, compiled from the
+    role attributes and ACTION_LEVELS dicts of the BaseModulePermission
+    subclasses so that a decision is a couple of dict lookups.
+
+    Actions are merged per module; two classes of the same module giving
+    one action different levels is a configuration error.
+    """
+
+    def __init__(self) -> None:
+        self.role_levels: Dict[Optional[str], Dict[str, int]] = {}
+        self.required_levels: Dict[Optional[str], Dict[str, int]] = {}
+        self.allowed_actions: Dict[Tuple[Optional[str], str], FrozenSet[str]] = {}
+        self.classes: set = set()
+
+    def register(self, permission_class: Type["BaseModulePermission"]) -> None:
+        """Add a permission class's roles and action levels to its module."""
+        hierarchy = BaseModulePermission.ROLE_HIERARCHY
+        module = permission_class.module
+        roles = self.role_levels.setdefault(module, {"super_admin": hierarchy["super_admin"]})
+        for attribute, level in (
+            ("admin_role", hierarchy["admin"]),
+            ("manager_role", hierarchy["manager"]),
+            ("staff_role", hierarchy["staff"]),
+        ):
+            role = getattr(permission_class, attribute)
+            if role and roles.get(role, level) != level:
+                raise ImproperlyConfigured(
+                    f"Role {role!r} has conflicting levels in module {module!r}"
+                )
+            if role:
+                roles[role] = level
+
+        actions = self.required_levels.setdefault(module, {})
+        for action, level in getattr(permission_class, "ACTION_LEVELS", {}).items():
+            if actions.get(action, level) != level:
+                raise ImproperlyConfigured(
+                    f"Action {action!r} has conflicting levels in module {module!r} "
+                    f"({permission_class.__qualname__})"
+                )
+            actions[action] = level
+
+        # Precompute which actions each role may perform in the module
+        for role, role_level in roles.items():
+            self.allowed_actions[module, role] = frozenset(
+                action for action, level in actions.items() if role_level >= level
+            )
+        self.classes.add(permission_class)
+
+    def role_level(self, module: Optional[str], role: str) -> int:
+        return self.role_levels.get(module, {}).get(role, 0)
+
+    def required_level(self, module: Optional[str], action: str) -> int:
+        """Level required for an action, falling back to admin for unknown actions."""
+        return self.required_levels.get(module, {}).get(
+            action, BaseModulePermission.ROLE_HIERARCHY["admin"]
+        )
+
+    def is_allowed(self, module: Optional[str], role: str, action: str) -> bool:
+        if action in self.allowed_actions.get((module, role), ()):
+            return True
+        if action in self.required_levels.get(module, {}):
+            return False
+        return self.role_level(module, role) >= self.required_level(module, action)
+
+
+PERMISSION_MATRIX = PermissionMatrix()
+
+
+def _permission_subclasses(cls: type) -> Iterable[type]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _permission_subclasses(subclass)
+
+
+def build_permission_matrix() -> PermissionMatrix:
+    """
+    Import the permissions module of every installed app and compile all
+    BaseModulePermission subclasses into PERMISSION_MATRIX. Called once at
+    startup; classes defined later are registered on first use.
+    """
+    for app_config in apps.get_app_configs():
+        module_name = f"{app_config.name}.permissions"
+        if find_spec(module_name) is not None:
+            import_module(module_name)
+    for permission_class in _permission_subclasses(BaseModulePermission):
+        if permission_class not in PERMISSION_MATRIX.classes:
+            PERMISSION_MATRIX.register(permission_class)
+    return PERMISSION_MATRIX
+
+
+def memoize_per_request(method):
+    """
+    Cache an action decision on the request, keyed by (user, module, action),
+    so per-object permission checks on a list only pay for the first one.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, request: Request, action: str) -> bool:
+        decisions = request.__dict__.setdefault("_permission_decisions", {})
+        key = (request.user.pk, self.module, action)
+        try:
+            return decisions[key]
+        except KeyError:
+            decision = decisions[key] = method(self, request, action)
+            return decision
+
+    wrapper.memoized = True
+    return wrapper
+
+
 class BaseModulePermission(BasePermission):
     """
     Base permission class that handles module access and role hierarchy.
@@ -38,23 +155,39 @@ class BaseModulePermission(BasePermission):
         "staff": 1,  # Lowest level
     }
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        method = cls.__dict__.get("has_action_permission")
+        if method and not getattr(method, "memoized", False):
+            cls.has_action_permission = memoize_per_request(method)
+
+    @property
+    def matrix(self) -> PermissionMatrix:
+        if type(self) not in PERMISSION_MATRIX.classes:
+            PERMISSION_MATRIX.register(type(self))
+        return PERMISSION_MATRIX
+
     def has_module_access(self, user: CustomUser) -> bool:
         """Check if the user has access to the specified module."""
-        return bool(
-            user and user.is_authenticated and self.module in user.accessible_modules
-        )
+        if not (user and user.is_authenticated):
+            return False
+        # Keep a set of the user's modules for as long as the list is unchanged
+        modules = user.accessible_modules
+        cached = user.__dict__.get("_accessible_module_set")
+        if cached is None or cached[0] is not modules:
+            cached = user.__dict__["_accessible_module_set"] = (modules, frozenset(modules))
+        return self.module in cached[1]
 
     def get_role_level(self, user: CustomUser) -> int:
         """Retrieve the user's level based on their role in the module hierarchy."""
-        if user.role == "super_admin":
-            return self.ROLE_HIERARCHY["super_admin"]
-        elif user.role == self.admin_role:
-            return self.ROLE_HIERARCHY["admin"]
-        elif user.role == self.manager_role:
-            return self.ROLE_HIERARCHY["manager"]
-        elif user.role == self.staff_role:
-            return self.ROLE_HIERARCHY["staff"]
-        return 0
+        return self.matrix.role_level(self.module, user.role)
+
+    def get_required_level(self, action: str) -> int:
+        """
+        Get the minimum role level required for specific actions.
+        Falls back to admin level if action is not defined.
+        """
+        return self.matrix.required_level(self.module, action)
 
     def _get_action(self, request: Request, view: APIView) -> str:
         """Helper function to get the action from view or request method."""
@@ -151,22 +284,11 @@ class HRModulePermission(BaseModulePermission):
         "view_leave": BaseModulePermission.ROLE_HIERARCHY["staff"],
     }
 
-    def get_required_level(self, action: str) -> int:
-        """
-        Define the minimum role level required for specific actions.
-        Falls back to admin level if action is not defined.
-        """
-        return self.ACTION_LEVELS.get(
-            action, BaseModulePermission.ROLE_HIERARCHY["admin"]
-        )
-
     def has_action_permission(self, request: Request, action: str) -> bool:
         """
         Check if user has permission for a specific action within the HR module.
         """
-        user_level = self.get_role_level(request.user)
-        required_level = self.get_required_level(action)
-        return user_level >= required_level
+        return self.matrix.is_allowed(self.module, request.user.role, action)
 
 
 class CRMModulePermission(BaseModulePermission):
@@ -189,22 +311,11 @@ class CRMModulePermission(BaseModulePermission):
         "view_dashboard": BaseModulePermission.ROLE_HIERARCHY["staff"],
     }
 
-    def get_required_level(self, action: str) -> int:
-        """
-        Define the minimum role level required for specific actions.
-        Falls back to admin level if action is not defined.
-        """
-        return self.ACTION_LEVELS.get(
-            action, BaseModulePermission.ROLE_HIERARCHY["admin"]
-        )
-
     def has_action_permission(self, request: Request, action: str) -> bool:
         """
         Check if user has permission for a specific action within the CRM module.
         """
-        user_level = self.get_role_level(request.user)
-        required_level = self.get_required_level(action)
-        return user_level >= required_level
+        return self.matrix.is_allowed(self.module, request.user.role, action)
 
 
 class AccModulePermission(BaseModulePermission):
@@ -236,15 +347,6 @@ class AccModulePermission(BaseModulePermission):
         "delete_payment": BaseModulePermission.ROLE_HIERARCHY["admin"],
     }
 
-    def get_required_level(self, action: str) -> int:
-        """
-        Get the minimum role level required for specific actions.
-        Falls back to admin level if action is not defined.
-        """
-        return self.ACTION_LEVELS.get(
-            action, BaseModulePermission.ROLE_HIERARCHY["admin"]
-        )
-
     def has_permission(self, request: Request, view: APIView) -> bool:
         """
         Check if the user has general permissions for the requested action.
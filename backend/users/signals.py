@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.core.exceptions import ObjectDoesNotExist
 from .models import CustomUser, UserProfile
+from authentication.authentication.jwt import USER_CLAIMS, revoke_user_tokens
 from hrm.models import Employee, Department, Position
 import logging
 from datetime import date
@@ -54,3 +55,26 @@ def create_user_profile_and_employee(sender, instance, created, **kwargs):
 
         except Exception as e:
             logger.error(f"Failed to create profile and/or employee for {instance.email}: {e}")
+
+
+# Fields that invalidate access tokens when they change
+TOKEN_FIELDS = {*USER_CLAIMS, 'is_active', 'password'}
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_stale_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Revoke the user's outstanding access tokens when a field they rely on may have changed.
+    """
+    if created:
+        return
+    if update_fields is None or TOKEN_FIELDS.intersection(update_fields):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    """
+    Revoke a deleted user's access tokens; the stateless path never sees the missing row.
+    """
+    revoke_user_tokens(instance.pk)
@@ -1,3 +1,49 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from crm.permissions import CanManageContacts
+from .permissions import PERMISSION_MATRIX
+
+User = get_user_model()
+
+
+class PermissionMatrixTest(TestCase):
+    def setUp(self):
+        """
+        Set up a sales rep and a request made by them
+        """
+        self.user = User.objects.create_user(
+            email='rep@mail.com',
+            password='blindspot',
+            first_name='Sales',
+            last_name='Rep',
+            role='sales_rep'
+        )
+        self.request = Request(APIRequestFactory().get('/api/crm/contacts/'))
+        self.request.user = self.user
+
+    def test_matrix_compiles_action_levels_per_module(self):
+        """
+        Every module's roles and ACTION_LEVELS are compiled at startup
+        """
+        self.assertEqual(PERMISSION_MATRIX.role_level('crm', 'sales_rep'), 1)
+        self.assertTrue(PERMISSION_MATRIX.is_allowed('crm', 'sales_rep', 'view_contact'))
+        self.assertFalse(PERMISSION_MATRIX.is_allowed('crm', 'sales_rep', 'delete_contact'))
+        self.assertTrue(PERMISSION_MATRIX.is_allowed('accounting', 'accounting_admin', 'unlisted_action'))
 
-# Create your tests here.
+    def test_object_checks_reuse_the_request_decision(self):
+        """
+        Object permission checks on a list are answered from the per-request memo
+        """
+        permission = CanManageContacts()
+        with mock.patch.object(PERMISSION_MATRIX, 'is_allowed', wraps=PERMISSION_MATRIX.is_allowed) as is_allowed:
+            decisions = [
+                permission.has_object_permission(self.request, None, object())
+                for _ in range(100)
+            ]
+        self.assertTrue(all(decisions))
+        self.assertEqual(is_allowed.call_count, 1)